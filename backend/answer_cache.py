@@ -0,0 +1,129 @@
+'''
+ Semantic answer cache for medical questions.
+ Past answers are stored with their query embeddings in a small FAISS
+ index per language and returned for new queries in the same language
+ that are similar enough (multilingual embeddings put a question and its
+ translation close together, but the answer is in one language).
+ Answers are tagged with the knowledge base version they were built
+ from: after a swap, answers of turns still on the old version are
+ neither stored nor returned.
+'''
+import threading
+import time
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+
+# Unit length float32 row vector for inner product (cosine) search
+def _as_unit_row(embedding):
+    vector = np.array(embedding, dtype=np.float32).reshape(1, -1)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class SemanticAnswerCache:
+    """
+    Caches (query embedding, retrieved ids, answer) for past questions, by language.
+
+    Args:
+        threshold (float): Minimum cosine similarity for a cache hit.
+        ttl (float): Seconds an answer stays valid.
+        max_entries (int): Maximum number of cached answers, oldest are evicted first.
+    """
+
+    def __init__(self, threshold=0.95, ttl=86400, max_entries=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.indexes = {}  # language -> FAISS index of its entries
+        self.entries = OrderedDict()  # id -> (answer, indexes, created_at, language), oldest first
+        self.next_id = 0
+        # Knowledge base version of the cached answers, set by invalidate
+        self.version = None
+        self.stale_puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, entry_ids):
+        by_language = {}
+        for entry_id in entry_ids:
+            by_language.setdefault(self.entries.pop(entry_id)[3], []).append(entry_id)
+        for language, ids in by_language.items():
+            self.indexes[language].remove_ids(np.array(ids, dtype=np.int64))
+        self.evictions += len(entry_ids)
+
+    def _evict(self):
+        expired_before = time.time() - self.ttl
+        stale = []
+        for entry_id, (_, _, created_at, _) in self.entries.items():
+            if created_at >= expired_before and len(self.entries) - len(stale) <= self.max_entries:
+                break
+            stale.append(entry_id)
+        if stale:
+            self._remove(stale)
+
+    def lookup(self, embedding, language=None, version=None):
+        """
+        Returns the cached answer for a similar past question in language, or None.
+        """
+        with self.lock:
+            self._evict()
+            index = self.indexes.get(language)
+            if index is None or index.ntotal == 0 or version != self.version:
+                self.misses += 1
+                return None
+
+            scores, ids = index.search(_as_unit_row(embedding), 1)
+            entry_id = int(ids[0][0])
+            if entry_id < 0 or scores[0][0] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return self.entries[entry_id][0]
+
+    def put(self, embedding, indexes, answer, language=None, version=None):
+        vector = _as_unit_row(embedding)
+        with self.lock:
+            # Built from a knowledge base that was swapped out meanwhile
+            if version != self.version:
+                self.stale_puts += 1
+                return
+            index = self.indexes.get(language)
+            if index is None:
+                index = self.indexes[language] = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+
+            entry_id = self.next_id
+            self.next_id += 1
+            index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self.entries[entry_id] = (answer, list(indexes), time.time(), language)
+            self._evict()
+
+    def invalidate(self, version=None):
+        """
+        Drops every cached answer, e.g. after the knowledge index is rebuilt.
+
+        Args:
+            version (str, optional): Knowledge base version answers are cached for from now on.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.indexes.clear()
+            self.version = version
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "evictions": self.evictions,
+            "stale_puts": self.stale_puts,
+        }
@@ -1,13 +1,16 @@
 # API endpoints for accesing the API from Interface 
-import requests
 from dotenv import load_dotenv
 import os
+import sys
 import json
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.http_transport import get_transport, response_result
+
 load_dotenv()
 
 API_KEY = os.getenv("OPENAI_API_KEY")
-BASE_URL = os.getenv("API_BASE_URL")
+# Requests go through a pooled session to API_BASE_URL (or the Flask app itself with API_TRANSPORT=inprocess)
 
 
 # Create Appointment Endpoint
@@ -39,8 +42,8 @@ def add_appointment(data):
         
         
         # Eğer eksik parametre yoksa, API çağrısını yap
-        response = requests.post(f"{BASE_URL}/appointments", json=data)
-        return response.json()
+        response = get_transport().post("/appointments", json=data)
+        return response_result(response)
 
     except Exception as e:
         return {"error": str(e)}
@@ -89,8 +92,8 @@ def update_appointment(data):
             data["time"] = time
 
         # API Call
-        response = requests.put(f"{BASE_URL}/appointments/{appointment_id}", json=data)
-        return response.json()
+        response = get_transport().put(f"/appointments/{appointment_id}", json=data)
+        return response_result(response)
     except Exception as e:
         return {"error": str(e)}
 
@@ -117,8 +120,8 @@ def get_appointment_by_id(data):
             return {"error" : "Appointment ID is required"}
         
         # API Call
-        response = requests.get(f"{BASE_URL}/appointments/appointment_id/{appointment_id}")
-        return response.json()
+        response = get_transport().get(f"/appointments/appointment_id/{appointment_id}")
+        return response_result(response)
     except Exception as e:
         return {"error": str(e)}
 
@@ -140,7 +143,7 @@ def get_patient_info(data):
             return {"error" : "Personal ID is required."}
         
         # API Call
-        response = requests.get(f"{BASE_URL}/appointments/personal_id/{data["personal_id"]}")
+        response = get_transport().get(f"/appointments/personal_id/{data['personal_id']}")
         return response
     except Exception as e:
         return {"error": str(e)}
@@ -155,8 +158,8 @@ def get_all_appointments():
     """
     try:
         # API Call
-        response = requests.get(f"{BASE_URL}/appointments")
-        return response.json()
+        response = get_transport().get("/appointments")
+        return response_result(response)
     except Exception as e:
         return {"error": str(e)}
 
@@ -179,7 +182,7 @@ def delete_appointment(data):
         if not data["appointment_id"]:
             return {"error": "Appointment ID must required"}
         # API Call
-        response = requests.delete(f"{BASE_URL}/appointments/{data["appointment_id"]}")
-        return response
+        response = get_transport().delete(f"/appointments/{data['appointment_id']}")
+        return response_result(response)
     except Exception as e:
         return {"error": str(e)}
@@ -0,0 +1,202 @@
+'''
+ Asyncio version of the chatbot pipeline.
+ The query embedding and FAISS retrieval start speculatively while the
+ request is being analyzed, and are thrown away if the request turns out
+ not to be a medical question. This takes the embedding round trip off
+ the critical path of medical questions. The query is embedded once, for
+ both the retrieval and the centroid stage of the intent classifier, and
+ with RETRIEVAL_BATCH_WINDOW_MS retrievals go through the retrieval batcher.
+'''
+import ast
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+
+import numpy as np
+from openai import AsyncOpenAI
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.chatbot import (
+    API_KEY,
+    CONTEXT_CANDIDATES,
+    EMBEDDING_MODEL,
+    answer_cache,
+    build_analyze_messages,
+    build_med_messages,
+    candidate_count,
+    embedding_cache,
+    embedding_provider,
+    fuse_lexical_results,
+    get_knowledge_base,
+    intent_classifier,
+    retrieval_batcher,
+    search_similar_data_indexes,
+    select_context,
+)
+from backend.language import detect_language
+from backend.tracing import tracer
+
+async_client = AsyncOpenAI(api_key=API_KEY)
+
+# How speculative retrievals ended: used, discarded or failed
+speculation_counts = Counter()
+
+
+# Generate embedding for queries with the async client (shares the sync embedding cache)
+async def async_generate_embedding(query):
+    if not embedding_provider.cacheable:
+        with tracer.span("embedding"):
+            return await asyncio.to_thread(embedding_provider.embed_query, query)
+
+    embedding = embedding_cache.get(query, EMBEDDING_MODEL)
+    if embedding is not None:
+        return embedding
+
+    with tracer.span("embedding"):
+        response = await async_client.embeddings.create(
+            input=query,
+            model=EMBEDDING_MODEL
+        )
+    tracer.record_usage("embedding", response.usage)
+    embedding = np.array(response.data[0].embedding, dtype=np.float32)
+    embedding_cache.put(query, EMBEDDING_MODEL, embedding)
+    return embedding
+
+
+# Embed the query and search FAISS, returns (query embedding, vector candidates)
+# query_embedding: awaitable of the embedding if it is already being computed
+async def async_retrieve(query, faiss_index, k=CONTEXT_CANDIDATES, query_embedding=None):
+    if retrieval_batcher is not None:
+        # Embedded and searched in one batch with concurrent turns
+        return await asyncio.wrap_future(retrieval_batcher.submit(query, faiss_index, k=candidate_count(k)))
+    query_embedding = await (query_embedding or async_generate_embedding(query))
+    indexes = await asyncio.to_thread(search_similar_data_indexes, query_embedding, faiss_index, candidate_count(k))
+    return query_embedding, indexes
+
+
+# Analyze query's subject with the LLM
+async def async_llm_analyze_request(query):
+    with tracer.span("analyze_request"):
+        response = await async_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=build_analyze_messages(query),
+            response_format={"type": "json_object"}
+        )
+    tracer.record_usage("analyze_request", response.usage)
+    return ast.literal_eval(response.choices[0].message.content)
+
+
+# Analyze query's subject: local rules and centroids first, then the LLM
+# embedding: awaitable of the query embedding, reused by the centroid stage
+async def async_analyze_request(query, embedding=None):
+    return await intent_classifier.async_analyze(query, fallback=async_llm_analyze_request, embedding=embedding)
+
+
+# Query embedding out of a running retrieval
+async def _retrieved_embedding(retrieval):
+    query_embedding, _ = await retrieval
+    return query_embedding
+
+
+# Task whose failure is reported by whoever awaits it, not logged when nobody does (discarded speculation)
+def _speculative_task(coroutine):
+    task = asyncio.ensure_future(coroutine)
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+    return task
+
+
+async def async_analyze_with_speculative_retrieval(query, faiss_index):
+    """
+    Runs analysis and retrieval concurrently.
+
+    Returns:
+        tuple: (analysis dict, (query embedding, vector candidates) or None if not a medical question).
+    """
+    # One embedding of the query for the retrieval and the intent classifier
+    if retrieval_batcher is not None:
+        retrieval = _speculative_task(async_retrieve(query, faiss_index))
+        embedding = _speculative_task(_retrieved_embedding(retrieval))
+    else:
+        embedding = _speculative_task(async_generate_embedding(query))
+        retrieval = _speculative_task(async_retrieve(query, faiss_index, query_embedding=embedding))
+    try:
+        analysis = await async_analyze_request(query, embedding=embedding)
+    except BaseException:
+        retrieval.cancel()
+        embedding.cancel()
+        raise
+
+    if analysis.get("action") != "medical_question":
+        retrieval.cancel()
+        embedding.cancel()
+        speculation_counts["discarded"] += 1
+        return analysis, None
+
+    try:
+        retrieved = await retrieval
+    except Exception as e:
+        # The caller can still retrieve synchronously
+        print(f"Speculative retrieval failed: {e}")
+        speculation_counts["failed"] += 1
+        return analysis, None
+    speculation_counts["used"] += 1
+    return analysis, retrieved
+
+
+# Answer a medical question end to end with the async client
+async def async_handle_med_question(query, knowledge_base=None, retrieved=None):
+    knowledge_base = knowledge_base or get_knowledge_base()
+    if retrieved is None:
+        retrieved = await async_retrieve(query, knowledge_base.index)
+    query_embedding, indexes = retrieved
+
+    language = detect_language(query)
+    cached_response = answer_cache.lookup(query_embedding, language=language, version=knowledge_base.version)
+    if cached_response is not None:
+        return cached_response
+
+    indexes = fuse_lexical_results(query, indexes, k=CONTEXT_CANDIDATES, knowledge_base=knowledge_base)
+    indexes, context = select_context(query_embedding, indexes, knowledge_base.chunks, knowledge_base.index)
+    with tracer.span("med_response"):
+        response = await async_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=build_med_messages(query, context)
+        )
+    tracer.record_usage("med_response", response.usage)
+    answer = response.choices[0].message.content
+    answer_cache.put(query_embedding, indexes, answer, language=language, version=knowledge_base.version)
+    return answer
+
+
+tracer.register_stats("speculation", lambda: dict(speculation_counts))
+
+
+# Run a coroutine as part of the caller's traced turn
+async def _in_turn(coroutine, turn):
+    token = tracer.attach(turn)
+    try:
+        return await coroutine
+    finally:
+        tracer.detach(token)
+
+
+# Event loop in a background thread, lets synchronous code (Gradio handlers) use the async pipeline
+_loop = None
+_loop_lock = threading.Lock()
+
+def run_async(coroutine):
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-chatbot", daemon=True).start()
+    # Tasks don't inherit the context of the calling thread, pass the turn along
+    coroutine = _in_turn(coroutine, tracer.current_turn())
+    return asyncio.run_coroutine_threadsafe(coroutine, _loop).result()
+
+
+# Synchronous entry point for the speculative analysis
+def analyze_with_speculative_retrieval(query, faiss_index):
+    return run_async(async_analyze_with_speculative_retrieval(query, faiss_index))
@@ -0,0 +1,206 @@
+'''
+ Batched, rate-limit-aware embedding for index builds.
+ Texts are packed into requests by token count, requests run in parallel
+ under a concurrency limit that backs off on 429s and slow responses and
+ grows again while requests succeed, failed requests are retried with
+ exponential backoff, and throughput and cost are summarized at the end.
+'''
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.context_builder import count_tokens
+
+# Limits of one OpenAI embeddings request
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300000
+
+
+def token_batches(texts, max_tokens=100000, max_inputs=1024):
+    """
+    Packs texts into request sized batches.
+
+    Yields:
+        tuple: (positions in texts, texts, token count) of one request.
+    """
+    positions, batch, tokens = [], [], 0
+    for position, text in enumerate(texts):
+        text_tokens = count_tokens(text)
+        if batch and (tokens + text_tokens > max_tokens or len(batch) == max_inputs):
+            yield positions, batch, tokens
+            positions, batch, tokens = [], [], 0
+        positions.append(position)
+        batch.append(text)
+        tokens += text_tokens
+    if batch:
+        yield positions, batch, tokens
+
+
+# HTTP status of an API error (openai exceptions carry status_code), None for network errors
+def _status_code(error):
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error):
+    status = _status_code(error)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in (
+        "APIConnectionError", "APITimeoutError")
+
+
+# Seconds the server asked us to wait, if it said so
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """
+    Limit on in-flight requests, additive increase / multiplicative decrease.
+
+    Args:
+        initial (int): Starting limit.
+        minimum (int): Lowest limit.
+        maximum (int): Highest limit.
+        target_latency (float): Seconds; slower successful requests lower the limit by one.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=16, target_latency=20.0):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.active = 0
+        self.successes = 0
+        self.peak = initial
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+
+    def release(self, latency=None, rate_limited=False):
+        with self.condition:
+            self.active -= 1
+            if rate_limited:
+                self.limit = max(self.minimum, self.limit // 2)
+                self.successes = 0
+            elif latency is not None and latency > self.target_latency:
+                self.limit = max(self.minimum, self.limit - 1)
+                self.successes = 0
+            elif latency is not None:
+                # One step up after a full window of successful requests
+                self.successes += 1
+                if self.successes >= self.limit:
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self.successes = 0
+            self.peak = max(self.peak, self.limit)
+            self.condition.notify_all()
+
+
+class BatchEmbedder:
+    """
+    Embeds many texts with few, large, parallel requests.
+
+    Args:
+        provider (EmbeddingProvider): Provider whose embed() sends one request per call.
+        max_tokens (int): Token budget of one request.
+        max_inputs (int): Number of texts in one request.
+        concurrency (AdaptiveConcurrency, optional): Limit on parallel requests.
+        max_retries (int): Retries of a failed request before giving up.
+        backoff (float): First retry delay in seconds, doubled on every retry.
+        price_per_million_tokens (float): Used for the cost estimate.
+    """
+
+    def __init__(self, provider, max_tokens=100000, max_inputs=1024, concurrency=None, max_retries=6,
+                 backoff=1.0, price_per_million_tokens=0.02):
+        # Retries of the provider's client would hide rate limits from the concurrency control
+        self.provider = provider.without_retries() if hasattr(provider, "without_retries") else provider
+        self.max_tokens = min(max_tokens, MAX_TOKENS_PER_REQUEST)
+        self.max_inputs = min(max_inputs, MAX_INPUTS_PER_REQUEST)
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.price_per_million_tokens = price_per_million_tokens
+        self.lock = threading.Lock()
+        self.start = None
+        self.counts = {"requests": 0, "texts": 0, "tokens": 0, "retries": 0, "rate_limited": 0}
+
+    def _embed_request(self, texts, tokens):
+        for attempt in range(self.max_retries + 1):
+            self.concurrency.acquire()
+            start = time.perf_counter()
+            try:
+                vectors = self.provider.embed(texts)
+            except Exception as e:
+                rate_limited = _status_code(e) == 429
+                self.concurrency.release(rate_limited=rate_limited)
+                with self.lock:
+                    self.counts["rate_limited"] += rate_limited
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e) or self.backoff * 2 ** attempt
+                delay *= random.uniform(0.8, 1.2)
+                print(f"Embedding request failed ({e.__class__.__name__}), retrying in {delay:.1f} s")
+                with self.lock:
+                    self.counts["retries"] += 1
+                time.sleep(delay)
+                continue
+
+            self.concurrency.release(latency=time.perf_counter() - start)
+            # A short response would leave rows of embed() unset
+            if len(vectors) != len(texts):
+                raise ValueError(f"Embedding provider returned {len(vectors)} vectors for {len(texts)} texts.")
+            with self.lock:
+                self.counts["requests"] += 1
+                self.counts["texts"] += len(texts)
+                self.counts["tokens"] += tokens
+            return vectors
+
+    def embed(self, texts):
+        """
+        Embeds texts, returns a float32 array in the order of texts.
+        """
+        if self.start is None:
+            self.start = time.perf_counter()
+        batches = list(token_batches(texts, max_tokens=self.max_tokens, max_inputs=self.max_inputs))
+        results = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=self.concurrency.maximum) as executor:
+            futures = [(positions, executor.submit(self._embed_request, batch, tokens))
+                       for positions, batch, tokens in batches]
+            for positions, future in futures:
+                for position, vector in zip(positions, future.result()):
+                    results[position] = vector
+        return np.array(results, dtype=np.float32)
+
+    def stats(self):
+        seconds = time.perf_counter() - self.start if self.start is not None else 0.0
+        return {
+            **self.counts,
+            "seconds": seconds,
+            "texts_per_second": self.counts["texts"] / seconds if seconds else 0.0,
+            "tokens_per_second": self.counts["tokens"] / seconds if seconds else 0.0,
+            "estimated_cost_usd": self.counts["tokens"] / 1e6 * self.price_per_million_tokens,
+            "concurrency": self.concurrency.limit,
+            "peak_concurrency": self.concurrency.peak,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"Embedded {stats['texts']} texts ({stats['tokens']} tokens) in {stats['requests']} requests, "
+                f"{stats['seconds']:.1f} s, {stats['texts_per_second']:.1f} texts/s, "
+                f"{stats['tokens_per_second']:.0f} tokens/s, {stats['retries']} retries "
+                f"({stats['rate_limited']} rate limited), concurrency {stats['concurrency']} "
+                f"(peak {stats['peak_concurrency']}), estimated cost ${stats['estimated_cost_usd']:.4f}")
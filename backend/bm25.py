@@ -0,0 +1,321 @@
+'''
+ BM25 lexical index for hybrid retrieval.
+ Postings are stored as flat numpy arrays (CSR layout by term id),
+ built alongside the FAISS index in load_data.py and fused with
+ vector search results using reciprocal rank fusion. BM25Writer builds
+ the index file batch by batch with postings spilled to disk, so memory
+ stays flat however many chunks there are.
+
+ Benchmark against vector-only retrieval with:
+    python backend/bm25.py chunks.store data_index.faiss bm25.npz
+'''
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index held in numpy arrays.
+
+    Args:
+        terms (list): Vocabulary, position is the term id.
+        indptr (np.ndarray): Postings of term t are at indptr[t]:indptr[t + 1].
+        doc_ids (np.ndarray): Document id of each posting.
+        term_freqs (np.ndarray): Term frequency of each posting.
+        doc_lengths (np.ndarray): Number of tokens in each document.
+        max_df (float): Query terms in more than this share of documents are ignored.
+    """
+
+    def __init__(self, terms, indptr, doc_ids, term_freqs, doc_lengths, k1=1.5, b=0.75, max_df=0.5):
+        self.terms = terms
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+
+        n_docs = len(doc_lengths)
+        doc_freqs = np.diff(indptr)
+        self.idf = np.log1p((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        self.max_postings = max(1, int(max_df * n_docs))
+        # Per document length normalization, precomputed once
+        avg_length = doc_lengths.mean() if n_docs else 0.0
+        self.doc_norms = (k1 * (1 - b + b * doc_lengths / max(avg_length, 1e-9))).astype(np.float32)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, texts, **kwargs):
+        vocabulary = {}
+        term_ids, doc_ids, term_freqs, doc_lengths = [], [], [], []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc_id)
+                term_freqs.append(freq)
+
+        term_ids = np.array(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=indptr[1:])
+        return cls(
+            terms=list(vocabulary),
+            indptr=indptr,
+            doc_ids=np.array(doc_ids, dtype=np.int32)[order],
+            term_freqs=np.minimum(np.array(term_freqs), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+            doc_lengths=np.array(doc_lengths, dtype=np.float32),
+            **kwargs
+        )
+
+    def search(self, query, k=5):
+        """
+        Returns the top-k (scores, doc ids) for a query, best first.
+        """
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        postings = [(t, self.indptr[t], self.indptr[t + 1]) for t in term_ids
+                    if self.indptr[t + 1] - self.indptr[t] <= self.max_postings]
+        if not postings:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        doc_ids = np.concatenate([self.doc_ids[start:end] for _, start, end in postings])
+        term_freqs = np.concatenate([self.term_freqs[start:end] for _, start, end in postings]).astype(np.float32)
+        idf = np.repeat(self.idf[[t for t, _, _ in postings]], [end - start for _, start, end in postings])
+
+        weights = idf * term_freqs * (self.k1 + 1) / (term_freqs + self.doc_norms[doc_ids])
+        candidates, positions = np.unique(doc_ids, return_inverse=True)
+        scores = np.bincount(positions, weights=weights).astype(np.float32)
+
+        top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return scores[top], candidates[top].astype(np.int64)
+
+    def save(self, path):
+        np.savez(
+            path,
+            terms=np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths,
+            params=np.array([self.k1, self.b, self.max_df]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            terms = data["terms"].tobytes().decode("utf-8")
+            k1, b, max_df = data["params"]
+            return cls(
+                terms=terms.split("\n") if terms else [],
+                indptr=data["indptr"],
+                doc_ids=data["doc_ids"],
+                term_freqs=data["term_freqs"],
+                doc_lengths=data["doc_lengths"],
+                k1=float(k1), b=float(b), max_df=float(max_df),
+            )
+
+
+class BM25Writer:
+    """
+    Writes a BM25Index file (same format as BM25Index.save) batch by batch.
+
+    Postings of every batch_size documents are counted and written to a
+    temporary segment file next to path. On close, the segments are merged
+    into the CSR arrays with a counting sort into memory-mapped files, so
+    only the vocabulary and one segment are held in memory. The result is
+    identical to BM25Index.build over the same texts.
+
+    Args:
+        path (str): Output file (bm25.npz).
+        batch_size (int): Documents per segment.
+    """
+
+    def __init__(self, path, batch_size=65536, k1=1.5, b=0.75, max_df=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.params = np.array([k1, b, max_df])
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="bm25-", dir=os.path.dirname(os.path.abspath(path)))
+        self.vocabulary = {}
+        self.term_counts = np.zeros(0, dtype=np.int64)
+        self.segments = []
+        self.documents = 0
+        self._reset()
+
+    def _reset(self):
+        self.term_ids, self.doc_ids, self.term_freqs, self.doc_lengths = [], [], [], []
+
+    def add(self, text):
+        tokens = tokenize(text)
+        self.doc_lengths.append(len(tokens))
+        for term, freq in Counter(tokens).items():
+            self.term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+            self.doc_ids.append(self.documents)
+            self.term_freqs.append(freq)
+        self.documents += 1
+        if len(self.doc_lengths) == self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.doc_lengths:
+            return
+        term_ids = np.array(self.term_ids, dtype=np.int32)
+        counts = np.bincount(term_ids, minlength=len(self.vocabulary))
+        counts[:len(self.term_counts)] += self.term_counts
+        self.term_counts = counts
+        segment = os.path.join(self.tmp_dir.name, f"segment-{len(self.segments)}.npz")
+        np.savez(
+            segment,
+            term_ids=term_ids,
+            doc_ids=np.array(self.doc_ids, dtype=np.int32),
+            term_freqs=np.minimum(np.array(self.term_freqs), np.iinfo(np.uint16).max).astype(np.uint16),
+            doc_lengths=np.array(self.doc_lengths, dtype=np.float32),
+        )
+        self.segments.append(segment)
+        self._reset()
+
+    def _merge(self):
+        indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(self.term_counts, out=indptr[1:])
+        n_postings = int(indptr[-1])
+
+        def output(name, dtype, length):
+            return np.lib.format.open_memmap(os.path.join(self.tmp_dir.name, f"{name}.npy"), mode="w+",
+                                             dtype=dtype, shape=(length,))
+
+        doc_ids = output("doc_ids", np.int32, n_postings)
+        term_freqs = output("term_freqs", np.uint16, n_postings)
+        doc_lengths = output("doc_lengths", np.float32, self.documents)
+        # Next free posting of each term; segments come in document order, so postings stay sorted by document
+        cursor = indptr[:-1].copy()
+        first_doc = 0
+        for segment in self.segments:
+            with np.load(segment) as data:
+                order = np.argsort(data["term_ids"], kind="stable")
+                terms = data["term_ids"][order]
+                segment_terms, starts, counts = np.unique(terms, return_index=True, return_counts=True)
+                positions = cursor[terms] + np.arange(len(terms)) - np.repeat(starts, counts)
+                doc_ids[positions] = data["doc_ids"][order]
+                term_freqs[positions] = data["term_freqs"][order]
+                cursor[segment_terms] += counts
+                lengths = data["doc_lengths"]
+                doc_lengths[first_doc:first_doc + len(lengths)] = lengths
+                first_doc += len(lengths)
+        return indptr, doc_ids, term_freqs, doc_lengths
+
+    def close(self):
+        self._flush()
+        indptr, doc_ids, term_freqs, doc_lengths = self._merge()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.frombuffer("\n".join(self.vocabulary).encode("utf-8"), dtype=np.uint8),
+                indptr=indptr,
+                doc_ids=doc_ids,
+                term_freqs=term_freqs,
+                doc_lengths=doc_lengths,
+                params=self.params,
+            )
+        os.replace(tmp_path, self.path)
+        del doc_ids, term_freqs, doc_lengths
+        self.tmp_dir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.tmp_dir.cleanup()
+
+
+def reciprocal_rank_fusion(rankings, k=60, limit=None):
+    """
+    Fuses several rankings of document ids, best first.
+
+    Args:
+        rankings (list): Lists of document ids, each ordered best first. FAISS -1 padding is ignored.
+        k (int): RRF damping constant.
+        limit (int, optional): Number of fused ids to return.
+
+    Returns:
+        list: Fused document ids, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            doc_id = int(doc_id)
+            if doc_id >= 0:
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return fused[:limit] if limit else fused
+
+
+def main():
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import faiss
+    from backend.chunk_store import load_chunk_store
+    from backend.embeddings import get_embedding_provider, make_probe_queries, hit_rate
+
+    parser = argparse.ArgumentParser(description="Benchmark hybrid BM25 + vector retrieval against vector-only.")
+    parser.add_argument("chunks", help="Path to chunks.store")
+    parser.add_argument("faiss_index", help="Path to the FAISS index built from the same chunks")
+    parser.add_argument("bm25", help="Path to bm25.npz (built from chunks if missing)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=20)
+    args = parser.parse_args()
+
+    store = load_chunk_store(args.chunks)
+    texts = [store[i] for i in range(len(store))]
+    if not os.path.exists(args.bm25):
+        BM25Index.build(texts).save(args.bm25)
+    bm25_index = BM25Index.load(args.bm25)
+    faiss_index = faiss.read_index(args.faiss_index)
+    provider = get_embedding_provider()
+
+    queries, expected = make_probe_queries(texts, args.queries)
+    query_embeddings = provider.embed(queries)
+
+    vector_results, lexical_results, hybrid_results, latencies = [], [], [], []
+    for query, query_embedding in zip(queries, query_embeddings):
+        _, vector_indexes = faiss_index.search(query_embedding.reshape(1, -1), args.candidates)
+        start = time.perf_counter()
+        _, lexical_indexes = bm25_index.search(query, args.candidates)
+        fused = reciprocal_rank_fusion([vector_indexes[0], lexical_indexes], limit=args.k)
+        latencies.append(time.perf_counter() - start)
+
+        vector_results.append(vector_indexes[0][:args.k])
+        lexical_results.append(lexical_indexes[:args.k])
+        hybrid_results.append(fused)
+
+    print(f"Documents: {len(bm25_index)}, vocabulary: {len(bm25_index.terms)}, queries: {len(queries)}")
+    print(f"hit@{args.k} vector-only: {hit_rate(vector_results, expected):.3f}")
+    print(f"hit@{args.k} bm25-only:   {hit_rate(lexical_results, expected):.3f}")
+    print(f"hit@{args.k} hybrid:      {hit_rate(hybrid_results, expected):.3f}")
+    print(f"Added latency per query (BM25 + fusion): p50 {np.percentile(latencies, 50) * 1000:.3f} ms, "
+          f"p99 {np.percentile(latencies, 99) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
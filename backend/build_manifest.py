@@ -0,0 +1,114 @@
+'''
+ Manifest of an incremental knowledge index build.
+ A SQLite file that records every chunk by content hash together with its
+ embedding and whether it has reached the chunk store and FAISS index yet.
+ Each embedded batch is committed as it comes, so a crashed build resumes
+ from the last checkpoint, and chunks seen before are never embedded again.
+'''
+import hashlib
+import sqlite3
+
+import numpy as np
+
+# SQLite limits the number of parameters of one statement
+QUERY_BATCH = 500
+
+
+# Content hash identifying a chunk
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class BuildManifest:
+    """
+    Chunks of the knowledge index, keyed by content hash.
+
+    Chunk ids are dense and assigned in insertion order, so a chunk's id is
+    both its row in the chunk store and its id in the FAISS IndexIDMap.
+
+    Args:
+        db_path (str): SQLite file.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS chunks (
+            id INTEGER PRIMARY KEY,
+            hash TEXT UNIQUE NOT NULL,
+            text TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            indexed INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.connection.commit()
+
+    def check(self, key, value):
+        """
+        Records a build setting, or raises ValueError if the manifest was built with another value.
+        """
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.connection.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+            self.connection.commit()
+        elif row[0] != str(value):
+            raise ValueError(f"{self.db_path} was built with {key}={row[0]}, not {value}. "
+                             f"Use another output directory or remove it to rebuild from scratch.")
+
+    # Hashes among the given ones that are already in the manifest
+    def known(self, hashes):
+        hashes = list(hashes)
+        found = set()
+        for start in range(0, len(hashes), QUERY_BATCH):
+            part = hashes[start:start + QUERY_BATCH]
+            rows = self.connection.execute(
+                f"SELECT hash FROM chunks WHERE hash IN ({','.join('?' * len(part))})", part
+            )
+            found.update(row[0] for row in rows)
+        return found
+
+    def add(self, hashes, texts, embeddings):
+        """
+        Checkpoints new chunks and their embeddings in one transaction.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        next_id = len(self)
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO chunks (id, hash, text, embedding) VALUES (?, ?, ?, ?)",
+                [(next_id + i, h, text, embeddings[i].tobytes()) for i, (h, text) in enumerate(zip(hashes, texts))]
+            )
+
+    def pending(self, batch_size=4096):
+        """
+        Chunks not in the chunk store and index yet, in id order.
+
+        Yields:
+            tuple: (ids as np.ndarray, texts, embeddings as np.ndarray)
+        """
+        last_id = -1
+        while True:
+            rows = self.connection.execute(
+                "SELECT id, text, embedding FROM chunks WHERE indexed = 0 AND id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield (np.array([row[0] for row in rows], dtype=np.int64),
+                   [row[1] for row in rows],
+                   np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows]))
+
+    def pending_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM chunks WHERE indexed = 0").fetchone()[0]
+
+    def mark_indexed(self):
+        with self.connection:
+            self.connection.execute("UPDATE chunks SET indexed = 1 WHERE indexed = 0")
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -3,20 +3,31 @@ from openai import OpenAI
 import numpy as np
 from dotenv import load_dotenv
 import ast
+import json
 import os
 import sys
-import pandas as pd
-from langchain.memory.buffer import ConversationBufferMemory
-from langchain.schema import Document
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.agents import initialize_agent, AgentType, Tool
+import threading
+import time
+from collections import OrderedDict, deque
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from backend.api_endpoints import add_appointment, get_all_appointments, get_appointment_by_id, update_appointment, delete_appointment
-
-agent_prompt = PromptTemplate(
-    input_variables=["input"],
-    template="""
+from backend.chunk_store import load_chunk_store
+from backend.knowledge_base import KnowledgeBase, KnowledgeBaseManager, load_bundle
+from backend.embedding_cache import EmbeddingCache
+from backend.answer_cache import SemanticAnswerCache
+from backend.language import detect_language
+from backend.index_factory import configure_search, prepare_reconstruct, reconstruct_vectors
+from backend.sharded_index import read_index
+from backend.context_builder import build_context
+from backend.retrieval_batcher import RetrievalBatcher
+from backend.embeddings import get_embedding_provider
+from backend.bm25 import BM25Index, reciprocal_rank_fusion
+from backend.intent_classifier import IntentClassifier
+from backend.dispatcher import ToolDispatcher
+from backend.tracing import tracer
+
+# Agent prompt, wrapped in a PromptTemplate when the agent is created
+agent_prompt_template = """
         You are an AI assistant that helps users schedule, update, and manage appointments via API calls.  
         When a user makes a request, check if all necessary parameters are provided.  
         - If any required parameter is missing, ask the user for the missing information before making the API call. 
@@ -45,42 +56,238 @@ agent_prompt = PromptTemplate(
 
     User Query: {input}
     """
-)
 
 load_dotenv()
 
-faiss_path = "C:/Users/sevva/Documents/GitHub/healthcare_chatbot/data_index.faiss" # Use your own path to file
-chunks_path = "C:/Users/sevva/Documents/GitHub/healthcare_chatbot/chunks.csv" # Use your own path to file
+# Knowledge base: versioned bundles in KNOWLEDGE_BASE_DIR (written by load_data.py --bundle-root), a newly
+# published bundle is swapped in without a restart (CURRENT is checked every KNOWLEDGE_BASE_WATCH_SECONDS)
+KNOWLEDGE_BASE_DIR = os.getenv("KNOWLEDGE_BASE_DIR", "")
+KNOWLEDGE_BASE_WATCH_SECONDS = float(os.getenv("KNOWLEDGE_BASE_WATCH_SECONDS", "30"))
+KNOWLEDGE_BASE_VERIFY = os.getenv("KNOWLEDGE_BASE_VERIFY", "1") == "1"
+# Without bundles, the files load_data.py writes to the repository root (or FAISS_PATH, CHUNKS_PATH, BM25_PATH)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+faiss_path = os.getenv("FAISS_PATH", os.path.join(ROOT_DIR, "data_index.faiss"))
+chunks_path = os.getenv("CHUNKS_PATH", os.path.join(ROOT_DIR, "chunks.store"))
+bm25_path = os.getenv("BM25_PATH", os.path.join(ROOT_DIR, "bm25.npz"))
 
 API_KEY = os.getenv("OPENAI_API_KEY")
 BASE_URL = os.getenv("API_BASE_URL")
 client = OpenAI(api_key=API_KEY)
 
-# Load embeded indexes from faiss 
-def load_faiss_index(faiss_path):
-    index = faiss.read_index(faiss_path)
-    return index
+# Embedding provider (EMBEDDING_PROVIDER=openai or local), must match the one used to build the index
+embedding_provider = get_embedding_provider(client=client)
+EMBEDDING_MODEL = embedding_provider.name
+# Query embedding cache (in-memory LRU + SQLite file, set EMBEDDING_CACHE_PATH empty to disable disk)
+embedding_cache = EmbeddingCache(
+    db_path=os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db"),
+    max_items=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+)
+# Semantic cache for medical answers (similar questions reuse the answer)
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1000")),
+)
+
+# Retrieval mode: vector (FAISS only) or hybrid (FAISS + BM25 fused with reciprocal rank fusion)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
+# Context assembly: candidates considered, chunks kept, token budget and MMR relevance/diversity balance
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "10"))
+CONTEXT_MAX_CHUNKS = int(os.getenv("CONTEXT_MAX_CHUNKS", "5"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+context_reports = deque(maxlen=1000)
+
+# Heavy components (knowledge base, agent) are created on first use, once per process
+_resources = {}
+# Reentrant: a factory may get other resources (the agent gets the shared LLM and tools)
+_resources_lock = threading.RLock()
+
+def _get_resource(name, factory):
+    resource = _resources.get(name)
+    if resource is None:
+        with _resources_lock:
+            resource = _resources.get(name)
+            if resource is None:
+                resource = _resources[name] = factory()
+    return resource
+
+# Load the knowledge base bundle in bundle_dir (the configured files when None)
+def load_knowledge_base(bundle_dir=None):
+    if bundle_dir is None:
+        return KnowledgeBase(
+            version="paths",
+            index=load_faiss_index(faiss_path),
+            chunks=load_chunk_store(chunks_path),
+            bm25=BM25Index.load(bm25_path) if RETRIEVAL_MODE == "hybrid" else None,
+        ).check()
+    return load_bundle(bundle_dir, load_faiss_index, load_bm25=RETRIEVAL_MODE == "hybrid",
+                       checksums=KNOWLEDGE_BASE_VERIFY, embedding_model=EMBEDDING_MODEL)
+
+knowledge_base_manager = KnowledgeBaseManager(load_knowledge_base, root=KNOWLEDGE_BASE_DIR or None)
+# Cached answers were built from the previous knowledge base; turns still on it can't add to the cache
+knowledge_base_manager.swap_listeners.append(lambda knowledge_base: answer_cache.invalidate(version=knowledge_base.version))
+
+# Live knowledge base; a request should get it once and use it throughout
+def get_knowledge_base():
+    knowledge_base = knowledge_base_manager.current()
+    if KNOWLEDGE_BASE_WATCH_SECONDS > 0:
+        knowledge_base_manager.watch(KNOWLEDGE_BASE_WATCH_SECONDS)
+    return knowledge_base
+
+# Load a published bundle (the one CURRENT names by default) and swap it in, returns whether it was swapped
+def reload_knowledge_base(version=None):
+    return knowledge_base_manager.reload(version)
+
+def get_faiss_index():
+    return get_knowledge_base().index
+
+def get_bm25_index():
+    if RETRIEVAL_MODE != "hybrid":
+        return None
+    return get_knowledge_base().bm25
+
+# Agent memory: window (last AGENT_MEMORY_WINDOW exchanges) or summary (rolling summary above AGENT_MEMORY_TOKENS)
+AGENT_MEMORY = os.getenv("AGENT_MEMORY", "window")
+AGENT_MEMORY_WINDOW = int(os.getenv("AGENT_MEMORY_WINDOW", "5"))
+AGENT_MEMORY_TOKENS = int(os.getenv("AGENT_MEMORY_TOKENS", "1000"))
+# Agents of sessions, least recently used first (dropped when their session expires, capped as a safety net)
+AGENT_MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "1000"))
+session_agents = OrderedDict()
+_session_agents_lock = threading.Lock()
+
+# Agent of a session (the shared default agent without a session id)
+def get_agent(session_id=None):
+    if session_id is None:
+        return _get_resource("agent", create_agent)
+    with _session_agents_lock:
+        agent = session_agents.get(session_id)
+        if agent is not None:
+            session_agents.move_to_end(session_id)
+            return agent
+    agent = create_agent()
+    with _session_agents_lock:
+        agent = session_agents.setdefault(session_id, agent)
+        while len(session_agents) > AGENT_MAX_SESSIONS:
+            session_agents.popitem(last=False)
+    return agent
+
+# Forget the agent (and its memory) of an expired session
+def drop_session_agent(session_id):
+    with _session_agents_lock:
+        session_agents.pop(session_id, None)
+
+# Load every component now instead of on the first request, returns load time per component.
+# Agents are per session, only the LLM and tools they share are created ahead
+def warm_up():
+    timings = {}
+    for name, load in [
+        ("knowledge_base", get_knowledge_base),
+        ("agent_llm", lambda: _get_resource("agent_llm", create_agent_llm)),
+        ("agent_tools", lambda: _get_resource("agent_tools", create_agent_tools)),
+    ]:
+        start = time.perf_counter()
+        load()
+        timings[name] = time.perf_counter() - start
+    print("Warm-up: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()))
+    return timings
+
+# Load embeded indexes from faiss (sharded indexes are searched on one thread per shard)
+def load_faiss_index(faiss_path, nprobe=None, ef_search=None, mmap=None, threaded=None):
+    threaded = threaded if threaded is not None else os.getenv("FAISS_SHARDS_THREADED", "1") == "1"
+    # Memory-map the index file instead of reading it (pages are shared between worker processes)
+    if mmap if mmap is not None else os.getenv("FAISS_MMAP", "0") == "1":
+        index = read_index(faiss_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY, threaded=threaded)
+    else:
+        index = read_index(faiss_path, threaded=threaded)
+    # Search tunables for approximate indexes (IVF nprobe, HNSW efSearch)
+    configure_search(
+        index,
+        nprobe=nprobe or int(os.getenv("FAISS_NPROBE", "0")),
+        ef_search=ef_search or int(os.getenv("FAISS_EF_SEARCH", "0")),
+    )
+    # Context selection reconstructs stored vectors, IVF indexes get their direct map before they are shared
+    return prepare_reconstruct(index)
 
-# Generate embedding for queries
+# Generate embedding for queries (cached by normalized text and model)
 def generate_embedding(query):
-    response = client.embeddings.create(
-        input = query,
-        model="text-embedding-3-small"
+    if not embedding_provider.cacheable:
+        with tracer.span("embedding"):
+            return embedding_provider.embed_query(query)
+
+    embedding = embedding_cache.get(query, EMBEDDING_MODEL)
+    if embedding is not None:
+        return embedding
+
+    # float32 numpy array
+    with tracer.span("embedding"):
+        embedding = embedding_provider.embed_query(query)
+    embedding_cache.put(query, EMBEDDING_MODEL, embedding)
+    return embedding
+
+# Generate embeddings for many queries with one provider call (cached ones are skipped)
+def generate_embeddings(queries):
+    if not embedding_provider.cacheable:
+        with tracer.span("embedding"):
+            return embedding_provider.embed(queries)
+
+    embeddings = [embedding_cache.get(query, EMBEDDING_MODEL) for query in queries]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+    if missing:
+        with tracer.span("embedding"):
+            new_embeddings = embedding_provider.embed([queries[i] for i in missing])
+        for i, embedding in zip(missing, new_embeddings):
+            embeddings[i] = embedding
+            embedding_cache.put(queries[i], EMBEDDING_MODEL, embedding)
+
+    return np.vstack(embeddings)
+
+# Coalesce concurrent retrievals into batched embedding + FAISS calls (disabled when window is 0)
+retrieval_batcher = None
+if float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS", "0")) > 0:
+    retrieval_batcher = RetrievalBatcher(
+        embed_batch=generate_embeddings,
+        window_ms=float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS")),
+        max_batch_size=int(os.getenv("RETRIEVAL_MAX_BATCH_SIZE", "32")),
     )
-    # return as numpy array
-    return np.array(response.data[0].embedding)
+
+# Search similar data indexes for an already computed query embedding
+def search_similar_data_indexes(query_embedding, faiss_index, k=5):
+    with tracer.span("faiss_search"):
+        distance, indexes = faiss_index.search(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1), k=k)
+    return indexes[0]
+
+# Number of vector results to fetch before fusion
+def candidate_count(k):
+    return max(k, HYBRID_CANDIDATES) if RETRIEVAL_MODE == "hybrid" else k
+
+# Fuse vector results with BM25 results (vector results are returned as is in vector mode)
+def fuse_lexical_results(query, vector_indexes, k=5, knowledge_base=None):
+    bm25_index = (knowledge_base or get_knowledge_base()).bm25 if RETRIEVAL_MODE == "hybrid" else None
+    if bm25_index is None:
+        return vector_indexes[:k]
+    with tracer.span("bm25_search"):
+        _, lexical_indexes = bm25_index.search(query, k=candidate_count(k))
+    return np.array(reciprocal_rank_fusion([vector_indexes, lexical_indexes], limit=k), dtype=np.int64)
 
 # Find smilar data indexes to query (Retrieval)
 def retrieve_similar_data_indexes(query, faiss_index, k=5):
+    if retrieval_batcher is not None:
+        indexes = retrieval_batcher.retrieve(query, faiss_index, k=candidate_count(k))[1]
+        return fuse_lexical_results(query, indexes, k=k)
+
     # Generate embedding for query
     query_embedding = generate_embedding(query)
 
     # Search for similar data indexes
-    distance, indexes = faiss_index.search(np.array([query_embedding]), k=k)
-    return indexes[0]
+    indexes = search_similar_data_indexes(query_embedding, faiss_index, k=candidate_count(k))
+    return fuse_lexical_results(query, indexes, k=k)
 
-# Analyze query's subject 
-def analyze_request(query):
+# Chat messages for analyzing the query's subject
+def build_analyze_messages(query):
     prompt = f"""
     You are a medical assistant and appointment management system. Analyze the user's request and determine the following:
     1. What action is requested? (add_appointment, get_appointment_by_id, update_appointment, delete_appointment, get_all_appointments or medical_question)
@@ -99,24 +306,78 @@ def analyze_request(query):
     - If the user asks a medical question: {{"action": "medical_question"}}
     - If the request is invalid: {{"action": "invalid"}}
     """
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": prompt}
+    ]
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        response_format={"type": "json_object"}
-    )
+# Analyze query's subject 
+def analyze_request(query):
+    with tracer.span("analyze_request"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=build_analyze_messages(query),
+            response_format={"type": "json_object"}
+        )
+    tracer.record_usage("analyze_request", response.usage)
     return ast.literal_eval(response.choices[0].message.content)
 
-# Generate medical response response using RAG and OpenAI
-def generate_med_response(query, similar_indexes, chunks):
+# Local intent classifier, answers confident cases without analyze_request
+intent_classifier = IntentClassifier(
+    embed=generate_embeddings if os.getenv("INTENT_CENTROID_STAGE", "1") == "1" else None,
+    threshold=float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.85")),
+)
 
-    # Prepare the context from similar documents
-    context = "\n".join([chunks[i].page_content for i in similar_indexes])
-    print("CONTEXT: \n",context)
+# Analyze query's subject, using the local fast path when it is confident
+def fast_analyze_request(query):
+    return intent_classifier.analyze(query, fallback=analyze_request)
 
+# Time to first token and total latency of recent streamed completions
+stream_timings = deque(maxlen=1000)
+
+# Stream a chat completion, yields text deltas as they arrive
+def stream_chat_completion(messages, stage):
+    start = time.perf_counter()
+    first_token = None
+    stream = client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    for chunk in stream:
+        # The last chunk carries the token usage and no choices
+        if chunk.usage is not None:
+            tracer.record_usage(stage, chunk.usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            yield delta
+
+    total = time.perf_counter() - start
+    stream_timings.append((stage, first_token if first_token is not None else total, total))
+    tracer.observe(f"{stage}_ttft", first_token if first_token is not None else total)
+    tracer.observe(stage, total)
+    print(f"[{stage}] TTFT: {stream_timings[-1][1] * 1000:.0f} ms, total: {total * 1000:.0f} ms")
+
+# p50 time to first token against p50 total latency per stage
+def stream_timing_stats():
+    stats = {}
+    for stage in {timing[0] for timing in stream_timings}:
+        ttfts = sorted(t[1] for t in stream_timings if t[0] == stage)
+        totals = sorted(t[2] for t in stream_timings if t[0] == stage)
+        stats[stage] = {
+            "count": len(ttfts),
+            "p50_ttft_ms": ttfts[len(ttfts) // 2] * 1000,
+            "p50_total_ms": totals[len(totals) // 2] * 1000,
+        }
+    return stats
+
+# Chat messages for answering a medical question with the retrieved context
+def build_med_messages(query, context):
     # Prepare the prompt for OpenAI
     prompt = f"""
     You are a medical assistant. Answer the following question based on the provided context. 
@@ -130,34 +391,113 @@ def generate_med_response(query, similar_indexes, chunks):
     {context}
     """
 
+    return [
+        {"role": "system", "content": f"You are a helpful medical assistant.Answer the questions based on {prompt}"},
+        {"role": "user", "content": query}
+    ]
+
+# Select chunks for the prompt: MMR over stored vectors, overlap removal, token budget
+def select_context(query_embedding, candidate_indexes, chunks, faiss_index):
+    with tracer.span("context"):
+        indexes, context, report = build_context(
+            query_embedding,
+            candidate_indexes,
+            chunks,
+            get_vectors=lambda ids: reconstruct_vectors(faiss_index, ids),
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            max_chunks=CONTEXT_MAX_CHUNKS,
+            lambda_=CONTEXT_MMR_LAMBDA,
+        )
+    context_reports.append(report)
+    print(f"Context: {report['chunks']} chunks, {report['context_tokens']} tokens ({report['tokens_saved']} saved)")
+    return indexes, context
+
+# Average tokens saved per request by the context builder
+def context_stats():
+    if not context_reports:
+        return {"requests": 0, "avg_context_tokens": 0.0, "avg_tokens_saved": 0.0}
+    return {
+        "requests": len(context_reports),
+        "avg_context_tokens": sum(r["context_tokens"] for r in context_reports) / len(context_reports),
+        "avg_tokens_saved": sum(r["tokens_saved"] for r in context_reports) / len(context_reports),
+    }
+
+# Generate medical response response using RAG and OpenAI (a token generator if stream=True)
+# context: prepared context text, the similar documents are concatenated if not given
+def generate_med_response(query, similar_indexes, chunks, stream=False, context=None):
+
+    # Prepare the context from similar documents
+    if context is None:
+        context = "\n".join(chunks.get_many(similar_indexes))
+    print("CONTEXT: \n",context)
+
+    messages = build_med_messages(query, context)
+    # Stream tokens as a generator
+    if stream:
+        return stream_chat_completion(messages, stage="med_response")
+
     # Generate response using OpenAI
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": f"You are a helpful medical assistant.Answer the questions based on {prompt}"},
-            {"role": "user", "content": query}
-        ]
-    )
+    with tracer.span("med_response"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages
+        )
+    tracer.record_usage("med_response", response.usage)
     return response.choices[0].message.content
 
-# Get chunks from csv 
-def get_chunks(csv_path):
-    chunks_df = pd.read_csv(csv_path)
-    chunks = [Document(page_content=row["chunk"]) for _, row in chunks_df.iterrows()]
-    return chunks  
-
-# Answer the medical question 
-def handle_med_question(query, faiss_index, chunk_path):
-    indexes = retrieve_similar_data_indexes(query=query, faiss_index=faiss_index)
-    chunks = get_chunks(chunk_path)
-    response = generate_med_response(query=query, similar_indexes=indexes, chunks=chunks)
+# Pass streamed tokens through and cache the full answer at the end
+def stream_and_cache_answer(tokens, query_embedding, indexes, language=None, version=None):
+    parts = []
+    for token in tokens:
+        parts.append(token)
+        yield token
+    answer_cache.put(query_embedding, indexes, "".join(parts), language=language, version=version)
+
+# Answer the medical question (a token generator if stream=True)
+# knowledge_base: the one the turn started with (the live one if not given)
+# retrieved: (query embedding, vector candidates) when retrieval already ran, e.g. speculatively
+def handle_med_question(query, knowledge_base=None, stream=False, retrieved=None):
+    knowledge_base = knowledge_base or get_knowledge_base()
+    faiss_index = knowledge_base.index
+    indexes = None
+    if retrieved is not None:
+        query_embedding, indexes = retrieved
+    elif retrieval_batcher is not None:
+        query_embedding, indexes = retrieval_batcher.retrieve(query, faiss_index, k=candidate_count(CONTEXT_CANDIDATES))
+    else:
+        query_embedding = generate_embedding(query)
+
+    # Return the cached answer of a near-identical question asked in the same language
+    language = detect_language(query)
+    cached_response = answer_cache.lookup(query_embedding, language=language, version=knowledge_base.version)
+    if cached_response is not None:
+        return iter([cached_response]) if stream else cached_response
+
+    if indexes is None:
+        indexes = search_similar_data_indexes(query_embedding, faiss_index, k=candidate_count(CONTEXT_CANDIDATES))
+    indexes = fuse_lexical_results(query, indexes, k=CONTEXT_CANDIDATES, knowledge_base=knowledge_base)
+    chunks = knowledge_base.chunks
+    indexes, context = select_context(query_embedding, indexes, chunks, faiss_index)
+    if stream:
+        tokens = generate_med_response(query=query, similar_indexes=indexes, chunks=chunks, stream=True, context=context)
+        return stream_and_cache_answer(tokens, query_embedding, indexes, language=language,
+                                       version=knowledge_base.version)
+
+    response = generate_med_response(query=query, similar_indexes=indexes, chunks=chunks, context=context)
+    answer_cache.put(query_embedding, indexes, response, language=language, version=knowledge_base.version)
     return response
 
 # Create an Agent for API requests
-def create_agent():
-    llm = ChatOpenAI(model_name="gpt-3.5-turbo", api_key=API_KEY)
-    # Define the tools
-    tools = [
+# LLM shared by every session's agent
+def create_agent_llm():
+    # LangChain is imported here so importing the chatbot stays fast
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model_name="gpt-3.5-turbo", api_key=API_KEY)
+
+# Tools shared by every session's agent
+def create_agent_tools():
+    from langchain.agents import Tool
+    return [
         Tool(
             name="add_appointment",
             func=lambda data: add_appointment(data),
@@ -185,7 +525,25 @@ def create_agent():
         )
     ]
 
-    memory_assignment = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+# Bounded conversation memory of one session: last AGENT_MEMORY_WINDOW exchanges, or a rolling summary
+def create_agent_memory(llm):
+    if AGENT_MEMORY == "summary":
+        from langchain.memory import ConversationSummaryBufferMemory
+        return ConversationSummaryBufferMemory(
+            llm=llm, max_token_limit=AGENT_MEMORY_TOKENS, memory_key="chat_history", return_messages=True
+        )
+    from langchain.memory import ConversationBufferWindowMemory
+    return ConversationBufferWindowMemory(k=AGENT_MEMORY_WINDOW, memory_key="chat_history", return_messages=True)
+
+# Agent with its own memory, the LLM and tools are shared
+def create_agent():
+    from langchain.prompts import PromptTemplate
+    from langchain.agents import initialize_agent, AgentType
+
+    agent_prompt = PromptTemplate(input_variables=["input"], template=agent_prompt_template)
+    llm = _get_resource("agent_llm", create_agent_llm)
+    tools = _get_resource("agent_tools", create_agent_tools)
+    memory_assignment = create_agent_memory(llm)
 
     # Agent'ı başlatın
     agent = initialize_agent(
@@ -201,20 +559,55 @@ def create_agent():
 
     return agent
 
-# Generate answer for invalid questions
-def invalid_question(query):
+# Appointment actions with complete parameters call the API directly, without the agent
+tool_dispatcher = ToolDispatcher({
+    "add_appointment": add_appointment,
+    "update_appointment": update_appointment,
+    "delete_appointment": delete_appointment,
+    "get_all_appointments": get_all_appointments,
+    "get_appointment_by_id": get_appointment_by_id,
+})
+
+# Run an appointment action, the agent only handles actions the dispatcher doesn't know
+def run_appointment_action(data, session_id=None):
+    with tracer.span("dispatch"):
+        response = tool_dispatcher.dispatch(data)
+    if response is None:
+        with tracer.span("agent"):
+            response = get_agent(session_id).invoke({"input": json.dumps(data)})["output"]
+    return response
+
+# Generate answer for invalid questions (a token generator if stream=True)
+def invalid_question(query, stream=False):
     prompt = f"""
         Generate a polite response same language with the {query} that you don't know the subject.
         """
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-    )
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": prompt}
+    ]
+    if stream:
+        return stream_chat_completion(messages, stage="invalid_question")
+
+    with tracer.span("invalid_question"):
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+        )
+    tracer.record_usage("invalid_question", response.usage)
     return response.choices[0].message.content
 
+# Cache hit rates and other component counters exported by the tracer
+tracer.register_stats("embedding_cache", embedding_cache.stats)
+tracer.register_stats("answer_cache", answer_cache.stats)
+tracer.register_stats("intent_classifier", intent_classifier.stats)
+tracer.register_stats("tool_dispatcher", tool_dispatcher.stats)
+tracer.register_stats("context", context_stats)
+tracer.register_stats("knowledge_base", knowledge_base_manager.stats)
+tracer.register_stats("agents", lambda: {"sessions": len(session_agents)})
+if retrieval_batcher is not None:
+    tracer.register_stats("retrieval_batcher", retrieval_batcher.stats)
+
 # Checks missing parameters for API calls
 def check_missing_params(data):
     action = data.get("action")
@@ -284,9 +677,3 @@ def check_missing_params(data):
 
 #     except Exception as e:
 #         raise Exception(e)
-    
-index = load_faiss_index(faiss_path)
-agent = create_agent()
-
-
-
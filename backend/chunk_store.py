@@ -0,0 +1,135 @@
+'''
+ Memory-mapped chunk store for RAG chunks.
+ Chunks are written once by load_data.py and read by FAISS row id
+ without loading the whole corpus into memory.
+
+ File layout:
+    [utf-8 chunk texts, concatenated]
+    [(count + 1) little-endian uint64 offsets into the blob]
+    [trailer: magic, count, offsets position]
+'''
+import mmap
+import os
+import struct
+from functools import lru_cache
+
+MAGIC = b"CHNKSTR1"
+TRAILER = struct.Struct("<8sQQ")
+OFFSET = struct.Struct("<Q")
+
+
+class ChunkStoreWriter:
+    """
+    Writes chunk texts to a chunk store file.
+
+    The file is written to a temporary path and moved into place on close,
+    so readers never see a half written store. With append=True the chunks
+    of an existing store are copied over first and new ones follow them.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.file = open(self.tmp_path, "wb")
+        self.offsets = [0]
+        if append and os.path.exists(path):
+            self._copy_existing()
+
+    def _copy_existing(self, block_size=16 * 1024 * 1024):
+        store = ChunkStore(self.path)
+        self.offsets = list(struct.unpack_from(f"<{store.count + 1}Q", store.mm, store.offsets_pos))
+        for start in range(0, store.offsets_pos, block_size):
+            self.file.write(store.mm[start:min(start + block_size, store.offsets_pos)])
+        store.close()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def add(self, text):
+        data = text.encode("utf-8")
+        self.file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        return len(self.offsets) - 2
+
+    def close(self):
+        if self.file is None:
+            return
+        offsets_pos = self.offsets[-1]
+        self.file.write(struct.pack(f"<{len(self.offsets)}Q", *self.offsets))
+        self.file.write(TRAILER.pack(MAGIC, len(self.offsets) - 1, offsets_pos))
+        self.file.close()
+        self.file = None
+        os.replace(self.tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+            self.file = None
+            os.remove(self.tmp_path)
+
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped view of a chunk store file.
+
+    Lookups are O(1) by FAISS row id. The mapping is backed by the OS page
+    cache, so worker processes opening the same file share its memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.offsets_pos = TRAILER.unpack_from(self.mm, len(self.mm) - TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a chunk store file.")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0 or i >= self.count:
+            raise IndexError(f"Chunk id {i} out of range.")
+        start, = OFFSET.unpack_from(self.mm, self.offsets_pos + i * OFFSET.size)
+        end, = OFFSET.unpack_from(self.mm, self.offsets_pos + (i + 1) * OFFSET.size)
+        return self.mm[start:end].decode("utf-8")
+
+    def get_many(self, ids):
+        # FAISS pads missing results with -1, skip them
+        return [self[i] for i in ids if i >= 0]
+
+    def close(self):
+        self.mm.close()
+
+
+# Write all texts to a chunk store file
+def write_chunk_store(path, texts):
+    with ChunkStoreWriter(path) as writer:
+        for text in texts:
+            writer.add(text)
+    return path
+
+
+# Convert the old chunks.csv file to a chunk store next to it
+def convert_csv(csv_path):
+    import pandas as pd
+
+    store_path = os.path.splitext(csv_path)[0] + ".store"
+    if not os.path.exists(store_path) or os.path.getmtime(store_path) < os.path.getmtime(csv_path):
+        chunks_df = pd.read_csv(csv_path)
+        write_chunk_store(store_path, chunks_df["chunk"].astype(str))
+    return store_path
+
+
+# Open the chunk store once per path and share it between requests
+@lru_cache(maxsize=None)
+def load_chunk_store(path):
+    if path.endswith(".csv"):
+        path = convert_csv(path)
+    return ChunkStore(path)
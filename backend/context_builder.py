@@ -0,0 +1,125 @@
+'''
+ Context assembly for medical answers.
+ Retrieved chunks are diversified with maximal marginal relevance,
+ text repeated by the chunk overlap is removed and the result is
+ packed into a token budget.
+'''
+from functools import lru_cache
+
+import numpy as np
+
+
+# Tokenizer of the chat model, loaded on first use (None if tiktoken is not installed)
+@lru_cache(maxsize=None)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # tiktoken is optional, fall back to an estimate
+        return None
+
+
+# Number of prompt tokens in a text
+def count_tokens(text):
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+# Length of the longest suffix of left that is a prefix of right
+def overlap_length(left, right, min_overlap=20, max_overlap=400):
+    for size in range(min(len(left), len(right), max_overlap), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+# Remove text already present in the kept chunks (contained, leading or trailing overlap)
+def trim_overlap(text, kept_texts, min_overlap=20, max_overlap=400):
+    for kept in kept_texts:
+        if text in kept:
+            return ""
+        text = text[overlap_length(kept, text, min_overlap, max_overlap):]
+        size = overlap_length(text, kept, min_overlap, max_overlap)
+        if size:
+            text = text[:-size]
+    return text.strip()
+
+
+def mmr(query_embedding, vectors, k, lambda_=0.7):
+    """
+    Maximal marginal relevance selection.
+
+    Args:
+        query_embedding (np.ndarray): Query vector.
+        vectors (np.ndarray): Candidate vectors, shape (n, dimension).
+        k (int): Number of candidates to select.
+        lambda_ (float): 1 is pure relevance, 0 is pure diversity.
+
+    Returns:
+        list: Positions of the selected candidates, in selection order.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    relevance = vectors @ (query / max(np.linalg.norm(query), 1e-12))
+    similarity = vectors @ vectors.T
+
+    selected = []
+    remaining = list(range(len(vectors)))
+    while remaining and len(selected) < k:
+        if selected:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = lambda_ * relevance[remaining] - (1 - lambda_) * redundancy
+        selected.append(remaining.pop(int(np.argmax(scores))))
+    return selected
+
+
+def build_context(query_embedding, candidate_ids, chunks, get_vectors, token_budget=1500, max_chunks=5, lambda_=0.7):
+    """
+    Builds the prompt context from retrieved chunk ids.
+
+    Args:
+        query_embedding (np.ndarray): Query vector.
+        candidate_ids (list): Retrieved chunk ids, best first. FAISS -1 padding is ignored.
+        chunks (ChunkStore): Chunk texts by id.
+        get_vectors (callable): Takes a list of ids, returns their vectors.
+        token_budget (int): Maximum number of context tokens.
+        max_chunks (int): Maximum number of chunks in the context.
+
+    Returns:
+        tuple: (selected ids, context text, report dict with tokens saved).
+    """
+    candidate_ids = [int(i) for i in candidate_ids if i >= 0]
+    if not candidate_ids:
+        return [], "", {"chunks": 0, "baseline_tokens": 0, "context_tokens": 0, "tokens_saved": 0}
+
+    order = mmr(query_embedding, get_vectors(candidate_ids), k=len(candidate_ids), lambda_=lambda_)
+
+    selected, parts, used_tokens = [], [], 0
+    for position in order:
+        if len(selected) == max_chunks:
+            break
+        text = trim_overlap(chunks[candidate_ids[position]], parts)
+        if not text:
+            continue
+        tokens = count_tokens(text)
+        if used_tokens + tokens > token_budget:
+            continue
+        selected.append(candidate_ids[position])
+        parts.append(text)
+        used_tokens += tokens
+
+    # Baseline is the previous behaviour: top chunks concatenated verbatim
+    baseline_tokens = count_tokens("\n".join(chunks.get_many(candidate_ids[:max_chunks])))
+    context = "\n".join(parts)
+    context_tokens = count_tokens(context)
+    return selected, context, {
+        "chunks": len(selected),
+        "baseline_tokens": baseline_tokens,
+        "context_tokens": context_tokens,
+        "tokens_saved": baseline_tokens - context_tokens,
+    }
@@ -15,7 +15,13 @@ from database import create_connection
 from models import Patient
 from pydantic import ValidationError
 
-connection, cursor = create_connection()
+# Module level connection and cursor, opened on first access instead of at import
+def __getattr__(name):
+    if name in ("connection", "cursor"):
+        global connection, cursor
+        connection, cursor = create_connection()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Add appointment to database
 def add_appointment(name: str, surname: str, personal_id: str, date: str, time: str, description: str):
@@ -4,30 +4,37 @@
 '''
 import sqlite3
 
+CREATE_TABLE_QUERY = """CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            surname TEXT NOT NULL,
+            personal_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            description TEXT
+        )
+        """
+
 DB_NAME = "appointments.db"
+table_ready = False
 
 
-# Create db connection and cursor
+# Create db connection and cursor (the table is created on the first connection)
 def create_connection():
+    global table_ready
     connection = sqlite3.connect(DB_NAME)
     cursor = connection.cursor()
+    if not table_ready:
+        cursor.execute(CREATE_TABLE_QUERY)
+        connection.commit()
+        table_ready = True
     return connection, cursor
 
 # Create table for booking
 def create_booking_table():
     try:
         connection, cursor = create_connection()
-        cursor.execute("""CREATE TABLE IF NOT EXISTS appointments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            surname TEXT NOT NULL,
-            personal_id TEXT NOT NULL,
-            date TEXT NOT NULL,
-            time TEXT NOT NULL,
-            description TEXT
-        )
-        """
-        )
+        cursor.execute(CREATE_TABLE_QUERY)
         connection.commit()
         connection.close()
         return True
@@ -47,5 +54,3 @@ def drop_table():
     except Exception as e:
         print(f"Error dropping table: {e}")
         return False
-
-create_booking_table()        
\ No newline at end of file
@@ -0,0 +1,170 @@
+'''
+ Deterministic dispatch of appointment actions.
+ When analyze_request already named the action and every parameter is
+ present, the matching api_endpoints function is called directly and its
+ result is formatted with a template in the user's language, instead of
+ letting the ReAct agent spend LLM calls choosing a tool whose name is
+ already known. Failed API calls (not 2xx) are reported as errors.
+'''
+from collections import Counter
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.http_transport import response_result
+from backend.language import detect_language, translate
+
+# Minimum LLM calls of a ReAct agent turn: one to pick the tool, one for the final answer
+AGENT_MIN_LLM_CALLS = 2
+
+# Response templates by action and language, filled with the API result fields
+RESPONSE_TEMPLATES = {
+    "add_appointment": {
+        "en": "Your appointment for {date} at {time} has been created.",
+        "tr": "{date} tarihinde saat {time} için randevunuz oluşturuldu.",
+        "de": "Ihr Termin am {date} um {time} wurde erstellt.",
+        "fr": "Votre rendez-vous du {date} à {time} a été créé.",
+        "es": "Su cita para el {date} a las {time} ha sido creada.",
+    },
+    "update_appointment": {
+        "en": "Appointment {appointment_id} has been updated.",
+        "tr": "{appointment_id} numaralı randevu güncellendi.",
+        "de": "Termin {appointment_id} wurde aktualisiert.",
+        "fr": "Le rendez-vous {appointment_id} a été modifié.",
+        "es": "La cita {appointment_id} ha sido actualizada.",
+    },
+    "delete_appointment": {
+        "en": "Appointment {appointment_id} has been deleted.",
+        "tr": "{appointment_id} numaralı randevu silindi.",
+        "de": "Termin {appointment_id} wurde gelöscht.",
+        "fr": "Le rendez-vous {appointment_id} a été supprimé.",
+        "es": "La cita {appointment_id} ha sido eliminada.",
+    },
+    "get_appointment_by_id": {
+        "en": "Appointment {id}: {name} {surname} (personal ID {personal_id}) on {date} at {time}. "
+              "Description: {description}",
+        "tr": "Randevu {id}: {name} {surname} (TC {personal_id}), {date} saat {time}. Açıklama: {description}",
+        "de": "Termin {id}: {name} {surname} (Ausweisnummer {personal_id}) am {date} um {time}. "
+              "Beschreibung: {description}",
+        "fr": "Rendez-vous {id} : {name} {surname} (identifiant {personal_id}) le {date} à {time}. "
+              "Description : {description}",
+        "es": "Cita {id}: {name} {surname} (ID personal {personal_id}) el {date} a las {time}. "
+              "Descripción: {description}",
+    },
+}
+APPOINTMENTS_HEADER = {
+    "en": "Appointments:",
+    "tr": "Randevular:",
+    "de": "Termine:",
+    "fr": "Rendez-vous :",
+    "es": "Citas:",
+}
+NO_APPOINTMENTS = {
+    "en": "No appointments found.",
+    "tr": "Randevu bulunamadı.",
+    "de": "Keine Termine gefunden.",
+    "fr": "Aucun rendez-vous trouvé.",
+    "es": "No se encontraron citas.",
+}
+APPOINTMENT_LINE = "- #{id} {name} {surname}, {date} {time}: {description}"
+ERROR_TEMPLATE = {
+    "en": "The request could not be completed: {error}",
+    "tr": "İşlem tamamlanamadı: {error}",
+    "de": "Die Anfrage konnte nicht ausgeführt werden: {error}",
+    "fr": "La demande n'a pas pu être traitée : {error}",
+    "es": "No se pudo completar la solicitud: {error}",
+}
+
+
+# API result as a dict (some callers pass the raw HTTP response), failed requests have an "error"
+def normalize_result(result):
+    if hasattr(result, "json"):
+        try:
+            return response_result(result)
+        except ValueError:
+            return {"error": f"HTTP {getattr(result, 'status_code', '?')}"}
+    if isinstance(result, str):
+        return {"error": result}
+    return result
+
+
+# Template values, unknown fields are left empty
+class _TemplateValues(dict):
+    def __missing__(self, key):
+        return ""
+
+
+def fill_template(template, values):
+    return " ".join(template.format_map(_TemplateValues(values)).split())
+
+
+# Turn an API result into the chat reply for an action, in language lang
+def format_result(action, data, result, lang="en"):
+    result = normalize_result(result)
+    if not isinstance(result, dict):
+        return str(result)
+
+    if action == "get_all_appointments" and result.get("status_code") == 404:
+        return translate(NO_APPOINTMENTS, lang)
+    error = result.get("error")
+    if error is None and "message" in result and action == "get_appointment_by_id":
+        error = result["message"]
+    if error is not None:
+        return fill_template(translate(ERROR_TEMPLATE, lang), {"error": error})
+
+    if action == "get_all_appointments":
+        appointments = result.get("appointments")
+        if not appointments:
+            return translate(NO_APPOINTMENTS, lang)
+        lines = [fill_template(APPOINTMENT_LINE, appointment) for appointment in appointments]
+        return translate(APPOINTMENTS_HEADER, lang) + "\n" + "\n".join(lines)
+
+    return fill_template(translate(RESPONSE_TEMPLATES[action], lang), {**data, **result})
+
+
+class ToolDispatcher:
+    """
+    Maps analyzed actions to appointment API functions.
+
+    Args:
+        tools (dict): Action name to function taking the request data dict
+            (get_all_appointments takes no argument).
+    """
+
+    def __init__(self, tools):
+        self.tools = tools
+        self.counts = Counter()
+
+    def dispatch(self, data):
+        """
+        Runs the tool for data["action"] and formats its result.
+
+        Returns:
+            str or None: The reply, or None if the action is unknown and the agent should handle it.
+        """
+        action = data.get("action")
+        tool = self.tools.get(action)
+        if tool is None:
+            self.counts["agent"] += 1
+            return None
+
+        data = dict(data)
+        # The agent converted numeric ids itself, the API expects integers
+        if isinstance(data.get("appointment_id"), str) and data["appointment_id"].isdigit():
+            data["appointment_id"] = int(data["appointment_id"])
+
+        result = tool() if action == "get_all_appointments" else tool(data)
+        self.counts["dispatched"] += 1
+        self.counts["llm_calls_saved"] += AGENT_MIN_LLM_CALLS
+        print(f"Dispatched {action} directly, saved {AGENT_MIN_LLM_CALLS} LLM calls")
+        # Replies in the language the user asked in
+        return format_result(action, data, result, lang=detect_language(data.get("query", "")))
+
+    def stats(self):
+        turns = self.counts["dispatched"] + self.counts["agent"]
+        return {
+            "dispatched": self.counts["dispatched"],
+            "agent": self.counts["agent"],
+            "llm_calls_saved": self.counts["llm_calls_saved"],
+            "dispatch_rate": self.counts["dispatched"] / turns if turns else 0.0,
+        }
@@ -0,0 +1,107 @@
+'''
+ Two-tier cache for query embeddings.
+ A bounded in-process LRU sits in front of an on-disk SQLite store,
+ so repeated queries skip the embeddings API and survive restarts.
+'''
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Normalize query text so trivial differences share one cache entry
+def normalize_text(text):
+    return " ".join(text.split()).lower()
+
+
+# Cache key from model name and normalized text
+def make_key(text, model):
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    In-memory LRU plus SQLite store for embeddings.
+
+    Args:
+        db_path (str, optional): SQLite file for the persistent tier. No disk tier if empty.
+        max_items (int): Maximum number of embeddings kept in memory.
+    """
+
+    def __init__(self, db_path=None, max_items=1024):
+        self.max_items = max_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.db_path = db_path
+        self.connection = None
+
+    # Open the SQLite store on first use (call with the lock held)
+    def _connect(self):
+        if self.connection is None and self.db_path:
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """)
+            self.connection.commit()
+        return self.connection
+
+    def _remember(self, key, embedding):
+        self.memory[key] = embedding
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def get(self, text, model):
+        key = make_key(text, model)
+        with self.lock:
+            embedding = self.memory.get(key)
+            if embedding is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return embedding
+
+            if self._connect() is not None:
+                row = self.connection.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    embedding = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, embedding)
+                    self.disk_hits += 1
+                    return embedding
+
+            self.misses += 1
+            return None
+
+    def put(self, text, model, embedding):
+        key = make_key(text, model)
+        embedding = np.ascontiguousarray(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+        with self.lock:
+            self._remember(key, embedding)
+            if self._connect() is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                    (key, model, embedding.tobytes(), time.time())
+                )
+                self.connection.commit()
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self.memory),
+        }
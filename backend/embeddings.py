@@ -0,0 +1,187 @@
+'''
+ Embedding providers for indexing and querying.
+ The OpenAI provider calls the embeddings API, the local provider
+ computes hashed word and character n-gram vectors in process,
+ so the RAG path can run offline.
+
+ Benchmark providers on the same corpus with:
+    python backend/embeddings.py chunks.store --providers openai,local
+'''
+import argparse
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.tracing import tracer
+
+load_dotenv()
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class EmbeddingProvider:
+    """
+    Base class for embedding providers.
+
+    Attributes:
+        name (str): Provider and model name, stored with indexes and cache keys.
+        cacheable (bool): Whether results are worth caching (remote calls).
+    """
+    name = "base"
+    cacheable = False
+
+    def embed(self, texts):
+        """
+        Embeds a list of texts.
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dimension).
+        """
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        return self.embed([text])[0]
+
+    # Provider that fails fast instead of retrying internally, for callers with their own retry logic
+    def without_retries(self):
+        return self
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    cacheable = True
+
+    def __init__(self, client=None, model="text-embedding-3-small"):
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client
+        self.model = model
+        self.name = model
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(
+            input=list(texts),
+            model=self.model
+        )
+        tracer.record_usage("embedding", response.usage)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+    def without_retries(self):
+        return OpenAIEmbeddingProvider(client=self.client.with_options(max_retries=0), model=self.model)
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Feature hashing embedder, no network and no model files.
+
+    Words and character n-grams of each word are hashed into a fixed
+    number of signed buckets, counts are log-scaled and the vector is
+    normalized to unit length.
+
+    Args:
+        dimension (int): Size of the output vectors.
+        ngram_range (tuple): Min and max character n-gram length.
+    """
+
+    def __init__(self, dimension=512, ngram_range=(3, 5)):
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+        self.name = f"local-hash-{dimension}"
+
+    def _features(self, text):
+        min_n, max_n = self.ngram_range
+        for word in WORD_PATTERN.findall(text.lower()):
+            yield word
+            padded = f"<{word}>"
+            for n in range(min_n, max_n + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dimension] += 1.0 if h & 0x80000000 else -1.0
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+# Provider selected by EMBEDDING_PROVIDER (openai or local)
+def get_embedding_provider(name=None, client=None):
+    name = name or os.getenv("EMBEDDING_PROVIDER", "openai")
+    if name == "openai":
+        return OpenAIEmbeddingProvider(client=client, model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"))
+    if name == "local":
+        return LocalEmbeddingProvider(dimension=int(os.getenv("EMBEDDING_DIMENSION", "512")))
+    raise ValueError(f"Unknown embedding provider: {name}. Use openai or local.")
+
+
+# Probe queries cut from random chunks, the source chunk is the expected hit
+def make_probe_queries(texts, n_queries, words=12, seed=0):
+    rng = np.random.default_rng(seed)
+    queries, expected = [], []
+    for i in rng.permutation(len(texts)):
+        tokens = texts[i].split()
+        if len(tokens) < words:
+            continue
+        start = int(rng.integers(0, len(tokens) - words + 1))
+        queries.append(" ".join(tokens[start:start + words]))
+        expected.append(int(i))
+        if len(queries) == n_queries:
+            break
+    return queries, np.array(expected)
+
+
+# hit@k of search results against the expected chunk ids
+def hit_rate(results, expected):
+    return float(np.mean([expected[i] in results[i] for i in range(len(expected))]))
+
+
+def main():
+    from backend.chunk_store import load_chunk_store
+    from backend.index_factory import build_index
+
+    parser = argparse.ArgumentParser(description="Benchmark embedding providers on the same corpus.")
+    parser.add_argument("chunks", help="Path to chunks.store (or chunks.csv)")
+    parser.add_argument("--providers", default="openai,local")
+    parser.add_argument("--limit", type=int, default=2000, help="Number of chunks to embed")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    store = load_chunk_store(args.chunks)
+    texts = [store[i] for i in range(min(args.limit, len(store)))]
+    queries, expected = make_probe_queries(texts, args.queries)
+
+    print(f"{'provider':<24} {'dim':>5} {'index_texts/s':>14} {'query_p50_ms':>13} {'hit@' + str(args.k):>7}")
+    for name in args.providers.split(","):
+        provider = get_embedding_provider(name)
+
+        start = time.perf_counter()
+        embeddings = np.vstack([provider.embed(texts[i:i + args.batch_size]) for i in range(0, len(texts), args.batch_size)])
+        texts_per_second = len(texts) / (time.perf_counter() - start)
+
+        index = build_index(embeddings, "flat")
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            query_embedding = provider.embed_query(query)
+            latencies.append(time.perf_counter() - start)
+            results.append(index.search(query_embedding.reshape(1, -1), args.k)[1][0])
+
+        print(f"{provider.name:<24} {embeddings.shape[1]:>5} {texts_per_second:>14.1f} "
+              f"{np.percentile(latencies, 50) * 1000:>13.2f} {hit_rate(results, expected):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,12 @@
  for accesing globally.
 '''
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from pydantic import ValidationError
 import sys
 import os
+import time
 # Add the root path of the project
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from backend.crud import (
@@ -20,9 +21,27 @@ from backend.crud import (
     get_all_appointments,
 )
 from backend.models import Patient
+from backend.tracing import tracer
 
 app = Flask(__name__)
 CORS(app) 
+
+# Time every request per endpoint
+@app.before_request
+def start_timer():
+    g.start = time.perf_counter()
+
+@app.after_request
+def observe_latency(response):
+    if "start" in g:
+        tracer.observe(f"api_{request.endpoint}", time.perf_counter() - g.start)
+    return response
+
+# Prometheus metrics of this process: booking API latency per endpoint (chat metrics: METRICS_PORT of ui/app.py)
+@app.route("/metrics")
+def metrics():
+    return Response(tracer.prometheus_text(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/")
 def home():
     return "Welcome to the Healthcare Chatbot API!"
@@ -0,0 +1,147 @@
+'''
+ Transports used by api_endpoints to reach the booking API.
+ The HTTP transport keeps one pooled keep-alive session with timeouts and
+ bounded retries. The in-process transport calls the Flask app directly
+ through its test client, with no HTTP, when both run in one process.
+'''
+import os
+import sys
+import threading
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.tracing import tracer
+
+load_dotenv()
+
+
+class HTTPTransport:
+    """
+    Pooled requests session for the booking API.
+
+    Args:
+        base_url (str): API root, e.g. https://user.pythonanywhere.com
+        connect_timeout (float): Seconds to open a connection.
+        read_timeout (float): Seconds to wait for a response.
+        retries (int): Retries on connection errors and 502/503/504 (idempotent methods only for the latter).
+        backoff (float): Backoff factor between retries, in seconds.
+        pool_size (int): Keep-alive connections kept per host.
+    """
+
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=10, retries=3, backoff=0.3, pool_size=10):
+        self.base_url = (base_url or "").rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "PUT", "DELETE"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, path, json=None):
+        with tracer.span("booking_api"):
+            return self.session.request(method, f"{self.base_url}{path}", json=json, timeout=self.timeout)
+
+    def get(self, path):
+        return self.request("GET", path)
+
+    def post(self, path, json=None):
+        return self.request("POST", path, json=json)
+
+    def put(self, path, json=None):
+        return self.request("PUT", path, json=json)
+
+    def delete(self, path):
+        return self.request("DELETE", path)
+
+    def close(self):
+        self.session.close()
+
+
+class InProcessResponse:
+    """
+    Flask test response with the parts of requests.Response that api_endpoints uses.
+    """
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.ok = response.status_code < 400
+        self.text = response.get_data(as_text=True)
+        self._json = response.get_json(silent=True)
+
+    def json(self):
+        if self._json is None:
+            raise ValueError(f"Response is not JSON: {self.text[:100]}")
+        return self._json
+
+
+class InProcessTransport(HTTPTransport):
+    """
+    Calls the Flask booking app in this process.
+
+    Args:
+        app (flask.Flask, optional): App to call, backend/flask_api/flask_app.py by default.
+    """
+
+    def __init__(self, app=None):
+        if app is None:
+            from backend.flask_api.flask_app import app
+        self.client = app.test_client()
+        self.lock = threading.Lock()
+
+    def request(self, method, path, json=None):
+        # The test client is not meant to be shared between threads
+        with tracer.span("booking_api"), self.lock:
+            response = self.client.open(path, method=method, json=json, follow_redirects=True)
+        return InProcessResponse(response)
+
+    def close(self):
+        pass
+
+
+# Body of an API response; failed requests (not 2xx) become {"error": ..., "status_code": ...}
+def response_result(response):
+    status_code = getattr(response, "status_code", 200)
+    if 200 <= status_code < 300:
+        return response.json()
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    # The booking API reports failures as {"message": ...}
+    message = (body.get("message") or body.get("error")) if isinstance(body, dict) else None
+    return {"error": message or f"HTTP {status_code}", "status_code": status_code}
+
+
+# Transport selected with API_TRANSPORT (http or inprocess), created on first use
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport():
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            if os.getenv("API_TRANSPORT", "http") == "inprocess":
+                _transport = InProcessTransport()
+            else:
+                _transport = HTTPTransport(
+                    os.getenv("API_BASE_URL"),
+                    connect_timeout=float(os.getenv("API_CONNECT_TIMEOUT", "3.05")),
+                    read_timeout=float(os.getenv("API_READ_TIMEOUT", "10")),
+                    retries=int(os.getenv("API_RETRIES", "3")),
+                    backoff=float(os.getenv("API_RETRY_BACKOFF", "0.3")),
+                    pool_size=int(os.getenv("API_POOL_SIZE", "10")),
+                )
+    return _transport
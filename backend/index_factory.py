@@ -0,0 +1,336 @@
+'''
+ FAISS index factory for the RAG knowledge index.
+ Builds flat, float16 / int8 scalar-quantized flat, IVF-Flat, IVF-PQ or
+ HNSW indexes and benchmarks them against the exact flat index (recall@k,
+ search latency and index size).
+
+ Usage:
+    python backend/index_factory.py data_embeddings.npy --types flat,sq_fp16,sq8,ivf_flat,ivf_pq,hnsw --nprobe 4,16,64 --ef-search 32,128
+'''
+import argparse
+import math
+import time
+
+import os
+import sys
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.vector_storage import load_vectors
+
+INDEX_TYPES = ("flat", "sq_fp16", "sq8", "ivf_flat", "ivf_pq", "hnsw")
+
+
+# Default number of IVF lists for a corpus size
+def default_nlist(n_vectors):
+    return max(1, min(65536, int(4 * math.sqrt(n_vectors))))
+
+
+# FAISS wants at least 39 training points per IVF list (and at least one per list to train at all)
+MIN_POINTS_PER_LIST = 39
+# PQ codebooks have 256 centroids (8 bits) per sub-quantizer
+PQ_MIN_TRAIN = 256
+
+
+# Number of IVF lists that n_train training vectors can support
+def fit_nlist(nlist, n_train):
+    return max(1, min(nlist, n_train // MIN_POINTS_PER_LIST))
+
+
+# Index type to train on n_train vectors: IVF-PQ needs PQ_MIN_TRAIN, smaller samples keep flat IVF lists
+def fit_index_type(index_type, n_train):
+    if index_type == "ivf_pq" and n_train < PQ_MIN_TRAIN:
+        print(f"{n_train} training vectors are too few for PQ, using ivf_flat")
+        return "ivf_flat"
+    return index_type
+
+
+# Default number of PQ sub-quantizers, must divide the dimension
+def default_pq_m(dimension):
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1):
+        if dimension % m == 0:
+            return m
+
+
+# FAISS index_factory string for an index type
+def factory_string(index_type, dimension, n_vectors, nlist=None, pq_m=None, hnsw_m=32):
+    if index_type == "flat":
+        return "Flat"
+    # Exact search over vectors stored as float16 (half the memory) or int8 (a quarter)
+    if index_type == "sq_fp16":
+        return "SQfp16"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist or default_nlist(n_vectors)},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{nlist or default_nlist(n_vectors)},PQ{pq_m or default_pq_m(dimension)}x8"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m},Flat"
+    raise ValueError(f"Unknown index type: {index_type}. Use one of {', '.join(INDEX_TYPES)}.")
+
+
+def build_index(embeddings, index_type="flat", nlist=None, pq_m=None, hnsw_m=32, train_size=None, seed=0):
+    """
+    Builds and fills a FAISS index (L2 distance) for the embeddings.
+
+    Args:
+        embeddings (np.ndarray): Vectors to index, shape (n, dimension).
+        index_type (str): One of flat, sq_fp16, sq8, ivf_flat, ivf_pq, hnsw.
+        nlist (int, optional): Number of IVF lists.
+        pq_m (int, optional): Number of PQ sub-quantizers.
+        hnsw_m (int): Number of HNSW neighbours per node.
+        train_size (int, optional): Number of sampled vectors used for training.
+
+    Returns:
+        faiss.Index: Trained index containing all embeddings.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n_vectors, dimension = embeddings.shape
+    nlist = nlist or default_nlist(n_vectors)
+    if train_size is None:
+        train_size = max(40 * nlist, 10000)
+    # Small corpora get fewer IVF lists (or no PQ) instead of failing to train
+    n_train = min(n_vectors, train_size)
+    index_type = fit_index_type(index_type, n_train)
+    spec = factory_string(index_type, dimension, n_vectors, nlist=fit_nlist(nlist, n_train), pq_m=pq_m, hnsw_m=hnsw_m)
+    index = faiss.index_factory(dimension, spec, faiss.METRIC_L2)
+
+    # Train IVF / PQ / SQ quantizers on a random sample
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(n_vectors, size=n_train, replace=False)
+        print(f"Training {spec} index on {len(sample)} vectors")
+        index.train(embeddings[np.sort(sample)])
+
+    index.add(embeddings)
+    return index
+
+
+class IncrementalIndexBuilder:
+    """
+    Fills a FAISS index batch by batch, for corpora that don't fit in memory.
+
+    Flat and HNSW indexes take vectors as they come. IVF / PQ indexes keep
+    the first train_size vectors in memory, train on them, then add them and
+    every following batch directly. A smaller training sample (a small
+    corpus) gets fewer IVF lists, and IVF-PQ falls back to IVF-Flat below
+    PQ_MIN_TRAIN vectors.
+
+    With id_map=True the index is wrapped in an IndexIDMap2 and vectors are
+    added with explicit ids (reconstruct still works by id). Passing an
+    existing index continues filling it.
+
+    Args:
+        index_type (str): One of flat, sq_fp16, sq8, ivf_flat, ivf_pq, hnsw.
+        nlist (int, optional): Number of IVF lists, derived from expected_vectors if not set.
+        pq_m (int, optional): Number of PQ sub-quantizers.
+        hnsw_m (int): Number of HNSW neighbours per node.
+        train_size (int, optional): Number of vectors buffered for training.
+        expected_vectors (int, optional): Approximate corpus size, used for the default nlist.
+        id_map (bool): Add vectors with explicit ids.
+        index (faiss.Index, optional): Trained index to continue filling.
+    """
+
+    def __init__(self, index_type="flat", nlist=None, pq_m=None, hnsw_m=32, train_size=None, expected_vectors=None,
+                 id_map=False, index=None):
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.train_size = train_size
+        self.expected_vectors = expected_vectors
+        self.id_map = id_map
+        self.index = index
+        self.pending = []
+        self.pending_count = 0
+
+    # n_train: size of the training sample, once known (IVF lists and PQ are fitted to it)
+    def _create(self, dimension, n_train=None):
+        n_vectors = self.expected_vectors or self.train_size or 10000
+        nlist = self.nlist or default_nlist(n_vectors)
+        index_type = self.index_type
+        if n_train is not None:
+            nlist = fit_nlist(nlist, n_train)
+            index_type = fit_index_type(index_type, n_train)
+        spec = factory_string(index_type, dimension, n_vectors, nlist=nlist, pq_m=self.pq_m, hnsw_m=self.hnsw_m)
+        self.index = faiss.index_factory(dimension, spec, faiss.METRIC_L2)
+        if self.id_map:
+            self.index = faiss.IndexIDMap2(self.index)
+        if not self.index.is_trained and self.train_size is None:
+            self.train_size = max(40 * nlist, 10000)
+
+    def _add(self, embeddings, ids):
+        if ids is None:
+            self.index.add(embeddings)
+        else:
+            self.index.add_with_ids(embeddings, np.ascontiguousarray(ids, dtype=np.int64))
+
+    def _train_and_flush(self):
+        sample = np.vstack([embeddings for embeddings, _ in self.pending])
+        ids = None if self.pending[0][1] is None else np.concatenate([ids for _, ids in self.pending])
+        # The corpus may end before train_size vectors: size the index for the sample it got
+        self._create(sample.shape[1], n_train=len(sample))
+        print(f"Training {self.index_type} index on {len(sample)} vectors")
+        self.index.train(sample)
+        self._add(sample, ids)
+        self.pending, self.pending_count = [], 0
+
+    def add(self, embeddings, ids=None):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self.index is None:
+            self._create(embeddings.shape[1])
+        if self.index.is_trained:
+            self._add(embeddings, ids)
+            return
+        self.pending.append((embeddings, ids))
+        self.pending_count += len(embeddings)
+        if self.pending_count >= self.train_size:
+            self._train_and_flush()
+
+    def finish(self):
+        # Corpus smaller than the training sample: train on everything
+        if self.pending:
+            self._train_and_flush()
+        return self.index
+
+
+# Set search time parameters, ignored for index types they don't apply to
+def configure_search(index, nprobe=None, ef_search=None):
+    if isinstance(index, faiss.IndexShards):
+        for i in range(index.count()):
+            configure_search(faiss.downcast_index(index.at(i)), nprobe=nprobe, ef_search=ef_search)
+        return index
+    if nprobe:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass
+    if ef_search:
+        hnsw_index = faiss.downcast_index(index)
+        # ID-mapped (incremental / sharded) indexes wrap the HNSW index
+        if isinstance(hnsw_index, faiss.IndexIDMap):
+            hnsw_index = faiss.downcast_index(hnsw_index.index)
+        if hasattr(hnsw_index, "hnsw"):
+            hnsw_index.hnsw.efSearch = ef_search
+    return index
+
+
+# Build the direct map (id -> list position) IVF indexes need for reconstruct,
+# once at load time: the index must not be modified while searches share it
+def prepare_reconstruct(index):
+    if isinstance(index, faiss.IndexShards):
+        for i in range(index.count()):
+            prepare_reconstruct(faiss.downcast_index(index.at(i)))
+        return index
+    try:
+        ivf_index = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return index
+    if ivf_index.direct_map.type == faiss.DirectMap.NoMap:
+        ivf_index.make_direct_map()
+    return index
+
+
+# Stored vectors for the given ids (approximate for PQ indexes), IVF indexes need prepare_reconstruct first
+def reconstruct_vectors(index, ids):
+    ids = [int(i) for i in ids]
+    # Sharded indexes (see sharded_index.py): chunk id i is in shard i % shards
+    if isinstance(index, faiss.IndexShards):
+        shards = index.count()
+        return np.vstack([reconstruct_vectors(faiss.downcast_index(index.at(i % shards)), [i]) for i in ids])
+    return np.vstack([index.reconstruct(i) for i in ids])
+
+
+# Serialized size of an index in MB (what it takes on disk and in memory)
+def index_size_mb(index):
+    if isinstance(index, faiss.IndexShards):
+        return sum(index_size_mb(faiss.downcast_index(index.at(i))) for i in range(index.count()))
+    return faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+
+# Search one query at a time like the chatbot does
+def _timed_search(index, queries, k):
+    latencies = []
+    results = np.empty((len(queries), k), dtype=np.int64)
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        latencies.append(time.perf_counter() - start)
+        results[i] = ids[0]
+    return results, np.array(latencies)
+
+
+def benchmark_index(index, queries, ground_truth, k=5):
+    """
+    Measures recall@k against exact results and per-query search latency.
+
+    Returns:
+        dict: recall@k and p50/p99 latency in milliseconds.
+    """
+    results, latencies = _timed_search(index, queries, k)
+    found = sum(len(set(results[i]) & set(ground_truth[i])) for i in range(len(queries)))
+    return {
+        "recall_at_k": found / ground_truth[:, :k].size,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+# Sample queries near corpus vectors (a stand-in for real query embeddings)
+def sample_queries(embeddings, n_queries, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)
+    queries = embeddings[rows].copy()
+    queries += rng.normal(scale=queries.std() * 0.5, size=queries.shape).astype(np.float32)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types against the flat index.")
+    parser.add_argument("embeddings", help="Path to the .npy embeddings file")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=500, help="Number of sampled queries")
+    parser.add_argument("--nprobe", default="1,8,32", help="Comma separated nprobe values for IVF indexes")
+    parser.add_argument("--ef-search", default="16,64,256", help="Comma separated efSearch values for HNSW")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--pq-m", type=int, default=None)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    args = parser.parse_args()
+
+    # float16 / int8 files are decoded to float32
+    embeddings = load_vectors(args.embeddings).to_float32()
+    queries = sample_queries(embeddings, args.queries)
+
+    flat = build_index(embeddings, "flat")
+    ground_truth, _ = _timed_search(flat, queries, args.k)
+
+    print(f"{'index':<12} {'param':<16} {'build_s':>8} {'size_mb':>8} {'recall@' + str(args.k):>9} "
+          f"{'p50_ms':>8} {'p99_ms':>8}")
+    for index_type in args.types.split(","):
+        start = time.perf_counter()
+        index = build_index(embeddings, index_type, nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+        build_seconds = time.perf_counter() - start
+        size_mb = index_size_mb(index)
+
+        if index_type.startswith("ivf"):
+            settings = [("nprobe", int(v)) for v in args.nprobe.split(",")]
+        elif index_type == "hnsw":
+            settings = [("efSearch", int(v)) for v in args.ef_search.split(",")]
+        else:
+            settings = [("-", None)]
+
+        for name, value in settings:
+            configure_search(index, nprobe=value if name == "nprobe" else None,
+                             ef_search=value if name == "efSearch" else None)
+            result = benchmark_index(index, queries, ground_truth, k=args.k)
+            param = "-" if value is None else f"{name}={value}"
+            print(f"{index_type:<12} {param:<16} {build_seconds:>8.2f} {size_mb:>8.1f} {result['recall_at_k']:>9.3f} "
+                  f"{result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+'''
+ Local intent classifier in front of analyze_request.
+ Keyword / regex rules and nearest-centroid search over example
+ embeddings answer high-confidence cases without an LLM call.
+ Only actions that need no parameter extraction are answered locally.
+'''
+import asyncio
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+# Actions the fast path may return, the others need analyze_request to extract parameters
+FAST_PATH_ACTIONS = {"get_all_appointments", "medical_question"}
+
+LIST_ALL_PATTERN = re.compile(
+    r"\b(list|show|get|display|see|view)\b.*\b(all|every)\b.*\bappointments?\b"
+    r"|\b(tüm|bütün|hepsi|tum|butun)\b.*\brandevu"
+    r"|\brandevu(ları|lari)\b.*\b(listele|göster|goster)",
+    re.IGNORECASE
+)
+# Queries about one appointment (a number or id) or that change appointments are never listings
+NOT_LIST_ALL_PATTERN = re.compile(
+    r"\d|\b(id|number|no|numara\w*)\b"
+    r"|\b(delet\w*|remov\w*|cancel\w*|updat\w*|chang\w*|reschedul\w*|book\w*|schedul\w*)\b"
+    r"|\b(sil\w*|iptal\w*|güncelle\w*|guncelle\w*|değiştir\w*|degistir\w*|al|almak\w*|alabilir\w*|alacağ\w*)\b",
+    re.IGNORECASE
+)
+APPOINTMENT_PATTERN = re.compile(
+    r"\b(appointments?|book(ing)?|schedul\w*|reschedul\w*|cancel\w*|randevu\w*|iptal)\b",
+    re.IGNORECASE
+)
+MEDICAL_PATTERN = re.compile(
+    r"\b(symptoms?|treat(ment|ed|s)?|disease|diagnos\w*|medicine|medication|drugs?|dose|dosage|"
+    r"side effects?|pain|fever|infection|diabetes|cancer|flu|influenza|blood pressure|allerg\w*|"
+    r"belirti\w*|tedavi\w*|hastalı\w*|ilaç\w*|ağrı\w*|ateş\w*|enfeksiyon\w*|şeker hastalığı|tansiyon\w*|grip)\b",
+    re.IGNORECASE
+)
+
+# Example utterances for nearest-centroid classification
+INTENT_EXAMPLES = {
+    "add_appointment": [
+        "I want to book an appointment",
+        "Schedule an appointment for John Doe on March 25 at 14:00",
+        "Randevu almak istiyorum",
+        "Yarın saat 10:00 için randevu oluştur",
+    ],
+    "update_appointment": [
+        "Change my appointment 3 to 15:00",
+        "Move appointment number 2 to next Friday",
+        "Randevumun saatini değiştirmek istiyorum",
+    ],
+    "delete_appointment": [
+        "Cancel appointment 4",
+        "Delete my appointment",
+        "2 numaralı randevuyu iptal et",
+    ],
+    "get_appointment_by_id": [
+        "Show me appointment 5",
+        "What are the details of appointment number one",
+        "3 numaralı randevunun bilgilerini göster",
+    ],
+    "get_all_appointments": [
+        "List all appointments",
+        "Show every appointment in the system",
+        "Tüm randevuları listele",
+    ],
+    "medical_question": [
+        "What are the symptoms of flu?",
+        "How is type 2 diabetes treated?",
+        "What are the side effects of ibuprofen?",
+        "Baş ağrısı neden olur?",
+        "Yüksek tansiyon nasıl tedavi edilir?",
+    ],
+    "invalid": [
+        "What is the weather today?",
+        "Tell me a joke",
+        "Who won the football match yesterday?",
+    ],
+}
+
+
+class IntentClassifier:
+    """
+    Rule + nearest-centroid intent classifier with an LLM fallback.
+
+    Args:
+        embed (callable, optional): Takes a list of texts, returns an (n, dimension) array. No centroid stage if None.
+        threshold (float): Minimum confidence for answering without the fallback.
+        temperature (float): Softmax temperature over centroid similarities.
+    """
+
+    def __init__(self, embed=None, threshold=0.85, temperature=0.05, examples=INTENT_EXAMPLES):
+        self.embed = embed
+        self.threshold = threshold
+        self.temperature = temperature
+        self.examples = examples
+        self.actions = None
+        self.centroids = None
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.counts_lock = threading.Lock()
+
+    def _load_centroids(self):
+        with self.lock:
+            if self.centroids is not None:
+                return
+            # Every example in one embeddings request, split by action afterwards
+            texts = [text for examples in self.examples.values() for text in examples]
+            vectors = np.asarray(self.embed(texts), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            actions, centroids = [], []
+            start = 0
+            for action, examples in self.examples.items():
+                centroid = vectors[start:start + len(examples)].mean(axis=0)
+                start += len(examples)
+                actions.append(action)
+                centroids.append(centroid / np.linalg.norm(centroid))
+            self.actions = actions
+            self.centroids = np.vstack(centroids)
+
+    # Keyword / regex rules, returns (action, confidence) or None
+    def match_rules(self, query):
+        if LIST_ALL_PATTERN.search(query) and not NOT_LIST_ALL_PATTERN.search(query):
+            return "get_all_appointments", 0.99
+        if not APPOINTMENT_PATTERN.search(query):
+            matches = len(MEDICAL_PATTERN.findall(query))
+            if matches:
+                return "medical_question", min(0.99, 0.8 + 0.1 * matches)
+        return None
+
+    # Nearest centroid over cached embeddings, returns (action, confidence); vector: the query embedding, if known
+    def match_centroids(self, query, vector=None):
+        if self.centroids is None:
+            self._load_centroids()
+        if vector is None:
+            vector = self.embed([query])[0]
+        vector = np.asarray(vector, dtype=np.float32)
+        similarities = self.centroids @ (vector / max(np.linalg.norm(vector), 1e-12))
+        weights = np.exp((similarities - similarities.max()) / self.temperature)
+        best = int(np.argmax(similarities))
+        return self.actions[best], float(weights[best] / weights.sum())
+
+    def classify(self, query, vector=None):
+        """
+        Returns (action, confidence, stage) where stage is rules or centroid.
+        """
+        result = self.match_rules(query)
+        if result is not None:
+            return result + ("rules",)
+        if self.embed is None:
+            return "unknown", 0.0, "centroid"
+        return self.match_centroids(query, vector) + ("centroid",)
+
+    # Whether the classification is confident enough to skip the fallback, counted by stage
+    def _fast_path(self, action, confidence, stage):
+        fast = action in FAST_PATH_ACTIONS and confidence >= self.threshold
+        with self.counts_lock:
+            self.counts[stage if fast else "fallback"] += 1
+        return fast
+
+    def analyze(self, query, fallback):
+        """
+        Answers confident fast-path cases locally, otherwise calls fallback(query).
+
+        Returns:
+            dict: Analysis in the same shape as analyze_request.
+        """
+        action, confidence, stage = self.classify(query)
+        if self._fast_path(action, confidence, stage):
+            return {"action": action}
+        return fallback(query)
+
+    async def async_analyze(self, query, fallback, embedding=None):
+        """
+        analyze for the asyncio pipeline, fallback is a coroutine function.
+
+        embedding is an awaitable of the query embedding when the caller
+        computes it anyway (speculative retrieval), it is only awaited if no
+        rule matches. Otherwise the centroid stage embeds the query itself,
+        in a worker thread.
+        """
+        result = self.match_rules(query)
+        if result is not None:
+            action, confidence, stage = result + ("rules",)
+        else:
+            try:
+                vector = await embedding if embedding is not None and self.embed is not None else None
+            except Exception as e:
+                # No centroid stage without the query embedding
+                print(f"Query embedding failed, asking the fallback: {e}")
+                with self.counts_lock:
+                    self.counts["fallback"] += 1
+                return await fallback(query)
+            action, confidence, stage = await asyncio.to_thread(self.classify, query, vector)
+        if self._fast_path(action, confidence, stage):
+            return {"action": action}
+        return await fallback(query)
+
+    def stats(self):
+        total = sum(self.counts.values())
+        fast = self.counts["rules"] + self.counts["centroid"]
+        return {
+            "rules": self.counts["rules"],
+            "centroid": self.counts["centroid"],
+            "fallback": self.counts["fallback"],
+            "fast_path_rate": fast / total if total else 0.0,
+        }
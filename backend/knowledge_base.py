@@ -0,0 +1,320 @@
+'''
+ Versioned knowledge base bundles and their hot swap.
+ load_data.py --bundle-root writes every build to its own version directory
+ (FAISS index, chunk store, BM25 index, embeddings and bundle.json with the
+ embedding model, dimension, checksums and build stats) and then points the
+ CURRENT file at it. The chatbot loads the bundle CURRENT names, checks that
+ its parts match, and swaps a newer bundle in while it keeps serving: a
+ request holds on to the bundle it started with, so nothing in flight is
+ dropped or mixes two bundles.
+
+ Layout:
+    <root>/CURRENT                  name of the live version
+    <root>/<version>/bundle.json
+    <root>/<version>/data_index.faiss (or data_index.<n>-of-<shards>.faiss), chunks.store, bm25.npz,
+                     data_embeddings.npy
+'''
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+BUNDLE_MANIFEST = "bundle.json"
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "data_index.faiss"
+CHUNKS_FILE = "chunks.store"
+BM25_FILE = "bm25.npz"
+# Content-hash manifest of incremental builds (see build_manifest.py)
+BUILD_MANIFEST = "manifest.db"
+# Files covered by the checksums (the embeddings file may be missing or quantized with a sidecar)
+BUNDLE_FILES = (INDEX_FILE, CHUNKS_FILE, BM25_FILE, "data_embeddings.npy", "data_embeddings.quant.npy")
+
+
+# Version name of a new bundle, sorts by build time
+def new_version():
+    return datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+
+
+def file_checksum(path, block_size=16 * 1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_bundle_manifest(bundle_dir, embedding_model, dimension, index_type, stats=None):
+    """
+    Writes bundle.json for the files in bundle_dir.
+
+    Returns:
+        dict: The manifest.
+    """
+    from backend.sharded_index import find_shards
+
+    files = {}
+    shard_files = find_shards(os.path.join(bundle_dir, INDEX_FILE))
+    for name in BUNDLE_FILES + tuple(os.path.basename(shard_file) for shard_file in shard_files):
+        path = os.path.join(bundle_dir, name)
+        if os.path.exists(path):
+            files[name] = {"bytes": os.path.getsize(path), "sha256": file_checksum(path)}
+    manifest = {
+        "version": os.path.basename(os.path.normpath(bundle_dir)),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": embedding_model,
+        "dimension": dimension,
+        "index_type": index_type,
+        "files": files,
+        "stats": stats or {},
+    }
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def read_bundle_manifest(bundle_dir):
+    with open(os.path.join(bundle_dir, BUNDLE_MANIFEST)) as f:
+        return json.load(f)
+
+
+# Version CURRENT points at, None before the first publish
+def current_version(root):
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_bundle(root, version):
+    """
+    Makes version the live bundle by atomically replacing CURRENT.
+    """
+    read_bundle_manifest(os.path.join(root, version))
+    tmp_path = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def prepare_bundle_dir(root, version, copy_current=False):
+    """
+    Creates the directory of a new bundle version.
+
+    Args:
+        copy_current (bool): Start from a copy of the live bundle (incremental builds), if that
+            bundle was built incrementally. An existing directory of the same version (an
+            interrupted build) is kept as is.
+    """
+    bundle_dir = os.path.join(root, version)
+    if os.path.isdir(bundle_dir):
+        return bundle_dir
+    live = current_version(root)
+    if copy_current and live is not None and os.path.exists(os.path.join(root, live, BUILD_MANIFEST)):
+        # Bundles are immutable, the next version starts from a copy of the live one
+        shutil.copytree(os.path.join(root, live), bundle_dir, ignore=shutil.ignore_patterns(BUNDLE_MANIFEST))
+    else:
+        os.makedirs(bundle_dir)
+    return bundle_dir
+
+
+def verify_bundle(bundle_dir, manifest, checksums=True):
+    """
+    Raises ValueError if a file of the bundle is missing, has another size or checksum.
+    """
+    for name, expected in manifest["files"].items():
+        path = os.path.join(bundle_dir, name)
+        if not os.path.exists(path):
+            raise ValueError(f"Bundle {manifest['version']} is missing {name}.")
+        if os.path.getsize(path) != expected["bytes"]:
+            raise ValueError(f"Bundle {manifest['version']}: {name} has {os.path.getsize(path)} bytes, "
+                             f"expected {expected['bytes']}.")
+        if checksums and file_checksum(path) != expected["sha256"]:
+            raise ValueError(f"Bundle {manifest['version']}: checksum of {name} does not match.")
+
+
+class KnowledgeBase:
+    """
+    FAISS index, chunk store and BM25 index that belong together.
+
+    Args:
+        version (str): Bundle version (or "paths" for files configured one by one).
+        index (faiss.Index): Vector index, id i is chunk i.
+        chunks (ChunkStore): Chunk texts.
+        bm25 (BM25Index, optional): Lexical index over the same chunks.
+        manifest (dict, optional): bundle.json of the bundle.
+    """
+
+    def __init__(self, version, index, chunks, bm25=None, manifest=None):
+        self.version = version
+        self.index = index
+        self.chunks = chunks
+        self.bm25 = bm25
+        self.manifest = manifest or {}
+        self.loaded_at = time.time()
+
+    # Raises ValueError if the parts don't describe the same chunks
+    def check(self, embedding_model=None):
+        if self.index.ntotal != len(self.chunks):
+            raise ValueError(f"Knowledge base {self.version}: index has {self.index.ntotal} vectors "
+                             f"but the chunk store has {len(self.chunks)} chunks.")
+        if self.bm25 is not None and len(self.bm25.doc_lengths) != len(self.chunks):
+            raise ValueError(f"Knowledge base {self.version}: BM25 has {len(self.bm25.doc_lengths)} documents "
+                             f"but the chunk store has {len(self.chunks)} chunks.")
+        dimension = self.manifest.get("dimension")
+        if dimension is not None and dimension != self.index.d:
+            raise ValueError(f"Knowledge base {self.version}: index dimension {self.index.d}, "
+                             f"bundle.json says {dimension}.")
+        model = self.manifest.get("embedding_model")
+        if embedding_model and model and model != embedding_model:
+            raise ValueError(f"Knowledge base {self.version} was embedded with {model}, "
+                             f"the chatbot uses {embedding_model}.")
+        return self
+
+    def stats(self):
+        from backend.sharded_index import index_shards
+
+        return {
+            "version": self.version,
+            "chunks": len(self.chunks),
+            "dimension": self.index.d,
+            "shards": len(index_shards(self.index)),
+            "embedding_model": self.manifest.get("embedding_model"),
+            "loaded_at": self.loaded_at,
+        }
+
+
+def load_bundle(bundle_dir, load_index, load_bm25=True, checksums=True, embedding_model=None):
+    """
+    Loads and checks the bundle in bundle_dir.
+
+    Args:
+        load_index (callable): Reads a FAISS index file (the chatbot's search settings apply).
+        load_bm25 (bool): Also load the BM25 index (hybrid retrieval).
+        checksums (bool): Verify file checksums, not just sizes.
+        embedding_model (str, optional): Refuse bundles embedded with another model.
+    """
+    from backend.bm25 import BM25Index
+    from backend.chunk_store import ChunkStore
+
+    manifest = read_bundle_manifest(bundle_dir)
+    verify_bundle(bundle_dir, manifest, checksums=checksums)
+    bm25_path = os.path.join(bundle_dir, BM25_FILE)
+    return KnowledgeBase(
+        version=manifest["version"],
+        index=load_index(os.path.join(bundle_dir, INDEX_FILE)),
+        chunks=ChunkStore(os.path.join(bundle_dir, CHUNKS_FILE)),
+        bm25=BM25Index.load(bm25_path) if load_bm25 and os.path.exists(bm25_path) else None,
+        manifest=manifest,
+    ).check(embedding_model)
+
+
+class KnowledgeBaseManager:
+    """
+    Holds the live knowledge base and swaps in new bundles.
+
+    A new bundle is loaded and checked before the swap, in the thread that
+    asked for it; the swap itself is one reference assignment. Requests keep
+    the KnowledgeBase they got from current(), and a bundle that fails to
+    load leaves the live one in place.
+
+    Args:
+        loader (callable): Takes a bundle directory (None without root), returns a KnowledgeBase.
+        root (str, optional): Bundle root with the CURRENT file. A single, fixed knowledge base if not set.
+    """
+
+    def __init__(self, loader, root=None):
+        self.loader = loader
+        self.root = root
+        self.knowledge_base = None
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+        self.swap_listeners = []
+        self.swaps = 0
+        self.failures = 0
+        self.last_load_seconds = None
+        self.watcher = None
+
+    def _load(self, version):
+        start = time.perf_counter()
+        knowledge_base = self.loader(os.path.join(self.root, version) if self.root else None)
+        self.last_load_seconds = time.perf_counter() - start
+        return knowledge_base
+
+    def _swap(self, knowledge_base):
+        with self.lock:
+            self.knowledge_base = knowledge_base
+            self.swaps += 1
+        for listener in self.swap_listeners:
+            listener(knowledge_base)
+
+    def current(self):
+        knowledge_base = self.knowledge_base
+        if knowledge_base is None:
+            with self.reload_lock:
+                if self.knowledge_base is None:
+                    version = current_version(self.root) if self.root else None
+                    if self.root and version is None:
+                        raise FileNotFoundError(f"No published knowledge base in {self.root} (CURRENT is missing).")
+                    self._swap(self._load(version))
+            knowledge_base = self.knowledge_base
+        return knowledge_base
+
+    def reload(self, version=None):
+        """
+        Loads version (the one CURRENT names by default) and swaps it in.
+
+        Returns:
+            bool: Whether a new knowledge base was swapped in.
+        """
+        if not self.root:
+            return False
+        with self.reload_lock:
+            version = version or current_version(self.root)
+            if version is None or (self.knowledge_base is not None and self.knowledge_base.version == version):
+                return False
+            try:
+                knowledge_base = self._load(version)
+            except Exception:
+                self.failures += 1
+                raise
+            self._swap(knowledge_base)
+        print(f"Knowledge base {version} swapped in ({self.last_load_seconds:.2f} s to load)")
+        return True
+
+    def reload_in_background(self, version=None):
+        def run():
+            try:
+                self.reload(version)
+            except Exception as e:
+                print(f"Loading knowledge base {version or current_version(self.root)} failed, keeping "
+                      f"{self.knowledge_base.version if self.knowledge_base else 'none'}: {e}")
+        thread = threading.Thread(target=run, name="knowledge-base-reload", daemon=True)
+        thread.start()
+        return thread
+
+    # Poll CURRENT and swap in new versions as they are published
+    def watch(self, interval=30):
+        if not self.root or self.watcher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reload_in_background().join()
+        self.watcher = threading.Thread(target=run, name="knowledge-base-watcher", daemon=True)
+        self.watcher.start()
+
+    def stats(self):
+        knowledge_base = self.knowledge_base
+        return {
+            **(knowledge_base.stats() if knowledge_base else {"version": None}),
+            "swaps": self.swaps,
+            "failures": self.failures,
+            "last_load_seconds": self.last_load_seconds,
+        }
@@ -0,0 +1,25 @@
+'''
+ Language of user messages, so fixed replies (dispatcher templates,
+ prompts for missing fields) are given in the user's language.
+'''
+from langdetect import DetectorFactory, detect
+
+# Same text, same language (langdetect is randomized otherwise)
+DetectorFactory.seed = 0
+
+# Languages with translated replies; the UI is Turkish first
+LANGUAGES = ("tr", "en", "de", "fr", "es")
+DEFAULT_LANGUAGE = "tr"
+
+
+# Detect language
+def detect_language(text, default=DEFAULT_LANGUAGE):
+    try:
+        return detect(text)
+    except Exception:
+        return default
+
+
+# Pick the translation for lang, English for languages without one
+def translate(translations, lang):
+    return translations.get(lang, translations["en"])
@@ -1,102 +1,526 @@
 '''
  This file used for load the medical dataset
  and prepare dataset for RAG Funnctionality.
+
+ The dataset is streamed: parquet batches are read one at a time, records
+ are cleaned and chunked by a pool of worker processes, chunks are embedded
+ in batches and added to the chunk store and the FAISS index as they come,
+ so peak memory does not grow with the dataset. Reading and preprocessing
+ run ahead of embedding through a bounded queue.
+
+ With --incremental, chunks are keyed by content hash in a manifest
+ (manifest.db): duplicates and chunks indexed by an earlier run are not
+ embedded again, embeddings are checkpointed batch by batch so a crashed
+ build resumes where it stopped, and new chunks are appended to the chunk
+ store and an ID-mapped FAISS index.
+
+ With --shards N (FAISS_SHARDS), the FAISS index is written as N shards
+ (chunk i in shard i % N) that the chatbot searches in parallel.
+
+ With --bundle-root, the build goes to a new version directory under the
+ root, gets a bundle.json (embedding model, dimension, checksums, stats)
+ and is published by pointing <root>/CURRENT at it; running chatbots with
+ KNOWLEDGE_BASE_DIR=<root> swap it in. Incremental bundle builds start
+ from a copy of the live bundle.
+
+ Usage:
+    python backend/load_data.py --source hf://datasets/codexist/medical_data/data/train-00000-of-00001.parquet
+    python backend/load_data.py --source data.parquet --incremental
+    python backend/load_data.py --source data.parquet --bundle-root knowledge_base --incremental
 '''
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import pandas as pd
-import re
+import argparse
+import time
 import numpy as np
 import faiss
-from openai import OpenAI
-import concurrent.futures # for parallel threading
 from dotenv import load_dotenv
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.chunk_store import ChunkStore, ChunkStoreWriter
+from backend.index_factory import IncrementalIndexBuilder
+from backend.embeddings import get_embedding_provider
+from backend.batch_embedder import AdaptiveConcurrency, BatchEmbedder
+from backend.build_manifest import BuildManifest, chunk_hash
+from backend.sharded_index import ShardedIndexBuilder, find_shards, read_index, remove_index_files, write_shards
+from backend.knowledge_base import BUILD_MANIFEST, INDEX_FILE, new_version, prepare_bundle_dir, publish_bundle, write_bundle_manifest
+from backend.preprocess import Prefetcher, Preprocessor, clean_text, text_splitter
+from backend.vector_storage import STORAGE_DTYPES, encode, fit_int8, load_vectors, quant_path
+from backend.bm25 import BM25Writer
 
 
 load_dotenv()
-API_KEY = os.getenv("OPENAI_API_KEY")
-    
-client = OpenAI(api_key=API_KEY)
+
+# FAISS index type: flat (exact), ivf_flat, ivf_pq or hnsw
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+# Number of FAISS index shards, searched in parallel by the chatbot (1: a single index file)
+INDEX_SHARDS = int(os.getenv("FAISS_SHARDS", "1"))
+
+# dtype of data_embeddings.npy: float32, float16 (half the size) or int8 (scalar-quantized, a quarter)
+STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")
+
+# Cleaning / chunking worker processes (0: in the main process) and chunk batches queued ahead of embedding
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS") or os.cpu_count() or 1)
+PREPROCESS_QUEUE_SIZE = int(os.getenv("PREPROCESS_QUEUE_SIZE", "4"))
+
+# Embedding requests: token budget per request, parallel requests and price per 1M tokens (cost estimate)
+EMBED_MAX_TOKENS = int(os.getenv("EMBED_MAX_TOKENS", "100000"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "8"))
+EMBED_PRICE_PER_MTOK = float(os.getenv("EMBED_PRICE_PER_MTOK", "0.02"))
 
 df_link = "hf://datasets/codexist/medical_data/data/train-00000-of-00001.parquet"
 
-# Load the dataset from huggingface 
-def load_data():
-    # Login using e.g. `huggingface-cli login` to access this dataset
-    df = pd.read_parquet(df_link)
-    return df
-
-#Preprocessing 
-def clean_text(text):
-    if not isinstance(text, str):  
-        return ""  
-    
-    text = re.sub(r'\s+', ' ', text)  # Delete extra spaces 
-    text = text.strip()  # Delete spaces from begining and end
-    return text
-
-#Chunk the dataset with langchain
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size = 1000,
-    chunk_overlap = 150,
-    length_function=len
-)
-
-def generate_embeddings(texts):
-    def fetch_embedding(text, index):
-        response = client.embeddings.create(
-            input=text,
-            model="text-embedding-3-small"
-        )
-        return index, response.data[0].embedding
-    
-    embeddings = [None] * len(texts)  # Result list 
-    
-    # Use parallel threading 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(fetch_embedding, text, i): i for i, text in enumerate(texts)}
-        
-        for count, future in enumerate(concurrent.futures.as_completed(futures)):
-            index, embedding = future.result()
-            embeddings[index] = embedding  # Store the embedded texts as list 
-            
-            # Print progress 
-            if (count + 1) % 500 == 0 or count + 1 == len(texts):
-                print(f"Processed {count + 1}/{len(texts)} embeddings ({(count + 1) / len(texts) * 100:.2f}%)")
-    
-    return np.array(embeddings)
-
-# Load the dataset and clean
-df = load_data()
-df["clean_data"] = df["data"].apply(clean_text)
-
-# Create chunks
-chunks = text_splitter.create_documents([df.to_string()])
-
-# Return the chunks to dataframe and save as CSV file (Use the csv if needed to load the chunks)
-#chunks_df = pd.DataFrame([chunk.page_content for chunk in chunks], columns=["chunk"])
-#chunks_df.to_csv("chunks.csv", index=False)
-
-# Generate embeddings for chunks
-texts = [chunk.page_content for chunk in chunks]
-print("Embeddings started to create")
-embeddings = generate_embeddings(texts)
-print("Embeddings created succesfully.")
-# Save embeddings to a .npy file if needed
-np.save("data_embeddings.npy", embeddings)
-
-# Load embeddings from the .npy file (if needed)
-# embeddings = np.load("medical_data_embeddings.npy")
-
-# Save embeddings to FAISS
-dimension = embeddings.shape[1]  
-index = faiss.IndexFlatL2(dimension)  # L2 distance for similarity search
-index.add(embeddings)
-
-# Save the FAISS index to disk
-faiss.write_index(index, "data_index.faiss")
-
-print("Embeddings generated and saved to FAISS index and .npy file.")
+# Stream the text column of the dataset, one record at a time
+def iter_records(source=df_link, column="data", batch_rows=1024):
+    import pyarrow.parquet as pq
+
+    if "://" in source:
+        # Remote files (e.g. hf://, login using `huggingface-cli login`) are opened through fsspec
+        import fsspec
+        source = fsspec.open(source, "rb").open()
+    parquet_file = pq.ParquetFile(source)
+    for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=[column]):
+        yield from batch.column(0).to_pylist()
+
+# Clean and chunk each record in this process (chunks never span two records)
+def iter_chunks(records):
+    for record in records:
+        text = clean_text(record)
+        if text:
+            yield from text_splitter.split_text(text)
+
+# Group an iterable into lists of at most size items
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Batched embedder for a provider, sized by the EMBED_* settings
+def create_batch_embedder(embedding_provider, max_tokens=EMBED_MAX_TOKENS, max_concurrency=EMBED_MAX_CONCURRENCY):
+    concurrency = AdaptiveConcurrency(initial=min(4, max_concurrency), maximum=max_concurrency)
+    return BatchEmbedder(embedding_provider, max_tokens=max_tokens, concurrency=concurrency,
+                         price_per_million_tokens=EMBED_PRICE_PER_MTOK)
+
+
+class EmbeddingFileWriter:
+    """
+    Appends embedding batches to a raw float32 file and turns it into a .npy file
+    of the storage dtype (float32, float16 or int8) on close, without holding
+    all embeddings in memory. With append=True the rows of an existing .npy
+    file come first; if it has the same dtype its rows are copied as stored
+    and new int8 rows are encoded with its quantization parameters (values
+    outside its range are clipped), so appending never re-quantizes them.
+    """
+
+    def __init__(self, path, append=False, dtype=STORAGE_DTYPE, block_rows=65536):
+        self.path = path
+        self.raw_path = f"{path}.raw"
+        self.dtype = dtype
+        self.file = open(self.raw_path, "wb")
+        self.count = 0
+        self.dimension = None
+        self.existing = None
+        if append and os.path.exists(path):
+            existing = load_vectors(path)
+            if existing.dtype == dtype:
+                self.existing = existing
+                self.count = len(existing)
+                self.dimension = existing.shape[1]
+            else:
+                # Converted to the new dtype
+                for start in range(0, len(existing), block_rows):
+                    self.add(existing[start:start + block_rows])
+                del existing
+
+    def add(self, embeddings):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.dimension = embeddings.shape[1]
+        self.file.write(embeddings.tobytes())
+        self.count += len(embeddings)
+
+    def close(self, block_rows=65536):
+        self.file.close()
+        existing_rows = 0 if self.existing is None else len(self.existing)
+        new_rows = self.count - existing_rows
+        if new_rows:
+            raw = np.memmap(self.raw_path, dtype=np.float32, mode="r", shape=(new_rows, self.dimension))
+            quant = None if self.existing is None else self.existing.quant
+            if self.dtype == "int8" and quant is None:
+                # First pass for the value range of every dimension
+                minimums = np.full(self.dimension, np.inf, dtype=np.float32)
+                maximums = np.full(self.dimension, -np.inf, dtype=np.float32)
+                for start in range(0, new_rows, block_rows):
+                    minimums = np.minimum(minimums, raw[start:start + block_rows].min(axis=0))
+                    maximums = np.maximum(maximums, raw[start:start + block_rows].max(axis=0))
+                quant = fit_int8(minimums, maximums)
+            output = np.lib.format.open_memmap(f"{self.path}.tmp", mode="w+", dtype=np.dtype(self.dtype),
+                                               shape=(self.count, self.dimension))
+            for start in range(0, existing_rows, block_rows):
+                stop = min(start + block_rows, existing_rows)
+                output[start:stop] = self.existing.codes[start:stop]
+            for start in range(0, new_rows, block_rows):
+                output[existing_rows + start:existing_rows + start + block_rows] = encode(
+                    raw[start:start + block_rows], self.dtype, quant)
+            output.flush()
+            del raw, output
+            # The existing file is still memory-mapped until here
+            self.existing = None
+            os.replace(f"{self.path}.tmp", self.path)
+            if quant is not None:
+                np.save(quant_path(self.path), quant)
+            elif os.path.exists(quant_path(self.path)):
+                os.remove(quant_path(self.path))
+        self.existing = None
+        os.remove(self.raw_path)
+
+
+# Processed records / chunks and throughput, printed every few seconds
+class Progress:
+    def __init__(self, every_seconds=10):
+        self.start = self.last_report = time.perf_counter()
+        self.every_seconds = every_seconds
+        self.chunks = 0
+        self.embed_seconds = 0.0
+
+    def update(self, chunks, embed_seconds, force=False):
+        self.chunks += chunks
+        self.embed_seconds += embed_seconds
+        now = time.perf_counter()
+        if force or now - self.last_report >= self.every_seconds:
+            self.last_report = now
+            elapsed = now - self.start
+            print(f"{self.chunks} chunks in {elapsed:.0f} s ({self.chunks / max(elapsed, 1e-9):.1f} chunks/s, "
+                  f"{self.embed_seconds / max(elapsed, 1e-9) * 100:.0f}% of the time embedding)")
+
+
+# Peak resident memory of this process in MB (None where unavailable)
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Chunk batches of records: cleaned and chunked by worker processes, queued ahead of the consumer
+def chunk_batches(records, embed_batch_size, workers=PREPROCESS_WORKERS, queue_size=PREPROCESS_QUEUE_SIZE):
+    preprocessor = Preprocessor(workers=workers)
+    batches = Prefetcher(batched(preprocessor.iter_chunks(records), embed_batch_size), maxsize=queue_size)
+    return preprocessor, batches
+
+
+# Time spent per stage, and how much the preprocessing pool and the queue saved
+def stage_report(preprocessor, batches, progress):
+    stats = preprocessor.stats()
+    stages = {
+        "preprocess_workers": stats["workers"],
+        "preprocess_cpu_seconds": stats["cpu_seconds"],
+        "preprocess_wall_seconds": stats["wall_seconds"],
+        "preprocess_speedup": stats["parallel_speedup"],
+        "embed_seconds": progress.embed_seconds,
+        # Embedding idle waiting for chunks; without the queue it would also wait for all of preprocessing
+        "embed_wait_seconds": batches.wait_seconds,
+        "overlap_seconds": max(0.0, stats["wall_seconds"] - batches.wait_seconds),
+    }
+    print(f"Preprocessing: {stages['preprocess_workers']} workers, {stages['preprocess_cpu_seconds']:.1f} s CPU in "
+          f"{stages['preprocess_wall_seconds']:.1f} s ({stages['preprocess_speedup']:.1f}x), "
+          f"{stages['overlap_seconds']:.1f} s overlapped with embedding. Embedding: "
+          f"{stages['embed_seconds']:.1f} s, {stages['embed_wait_seconds']:.1f} s waiting for chunks.")
+    return stages
+
+
+# Build the BM25 lexical index from the chunk store (for hybrid retrieval)
+def build_bm25(chunks_path, bm25_path):
+    chunks = ChunkStore(chunks_path)
+    # Postings are spilled to disk batch by batch, memory doesn't grow with the corpus
+    with BM25Writer(bm25_path) as writer:
+        for i in range(len(chunks)):
+            writer.add(chunks[i])
+    chunks.close()
+
+
+# Number of records in the dataset, read from the parquet footer
+def count_records(source=df_link):
+    import pyarrow.parquet as pq
+
+    if "://" in source:
+        import fsspec
+        with fsspec.open(source, "rb") as f:
+            return pq.ParquetFile(f).metadata.num_rows
+    return pq.ParquetFile(source).metadata.num_rows
+
+
+def build_knowledge_index(records, embedding_provider, output_dir=".", index_type=INDEX_TYPE, embed_batch_size=4096,
+                          embedder=None, storage_dtype=STORAGE_DTYPE, workers=PREPROCESS_WORKERS,
+                          queue_size=PREPROCESS_QUEUE_SIZE, shards=INDEX_SHARDS, expected_vectors=None):
+    """
+    Streams records through cleaning, chunking, embedding and indexing.
+
+    Writes chunks.store, data_index.faiss, data_embeddings.npy and bm25.npz
+    to output_dir. Chunk i of the store is row i of the FAISS index, or
+    with shards > 1 id i of shard i % shards (data_index.<n>-of-<shards>.faiss).
+
+    embed_batch_size chunks are handed to the embedder at a time, which
+    splits them into token-limited requests sent in parallel. workers
+    processes clean and chunk records, up to queue_size batches ahead.
+    expected_vectors (e.g. the record count) sizes IVF indexes before the
+    number of chunks is known.
+
+    Returns:
+        dict: Number of chunks, seconds, throughput, peak memory, embedding and stage stats.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # Every file is replaced, so the manifest of an earlier incremental build no longer applies
+    if os.path.exists(os.path.join(output_dir, BUILD_MANIFEST)):
+        os.remove(os.path.join(output_dir, BUILD_MANIFEST))
+    chunks_path = os.path.join(output_dir, "chunks.store")
+    if shards > 1:
+        index_builder = ShardedIndexBuilder(shards, index_type=index_type,
+                                            expected_vectors=expected_vectors and max(1, expected_vectors // shards))
+    else:
+        index_builder = IncrementalIndexBuilder(index_type=index_type, expected_vectors=expected_vectors)
+    embeddings_file = EmbeddingFileWriter(os.path.join(output_dir, "data_embeddings.npy"), dtype=storage_dtype)
+    embedder = embedder or create_batch_embedder(embedding_provider)
+    progress = Progress()
+
+    preprocessor, batches = chunk_batches(records, embed_batch_size, workers=workers, queue_size=queue_size)
+
+    print("Embeddings started to create")
+    with ChunkStoreWriter(chunks_path) as chunk_writer:
+        for batch in batches:
+            start = time.perf_counter()
+            embeddings = embedder.embed(batch)
+            embed_seconds = time.perf_counter() - start
+
+            first_id = len(chunk_writer)
+            for text in batch:
+                chunk_writer.add(text)
+            embeddings_file.add(embeddings)
+            if shards > 1:
+                index_builder.add(embeddings, np.arange(first_id, first_id + len(batch)))
+            else:
+                index_builder.add(embeddings)
+            progress.update(len(batch), embed_seconds)
+    embeddings_file.close()
+    progress.update(0, 0.0, force=True)
+    print("Embeddings created succesfully.")
+    print(embedder.summary())
+    stages = stage_report(preprocessor, batches, progress)
+
+    # Save the FAISS index (or its shards) to disk
+    faiss_path = os.path.join(output_dir, "data_index.faiss")
+    if shards > 1:
+        write_shards(index_builder.finish(), faiss_path)
+    else:
+        remove_index_files(faiss_path)
+        faiss.write_index(index_builder.finish(), faiss_path)
+
+    build_bm25(chunks_path, os.path.join(output_dir, "bm25.npz"))
+
+    seconds = time.perf_counter() - progress.start
+    return {
+        "chunks": progress.chunks,
+        "seconds": seconds,
+        "chunks_per_second": progress.chunks / max(seconds, 1e-9),
+        "peak_memory_mb": peak_memory_mb(),
+        "embedding": embedder.stats(),
+        "stages": stages,
+    }
+
+
+# Append the manifest's pending chunks to the chunk store, embeddings file and FAISS index
+def apply_pending(manifest, output_dir, index_type=INDEX_TYPE, storage_dtype=STORAGE_DTYPE, shards=1):
+    chunks_path = os.path.join(output_dir, "chunks.store")
+    faiss_path = os.path.join(output_dir, "data_index.faiss")
+    if not manifest.pending_count():
+        return 0
+    shard_files = find_shards(faiss_path)
+    existing_shards = len(shard_files) or (1 if os.path.exists(faiss_path) else shards)
+    if existing_shards != shards:
+        raise ValueError(f"{faiss_path} has {existing_shards} shards, not {shards}. Rebuild it with "
+                         f"--incremental in an empty output directory.")
+    if shard_files:
+        indexes = [faiss.read_index(shard_file) for shard_file in shard_files]
+    else:
+        indexes = [faiss.read_index(faiss_path)] if os.path.exists(faiss_path) else []
+    if any(not isinstance(index, faiss.IndexIDMap2) for index in indexes):
+        raise ValueError(f"{faiss_path} was not built incrementally. Rebuild it with --incremental "
+                         f"in an empty output directory.")
+    # New indexes are sized for the chunks waiting to be added
+    expected_vectors = max(1, manifest.pending_count() // shards)
+    if shards > 1:
+        index_builder = ShardedIndexBuilder(shards, indexes=indexes or None, index_type=index_type,
+                                            expected_vectors=expected_vectors)
+    else:
+        index_builder = IncrementalIndexBuilder(index_type=index_type, id_map=True, index=indexes[0] if indexes else None,
+                                                expected_vectors=expected_vectors)
+    # Vectors each shard holds; shard s holds ids s, s + shards, ... in order
+    indexed = np.array([index.ntotal for index in indexes] or [0] * shards, dtype=np.int64)
+
+    # Each file skips the ids it already holds, so re-applying after a crash is safe
+    added = 0
+    embeddings_file = EmbeddingFileWriter(os.path.join(output_dir, "data_embeddings.npy"), append=True,
+                                          dtype=storage_dtype)
+    with ChunkStoreWriter(chunks_path, append=True) as chunk_writer:
+        for ids, texts, embeddings in manifest.pending():
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id >= len(chunk_writer):
+                    chunk_writer.add(text)
+            new = ids >= embeddings_file.count
+            embeddings_file.add(embeddings[new])
+            new = ids // shards >= indexed[ids % shards]
+            if new.any():
+                index_builder.add(embeddings[new], ids[new])
+            added += len(ids)
+    embeddings_file.close()
+
+    if shards > 1:
+        write_shards(index_builder.finish(), faiss_path)
+    else:
+        index = index_builder.finish()
+        if index is not None:
+            faiss.write_index(index, f"{faiss_path}.tmp")
+            os.replace(f"{faiss_path}.tmp", faiss_path)
+    manifest.mark_indexed()
+    return added
+
+
+def build_incremental_index(records, embedding_provider, output_dir=".", index_type=INDEX_TYPE, embed_batch_size=4096,
+                            embedder=None, storage_dtype=STORAGE_DTYPE, workers=PREPROCESS_WORKERS,
+                            queue_size=PREPROCESS_QUEUE_SIZE, shards=INDEX_SHARDS):
+    """
+    Adds the chunks of records that are not indexed yet.
+
+    New chunks are embedded once per content hash and checkpointed in
+    output_dir/manifest.db after every batch; the chunk store, embeddings
+    file, FAISS index and BM25 index are then extended with them.
+
+    Returns:
+        dict: Chunks seen, new and skipped, seconds, throughput, peak memory, embedding and stage stats.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = BuildManifest(os.path.join(output_dir, BUILD_MANIFEST))
+    manifest.check("embedding_model", embedding_provider.name)
+    manifest.check("index_type", index_type)
+    manifest.check("index_shards", shards)
+    embedder = embedder or create_batch_embedder(embedding_provider)
+    progress = Progress()
+    resumed = len(manifest)
+    new_chunks = 0
+
+    preprocessor, batches = chunk_batches(records, embed_batch_size, workers=workers, queue_size=queue_size)
+
+    print(f"Incremental build, {resumed} chunks already in the manifest")
+    for batch in batches:
+        # Identical chunks are embedded and stored once
+        texts = {}
+        for text in batch:
+            texts.setdefault(chunk_hash(text), text)
+        known = manifest.known(texts)
+        texts = {h: text for h, text in texts.items() if h not in known}
+
+        start = time.perf_counter()
+        if texts:
+            embeddings = embedder.embed(list(texts.values()))
+            manifest.add(list(texts), list(texts.values()), embeddings)
+            new_chunks += len(texts)
+        progress.update(len(batch), time.perf_counter() - start)
+    progress.update(0, 0.0, force=True)
+    if new_chunks:
+        print(embedder.summary())
+    stages = stage_report(preprocessor, batches, progress)
+
+    added = apply_pending(manifest, output_dir, index_type=index_type, storage_dtype=storage_dtype, shards=shards)
+    bm25_path = os.path.join(output_dir, "bm25.npz")
+    if added or not os.path.exists(bm25_path):
+        build_bm25(os.path.join(output_dir, "chunks.store"), bm25_path)
+    total = len(manifest)
+    manifest.close()
+
+    seconds = time.perf_counter() - progress.start
+    return {
+        "chunks": progress.chunks,
+        "new_chunks": new_chunks,
+        "skipped_chunks": progress.chunks - new_chunks,
+        "indexed_chunks": total,
+        "seconds": seconds,
+        "chunks_per_second": progress.chunks / max(seconds, 1e-9),
+        "peak_memory_mb": peak_memory_mb(),
+        "embedding": embedder.stats(),
+        "stages": stages,
+    }
+
+
+# Write bundle.json for a finished build and make it the live bundle
+def publish_knowledge_base(bundle_root, version, embedding_provider, index_type, summary):
+    bundle_dir = os.path.join(bundle_root, version)
+    index = read_index(os.path.join(bundle_dir, INDEX_FILE), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    write_bundle_manifest(bundle_dir, embedding_provider.name, index.d, index_type, stats=summary)
+    publish_bundle(bundle_root, version)
+    print(f"Published knowledge base {version} in {bundle_root}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the chunk store, FAISS and BM25 indexes from the dataset.")
+    parser.add_argument("--source", default=df_link, help="Parquet file, local path or fsspec URL")
+    parser.add_argument("--column", default="data", help="Text column of the dataset")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--index-type", default=INDEX_TYPE)
+    parser.add_argument("--shards", type=int, default=INDEX_SHARDS,
+                        help="Number of FAISS index shards, searched in parallel")
+    parser.add_argument("--batch-rows", type=int, default=1024, help="Parquet rows read at a time")
+    parser.add_argument("--embed-batch-size", type=int, default=4096, help="Chunks embedded and indexed at a time")
+    parser.add_argument("--max-tokens", type=int, default=EMBED_MAX_TOKENS, help="Token budget of one embeddings request")
+    parser.add_argument("--max-concurrency", type=int, default=EMBED_MAX_CONCURRENCY, help="Parallel embeddings requests")
+    parser.add_argument("--workers", type=int, default=PREPROCESS_WORKERS,
+                        help="Processes cleaning and chunking records (0: in the main process)")
+    parser.add_argument("--queue-size", type=int, default=PREPROCESS_QUEUE_SIZE,
+                        help="Chunk batches prepared ahead of embedding")
+    parser.add_argument("--storage-dtype", default=STORAGE_DTYPE, choices=STORAGE_DTYPES,
+                        help="dtype of data_embeddings.npy")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only embed chunks not indexed yet, resumable (manifest.db in the output directory)")
+    parser.add_argument("--bundle-root", default=None,
+                        help="Write a versioned knowledge base bundle under this directory instead of --output-dir")
+    parser.add_argument("--version", default=None,
+                        help="Bundle version (a timestamp by default), reuse it to resume an interrupted build")
+    args = parser.parse_args()
+
+    # Embedding provider (EMBEDDING_PROVIDER=openai or local), the chatbot must use the same one
+    embedding_provider = get_embedding_provider()
+    embedder = create_batch_embedder(embedding_provider, max_tokens=args.max_tokens, max_concurrency=args.max_concurrency)
+    records = iter_records(args.source, column=args.column, batch_rows=args.batch_rows)
+    output_dir = args.output_dir
+    if args.bundle_root:
+        version = args.version or new_version()
+        output_dir = prepare_bundle_dir(args.bundle_root, version, copy_current=args.incremental)
+    settings = dict(output_dir=output_dir, index_type=args.index_type, embed_batch_size=args.embed_batch_size,
+                    embedder=embedder, storage_dtype=args.storage_dtype, workers=args.workers,
+                    queue_size=args.queue_size, shards=args.shards)
+    if args.incremental:
+        summary = build_incremental_index(records, embedding_provider, **settings)
+    else:
+        # Every record gives at least one chunk, enough to size IVF indexes before the stream ends
+        expected_vectors = count_records(args.source)
+        print(f"{expected_vectors} records in {args.source}")
+        summary = build_knowledge_index(records, embedding_provider, expected_vectors=expected_vectors, **settings)
+    if args.bundle_root:
+        publish_knowledge_base(args.bundle_root, version, embedding_provider, args.index_type, summary)
 
+    peak = summary["peak_memory_mb"]
+    print(f"Indexed {summary['chunks']} chunks in {summary['seconds']:.1f} s "
+          f"({summary['chunks_per_second']:.1f} chunks/s), peak memory "
+          f"{'n/a' if peak is None else f'{peak:.0f} MB'}.")
+    if args.incremental:
+        print(f"{summary['new_chunks']} new chunks embedded, {summary['skipped_chunks']} skipped, "
+              f"{summary['indexed_chunks']} chunks in the index.")
+    print("Embeddings generated and saved to FAISS index and .npy file.")
 
 
+if __name__ == "__main__":
+    main()
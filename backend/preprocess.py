@@ -0,0 +1,196 @@
+'''
+ Cleaning and chunking stage of the ingestion pipeline.
+ Records are grouped into partitions that worker processes clean with
+ vectorized Arrow string kernels and split into chunks, in parallel and in
+ order. A bounded queue between this stage and the embedding stage lets
+ both run at the same time without buffering the dataset.
+'''
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# Python's \s (str.isspace) as an RE2 character class, for the Arrow kernels
+WHITESPACE = r"[\t-\r\x{1c}-\x{1f}\x{85}\p{Z}]+"
+
+#Chunk the dataset with langchain
+text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size = 1000,
+    chunk_overlap = 150,
+    length_function=len
+)
+
+#Preprocessing
+def clean_text(text):
+    if not isinstance(text, str):
+        return ""
+
+    text = re.sub(r'\s+', ' ', text)  # Delete extra spaces
+    text = text.strip()  # Delete spaces from begining and end
+    return text
+
+
+def clean_texts(texts):
+    """
+    clean_text for a whole partition with Arrow string kernels.
+
+    Returns:
+        list: Cleaned texts, empty and missing ones dropped.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    array = pa.array([text if isinstance(text, str) else None for text in texts], type=pa.large_string())
+    array = pc.utf8_trim(pc.replace_substring_regex(array, WHITESPACE, " "), " ")
+    array = array.filter(pc.greater(pc.utf8_length(array), 0))
+    return array.to_pylist()
+
+
+# Clean and chunk one partition of records (runs in a worker process)
+def preprocess_partition(records):
+    start = time.process_time()
+    chunks = []
+    for text in clean_texts(records):
+        chunks.extend(text_splitter.split_text(text))
+    return chunks, time.process_time() - start
+
+
+# Group records into lists of partition_size
+def partitions(records, partition_size):
+    partition = []
+    for record in records:
+        partition.append(record)
+        if len(partition) == partition_size:
+            yield partition
+            partition = []
+    if partition:
+        yield partition
+
+
+class Preprocessor:
+    """
+    Cleans and chunks records in a pool of worker processes.
+
+    Partitions are processed in parallel and their chunks come out in
+    record order. At most 2 * workers partitions are in flight.
+
+    Args:
+        workers (int): Worker processes, 0 to clean and chunk in this process.
+        partition_size (int): Records per partition.
+    """
+
+    def __init__(self, workers=None, partition_size=512):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.partition_size = partition_size
+        self.partitions = 0
+        self.chunks = 0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def _results(self, records):
+        if self.workers == 0:
+            for partition in partitions(records, self.partition_size):
+                yield preprocess_partition(partition)
+            return
+        # Spawned, not forked: the embedding stage runs threads while the pool starts
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            pending = deque()
+            for partition in partitions(records, self.partition_size):
+                pending.append(executor.submit(preprocess_partition, partition))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def iter_chunks(self, records):
+        """
+        Yields the chunks of records, in order.
+        """
+        start = time.perf_counter()
+        for chunks, cpu_seconds in self._results(records):
+            self.partitions += 1
+            self.chunks += len(chunks)
+            self.cpu_seconds += cpu_seconds
+            self.wall_seconds = time.perf_counter() - start
+            yield from chunks
+        self.wall_seconds = time.perf_counter() - start
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "partitions": self.partitions,
+            "chunks": self.chunks,
+            "cpu_seconds": self.cpu_seconds,
+            "wall_seconds": self.wall_seconds,
+            # Worker CPU time per second of stage time, ~1 when serial
+            "parallel_speedup": self.cpu_seconds / self.wall_seconds if self.wall_seconds else 0.0,
+        }
+
+
+_DONE = object()
+
+
+class Prefetcher:
+    """
+    Runs an iterator in a background thread, feeding a bounded queue.
+
+    The consumer gets items as soon as they are ready while the producer
+    works ahead by at most maxsize items. Exceptions of the producer are
+    raised in the consumer.
+
+    Args:
+        items (iterable): Items to produce.
+        maxsize (int): Capacity of the queue.
+    """
+
+    def __init__(self, items, maxsize=4):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.wait_seconds = 0.0
+        self.error = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._produce, args=(items,), name="prefetcher", daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, items):
+        try:
+            for item in items:
+                if not self._put(item):
+                    # Generators release their resources (e.g. a process pool) on close
+                    getattr(items, "close", lambda: None)()
+                    return
+        except BaseException as e:
+            self.error = e
+        self._put(_DONE)
+
+    def __iter__(self):
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self.queue.get()
+                # Time the consumer sat idle waiting for the producer
+                self.wait_seconds += time.perf_counter() - start
+                if item is _DONE:
+                    self.thread.join()
+                    if self.error is not None:
+                        raise self.error
+                    return
+                yield item
+        finally:
+            # The consumer stopped early (or finished): let the producer exit
+            self.stopped.set()
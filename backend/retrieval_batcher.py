@@ -0,0 +1,104 @@
+'''
+ Micro-batching retrieval for concurrent chat sessions.
+ Queries arriving within a short window are embedded with one
+ embeddings request and searched with one FAISS call per index.
+'''
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class RetrievalBatcher:
+    """
+    Coalesces concurrent retrieval requests into batches.
+
+    Args:
+        embed_batch (callable): Takes a list of queries, returns an (n, dimension) float32 array.
+        window_ms (float): How long the first query of a batch waits for more queries.
+        max_batch_size (int): Maximum number of queries in one batch.
+    """
+
+    def __init__(self, embed_batch, window_ms=5, max_batch_size=32):
+        self.embed_batch = embed_batch
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.queue = queue.Queue()
+        self.batch_sizes = Counter()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def _start(self):
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="retrieval-batcher", daemon=True)
+                self.worker.start()
+
+    def submit(self, query, faiss_index, k=5):
+        """
+        Queues a query and returns a Future of (query embedding, similar indexes).
+        """
+        if self.worker is None:
+            self._start()
+        future = Future()
+        self.queue.put((query, faiss_index, k, future))
+        return future
+
+    def retrieve(self, query, faiss_index, k=5):
+        return self.submit(query, faiss_index, k).result()
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batch_sizes[len(batch)] += 1
+            try:
+                self._process(batch)
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        # Queries whose caller gave up (a discarded speculative retrieval) are dropped
+        batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        embeddings = self.embed_batch([query for query, *_ in batch])
+
+        # One search per distinct index, with the largest k asked for
+        groups = {}
+        for position, (_, faiss_index, k, _) in enumerate(batch):
+            groups.setdefault(id(faiss_index), (faiss_index, []))[1].append(position)
+
+        for faiss_index, positions in groups.values():
+            k = max(batch[p][2] for p in positions)
+            _, indexes = faiss_index.search(np.ascontiguousarray(embeddings[positions]), k)
+            for row, p in enumerate(positions):
+                batch[p][3].set_result((embeddings[p], indexes[row][:batch[p][2]]))
+
+    def stats(self):
+        batches = sum(self.batch_sizes.values())
+        queries = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "batches": batches,
+            "queries": queries,
+            "mean_batch_size": queries / batches if batches else 0.0,
+            "max_batch_size": max(self.batch_sizes, default=0),
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+        }
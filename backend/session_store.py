@@ -0,0 +1,240 @@
+'''
+ Conversation state of chat sessions, keyed by Gradio's session hash.
+ The in-memory store is bounded by TTL, number of sessions (LRU) and
+ approximate memory. The SQLite store shares sessions between worker
+ processes. Both count evictions by reason and tell listeners (e.g.
+ the per-session agents) which sessions are gone.
+'''
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# State of a session that has not started a request yet
+def new_session_state():
+    return {
+        "missing_params": [],
+        "reset_status": True,
+        "data": {},
+    }
+
+
+class SessionStore:
+    """
+    Base class for session stores.
+
+    get() returns the session's state dict (a new one for unknown or expired
+    sessions), the caller mutates it and hands it back with save().
+    """
+
+    def __init__(self):
+        self.evictions = Counter()
+        self.hits = 0
+        self.misses = 0
+        self.eviction_listeners = []
+
+    # Tell listeners that sessions were evicted or deleted
+    def _notify(self, session_ids):
+        for session_id in session_ids:
+            for listener in self.eviction_listeners:
+                listener(session_id)
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def save(self, session_id, state):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {
+            "sessions": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted_ttl": self.evictions["ttl"],
+            "evicted_lru": self.evictions["lru"],
+            "evicted_memory": self.evictions["memory"],
+        }
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process LRU of session states.
+
+    Args:
+        ttl (float): Seconds of inactivity after which a session expires.
+        max_sessions (int): Maximum number of sessions, least recently used are evicted first.
+        max_bytes (int, optional): Cap on the approximate (JSON) size of all states.
+        clock (callable): Time source, seconds.
+    """
+
+    def __init__(self, ttl=1800, max_sessions=1000, max_bytes=None, clock=time.monotonic):
+        super().__init__()
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # session id -> [state, last access, size], least recent first
+        self.total_bytes = 0
+
+    def _remove(self, session_id, reason):
+        _, _, size = self.sessions.pop(session_id)
+        self.total_bytes -= size
+        self.evictions[reason] += 1
+        self._notify([session_id])
+
+    def _evict(self):
+        expired_before = self.clock() - self.ttl
+        while self.sessions:
+            session_id, (_, last_access, _) = next(iter(self.sessions.items()))
+            if last_access < expired_before:
+                self._remove(session_id, "ttl")
+            elif len(self.sessions) > self.max_sessions:
+                self._remove(session_id, "lru")
+            elif self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self.sessions) > 1:
+                self._remove(session_id, "memory")
+            else:
+                break
+
+    def get(self, session_id):
+        with self.lock:
+            self._evict()
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                self.misses += 1
+                entry = self.sessions[session_id] = [new_session_state(), self.clock(), 0]
+            else:
+                self.hits += 1
+                entry[1] = self.clock()
+                self.sessions.move_to_end(session_id)
+            return entry[0]
+
+    def save(self, session_id, state):
+        size = len(json.dumps(state, default=str))
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                entry = self.sessions[session_id] = [state, 0, 0]
+            self.total_bytes += size - entry[2]
+            entry[0], entry[1], entry[2] = state, self.clock(), size
+            self.sessions.move_to_end(session_id)
+            self._evict()
+
+    def delete(self, session_id):
+        with self.lock:
+            if session_id in self.sessions:
+                _, _, size = self.sessions.pop(session_id)
+                self.total_bytes -= size
+        self._notify([session_id])
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def stats(self):
+        return {**super().stats(), "bytes": self.total_bytes}
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session states in a SQLite file, shared by every worker on the host.
+
+    Args:
+        db_path (str): SQLite file.
+        ttl (float): Seconds of inactivity after which a session expires.
+        max_sessions (int): Maximum number of sessions, least recently used are evicted first.
+        clock (callable): Time source, seconds since the epoch (shared between processes).
+    """
+
+    def __init__(self, db_path="sessions.db", ttl=1800, max_sessions=10000, clock=time.time):
+        super().__init__()
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self.connection.commit()
+
+    def _evict(self):
+        for reason, query, params in [
+            ("ttl", "SELECT id FROM sessions WHERE updated_at < ?", (self.clock() - self.ttl,)),
+            ("lru", "SELECT id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?", (self.max_sessions,)),
+        ]:
+            session_ids = [row[0] for row in self.connection.execute(query, params)]
+            if session_ids:
+                self.connection.executemany("DELETE FROM sessions WHERE id = ?", [(i,) for i in session_ids])
+                self.evictions[reason] += len(session_ids)
+                self._notify(session_ids)
+
+    def get(self, session_id):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT state, updated_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[1] < self.clock() - self.ttl:
+                self.misses += 1
+                if row is not None:
+                    # Expired, possibly evicted by another worker's clock first
+                    self._notify([session_id])
+                return new_session_state()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def save(self, session_id, state):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(state, default=str), self.clock())
+            )
+            self._evict()
+            self.connection.commit()
+
+    def delete(self, session_id):
+        with self.lock:
+            self.connection.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self.connection.commit()
+        self._notify([session_id])
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+# Store selected by SESSION_STORE (memory or sqlite)
+def get_session_store(name=None):
+    name = name or os.getenv("SESSION_STORE", "memory")
+    ttl = float(os.getenv("SESSION_TTL", "1800"))
+    if name == "memory":
+        max_bytes = os.getenv("SESSION_MAX_BYTES")
+        return MemorySessionStore(
+            ttl=ttl,
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "1000")),
+            max_bytes=int(max_bytes) if max_bytes else None,
+        )
+    if name == "sqlite":
+        return SQLiteSessionStore(
+            db_path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+            ttl=ttl,
+            max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "10000")),
+        )
+    raise ValueError(f"Unknown session store: {name}. Use memory or sqlite.")
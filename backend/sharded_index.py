@@ -0,0 +1,141 @@
+'''
+ FAISS index split into shards that are searched in parallel.
+ Chunk i goes to shard i % shards, an ID-mapped index that keeps the chunk
+ ids, so shards stay balanced while the corpus is streamed in and need no
+ renumbering. At search time the shards are put in a faiss.IndexShards:
+ every query fans out to all shards on one thread per shard and the
+ per-shard top-k lists are merged into the global top-k.
+
+ Layout (next to / instead of data_index.faiss):
+    data_index.1-of-4.faiss, data_index.2-of-4.faiss, ...
+'''
+import glob
+import os
+import re
+
+import faiss
+import numpy as np
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.index_factory import IncrementalIndexBuilder
+
+SHARD_PATTERN = re.compile(r"\.(\d+)-of-(\d+)$")
+
+
+# File of shard (0-based) out of shards for the index at path
+def shard_path(path, shard, shards):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard + 1}-of-{shards}{ext}"
+
+
+# Files that look like shards of the index at path, any shard count
+def _shard_files(path):
+    root, ext = os.path.splitext(path)
+    return glob.glob(f"{glob.escape(root)}.*-of-*{ext}")
+
+
+def find_shards(path):
+    """
+    Shard files of the index at path, in shard order.
+
+    Returns:
+        list: Shard paths, empty if the index is not sharded.
+    """
+    found = {}
+    for shard_file in _shard_files(path):
+        match = SHARD_PATTERN.search(os.path.splitext(shard_file)[0])
+        if match:
+            found.setdefault(int(match.group(2)), []).append(shard_file)
+    if not found:
+        return []
+    if len(found) > 1:
+        raise ValueError(f"Shard files of {path} with different shard counts: {sorted(found)}.")
+    shards = next(iter(found))
+    paths = [shard_path(path, shard, shards) for shard in range(shards)]
+    missing = [shard_file for shard_file in paths if not os.path.exists(shard_file)]
+    if missing:
+        raise ValueError(f"Sharded index {path} is missing {', '.join(missing)}.")
+    return paths
+
+
+# Delete the index at path, sharded or not
+def remove_index_files(path):
+    for index_file in [path] + _shard_files(path):
+        if os.path.exists(index_file):
+            os.remove(index_file)
+
+
+class ShardedIndexBuilder:
+    """
+    Fills shards batch by batch, chunk id i going to shard i % shards.
+
+    Each shard is an IncrementalIndexBuilder with id_map=True, so IVF / PQ
+    shards are trained on their own first vectors.
+
+    Args:
+        shards (int): Number of shards.
+        indexes (list, optional): Existing shards to continue filling.
+        **kwargs: IncrementalIndexBuilder settings (index_type, nlist, ...).
+    """
+
+    def __init__(self, shards, indexes=None, **kwargs):
+        if indexes is not None and len(indexes) != shards:
+            raise ValueError(f"Index has {len(indexes)} shards, not {shards}.")
+        indexes = indexes or [None] * shards
+        self.shards = shards
+        self.builders = [IncrementalIndexBuilder(id_map=True, index=index, **kwargs) for index in indexes]
+
+    def add(self, embeddings, ids):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        shard_ids = ids % self.shards
+        for shard, builder in enumerate(self.builders):
+            rows = shard_ids == shard
+            if rows.any():
+                builder.add(embeddings[rows], ids[rows])
+
+    def finish(self):
+        return [builder.finish() for builder in self.builders]
+
+
+def write_shards(indexes, path):
+    """
+    Writes the shards of the index at path, replacing whatever index was there.
+    """
+    shards = len(indexes)
+    for shard, index in enumerate(indexes):
+        shard_file = shard_path(path, shard, shards)
+        faiss.write_index(index, f"{shard_file}.tmp")
+        os.replace(f"{shard_file}.tmp", shard_file)
+    # An unsharded index or shards of another shard count
+    keep = {shard_path(path, shard, shards) for shard in range(shards)}
+    for index_file in [path] + _shard_files(path):
+        if index_file not in keep and os.path.exists(index_file):
+            os.remove(index_file)
+
+
+# Combine shards into one index whose searches fan out to all of them
+def shard_index(indexes, threaded=True):
+    # successive_ids=False: shards return the chunk ids they were given
+    index = faiss.IndexShards(indexes[0].d, threaded, False)
+    for shard in indexes:
+        index.add_shard(shard)
+    return index
+
+
+def read_index(path, io_flags=0, threaded=True):
+    """
+    Reads the index at path, sharded (as a faiss.IndexShards) or not.
+    """
+    shard_files = find_shards(path)
+    if not shard_files:
+        return faiss.read_index(path, io_flags)
+    return shard_index([faiss.read_index(shard_file, io_flags) for shard_file in shard_files], threaded=threaded)
+
+
+# Shards of an index as a list (the index itself if it's not sharded)
+def index_shards(index):
+    if isinstance(index, faiss.IndexShards):
+        return [faiss.downcast_index(index.at(i)) for i in range(index.count())]
+    return [index]
@@ -0,0 +1,247 @@
+'''
+ Lightweight tracing for the chat pipeline.
+ Stages (analyze_request, embedding, FAISS search, completion, agent,
+ booking API calls ...) are timed with spans, token usage is taken from
+ OpenAI responses and component stats() (cache hit rates) are collected.
+ Everything is exported as Prometheus text and as one JSON log line per
+ chat turn. Each process exports its own tracer: the chatbot (ui/app.py)
+ serves /metrics on METRICS_PORT, the Flask app serves its API latencies
+ on its own /metrics route.
+
+ With TRACING_ENABLED=0 spans are a shared no-op context manager.
+'''
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Histogram buckets of stage latency, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NOOP_SPAN = nullcontext()
+
+# Turn of the running request, set by the UI around each chat turn
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+class Turn:
+    """
+    Stage timings and token usage of one chat turn.
+    """
+
+    def __init__(self, **fields):
+        self.id = uuid.uuid4().hex[:12]
+        self.start = time.perf_counter()
+        self.fields = fields
+        self.stages = defaultdict(float)
+        self.tokens = defaultdict(int)
+
+    def record(self):
+        return {
+            "event": "chat_turn",
+            "turn_id": self.id,
+            **self.fields,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()},
+            "tokens": dict(self.tokens),
+        }
+
+
+class Tracer:
+    """
+    Per-stage latency histograms, token counters and registered component stats.
+
+    Args:
+        enabled (bool): Record anything at all.
+        log_turns (bool): Print the JSON line of every finished turn.
+    """
+
+    def __init__(self, enabled=True, log_turns=True):
+        self.enabled = enabled
+        self.log_turns = log_turns
+        self.turn_listeners = []
+        self.lock = threading.Lock()
+        self.bucket_counts = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.stage_sums = defaultdict(float)
+        self.stage_counts = defaultdict(int)
+        self.token_counts = defaultdict(int)
+        self.stats_sources = {}
+
+    # Add one stage duration to the histograms and the current turn
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.stage_sums[stage] += seconds
+            self.stage_counts[stage] += 1
+            buckets = self.bucket_counts[stage]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.stages[stage] += seconds
+
+    def span(self, stage):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return self._span(stage)
+
+    @contextmanager
+    def _span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # Token usage of an OpenAI response (response.usage), ignored if missing
+    def record_usage(self, stage, usage):
+        if not self.enabled or usage is None:
+            return
+        counts = {
+            "prompt": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion": getattr(usage, "completion_tokens", 0) or 0,
+        }
+        turn = _current_turn.get()
+        with self.lock:
+            for kind, count in counts.items():
+                self.token_counts[(stage, kind)] += count
+                if turn is not None:
+                    turn.tokens[f"{stage}_{kind}"] += count
+
+    # Component whose stats() numbers are exported as gauges, e.g. cache hit rates
+    def register_stats(self, name, stats):
+        self.stats_sources[name] = stats
+
+    def collect_stats(self):
+        collected = {}
+        for name, stats in list(self.stats_sources.items()):
+            try:
+                collected[name] = {key: value for key, value in stats().items()
+                                   if isinstance(value, (int, float)) and not isinstance(value, bool)}
+            except Exception as e:
+                print(f"Stats of {name} failed: {e}")
+        return collected
+
+    # Add fields (e.g. the analyzed action) to the log line of the current turn
+    def annotate(self, **fields):
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.fields.update(fields)
+
+    def current_turn(self):
+        return _current_turn.get()
+
+    # Make a turn current in this thread / task, returns a token for detach
+    def attach(self, turn):
+        return _current_turn.set(turn)
+
+    def detach(self, token):
+        _current_turn.reset(token)
+
+    def trace_turn(self, generator, **fields):
+        """
+        Iterates a chat turn generator as one traced turn.
+
+        The turn is attached around every step, so spans are recorded even when
+        the UI framework resumes the generator on a different worker thread.
+        A JSON log line with stage timings and tokens is printed at the end.
+        """
+        if not self.enabled:
+            yield from generator
+            return
+
+        turn = Turn(**fields)
+        first_output = None
+        try:
+            while True:
+                token = self.attach(turn)
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    break
+                finally:
+                    self.detach(token)
+                if first_output is None:
+                    first_output = time.perf_counter() - turn.start
+                yield item
+        finally:
+            turn.fields["first_output_ms"] = round((first_output or 0.0) * 1000, 1)
+            self.observe("turn", time.perf_counter() - turn.start)
+            record = turn.record()
+            for listener in self.turn_listeners:
+                listener(record)
+            if self.log_turns:
+                print(json.dumps(record))
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP chatbot_stage_seconds Latency of chat pipeline stages.",
+            "# TYPE chatbot_stage_seconds histogram",
+        ]
+        with self.lock:
+            for stage in sorted(self.stage_counts):
+                # Bucket counts are already cumulative (observe counts every bucket a value fits in)
+                for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts[stage]):
+                    lines.append(f'chatbot_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'chatbot_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {self.stage_counts[stage]}')
+                lines.append(f'chatbot_stage_seconds_sum{{stage="{stage}"}} {self.stage_sums[stage]:.6f}')
+                lines.append(f'chatbot_stage_seconds_count{{stage="{stage}"}} {self.stage_counts[stage]}')
+
+            lines.append("# HELP chatbot_tokens_total OpenAI tokens used, by stage and kind.")
+            lines.append("# TYPE chatbot_tokens_total counter")
+            for (stage, kind), count in sorted(self.token_counts.items()):
+                lines.append(f'chatbot_tokens_total{{stage="{stage}",kind="{kind}"}} {count}')
+
+        lines.append("# HELP chatbot_component_stat Numeric stats() of caches and other components.")
+        lines.append("# TYPE chatbot_component_stat gauge")
+        for name, stats in sorted(self.collect_stats().items()):
+            for key, value in sorted(stats.items()):
+                lines.append(f'chatbot_component_stat{{component="{name}",stat="{key}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+# Shared tracer of the process
+tracer = Tracer(enabled=os.getenv("TRACING_ENABLED", "1") == "1")
+
+
+def serve_metrics(port, host="0.0.0.0", source=None):
+    """
+    Serves the Prometheus text of source (the shared tracer) at /metrics, from a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server (server_address has the bound port).
+    """
+    source = source or tracer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = source.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # Scrapes are not worth a log line each
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,107 @@
+'''
+ Compact storage of embedding vectors.
+ Vectors are kept as float32, float16 (half the size) or scalar-quantized
+ int8 (a quarter of the size, per-dimension offset and scale in a sidecar
+ file). Files are plain .npy, so they are memory-mapped on load and rows
+ are decoded back to contiguous float32 only when they are read.
+'''
+import os
+
+import numpy as np
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+# Sidecar file with the int8 quantization parameters
+def quant_path(path):
+    return f"{os.path.splitext(path)[0]}.quant.npy"
+
+
+# Per-dimension offset and scale mapping the value range onto the 256 int8 levels
+def fit_int8(minimums, maximums):
+    scale = (np.asarray(maximums, dtype=np.float32) - minimums) / 255.0
+    scale[scale == 0] = 1.0
+    return np.vstack([np.asarray(minimums, dtype=np.float32), scale])
+
+
+def encode(vectors, dtype, quant=None):
+    """
+    Converts float32 vectors to the storage dtype.
+
+    Args:
+        vectors (np.ndarray): Vectors, shape (n, dimension).
+        dtype (str): One of float32, float16, int8.
+        quant (np.ndarray, optional): Offset and scale rows from fit_int8 (int8 only).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float32":
+        return np.ascontiguousarray(vectors)
+    if dtype == "float16":
+        return vectors.astype(np.float16)
+    if dtype == "int8":
+        codes = np.rint((vectors - quant[0]) / quant[1]) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+    raise ValueError(f"Unknown storage dtype: {dtype}. Use one of {', '.join(STORAGE_DTYPES)}.")
+
+
+def decode(codes, quant=None):
+    """
+    Converts stored vectors back to contiguous float32.
+    """
+    if codes.dtype == np.int8:
+        return np.ascontiguousarray((codes.astype(np.float32) + 128) * quant[1] + quant[0])
+    return np.ascontiguousarray(codes, dtype=np.float32)
+
+
+def save_vectors(path, vectors, dtype="float32"):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    quant = None
+    if dtype == "int8":
+        quant = fit_int8(vectors.min(axis=0), vectors.max(axis=0))
+        np.save(quant_path(path), quant)
+    np.save(path, encode(vectors, dtype, quant))
+    return path
+
+
+class VectorFile:
+    """
+    Read-only view of a saved vector file.
+
+    Args:
+        path (str): .npy file written by save_vectors or load_data.py.
+        mmap (bool): Memory-map the file instead of reading it into memory.
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.codes = np.load(path, mmap_mode="r" if mmap else None)
+        self.quant = np.load(quant_path(path)) if self.codes.dtype == np.int8 else None
+
+    @property
+    def dtype(self):
+        return self.codes.dtype.name
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, rows):
+        return decode(self.codes[rows], self.quant)
+
+    # All vectors as float32, decoded block by block
+    def to_float32(self, block_rows=65536):
+        output = np.empty(self.codes.shape, dtype=np.float32)
+        for start in range(0, len(self), block_rows):
+            output[start:start + block_rows] = self[start:start + block_rows]
+        return output
+
+
+def load_vectors(path, mmap=True):
+    return VectorFile(path, mmap=mmap)
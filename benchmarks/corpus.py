@@ -0,0 +1,71 @@
+'''
+ Small synthetic medical corpus for offline benchmarks.
+ Writes the same artifacts as backend/load_data.py (chunks.store,
+ data_index.faiss, bm25.npz) with vectors from the local hashing embedder.
+'''
+import os
+import sys
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.bm25 import BM25Index
+from backend.chunk_store import write_chunk_store
+from backend.embeddings import LocalEmbeddingProvider
+from backend.index_factory import build_index
+
+CONDITIONS = [
+    "influenza", "asthma", "diabetes", "hypertension", "migraine", "anemia", "bronchitis", "pneumonia",
+    "arthritis", "eczema", "gastritis", "hepatitis", "malaria", "measles", "tuberculosis", "sinusitis",
+    "tonsillitis", "psoriasis", "gout", "osteoporosis", "celiac disease", "chickenpox", "shingles", "scabies",
+]
+ASPECTS = {
+    "symptoms": "Common symptoms of {c} include fatigue, fever, pain and loss of appetite, which vary between patients.",
+    "causes": "{c} is caused by a mix of genetic, environmental and infectious factors depending on the case.",
+    "diagnosis": "Doctors diagnose {c} with a physical examination, blood tests and, when needed, imaging.",
+    "treatment": "Treatment of {c} combines medication, rest and lifestyle changes under medical supervision.",
+    "prevention": "The risk of {c} is lowered by vaccination where available, hygiene, exercise and a balanced diet.",
+}
+FILLER = ("patients clinical chronic acute therapy dose daily weekly monitoring specialist hospital "
+          "recovery infection inflammation immune nutrition sleep hydration follow-up").split()
+
+
+def make_texts(n_chunks, seed=0):
+    rng = np.random.default_rng(seed)
+    aspects = list(ASPECTS.items())
+    texts = []
+    for i in range(n_chunks):
+        condition = CONDITIONS[i % len(CONDITIONS)]
+        aspect, template = aspects[(i // len(CONDITIONS)) % len(aspects)]
+        filler = " ".join(rng.choice(FILLER, size=40))
+        texts.append(f"{condition.title()} {aspect}. {template.format(c=condition)} {filler}.")
+    return texts
+
+
+# Question about a condition, matching the corpus wording
+def make_question(i):
+    condition = CONDITIONS[i % len(CONDITIONS)]
+    aspect = list(ASPECTS)[(i // len(CONDITIONS)) % len(ASPECTS)]
+    return f"What are the {aspect} of {condition}?"
+
+
+def build_corpus(directory, n_chunks=2000, dimension=512, index_type="flat"):
+    """
+    Writes chunks.store, data_index.faiss and bm25.npz into a directory.
+
+    Returns:
+        dict: Paths of the written artifacts.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        "chunks": os.path.join(directory, "chunks.store"),
+        "faiss": os.path.join(directory, "data_index.faiss"),
+        "bm25": os.path.join(directory, "bm25.npz"),
+    }
+    texts = make_texts(n_chunks)
+    write_chunk_store(paths["chunks"], texts)
+    BM25Index.build(texts).save(paths["bm25"])
+    embeddings = LocalEmbeddingProvider(dimension=dimension).embed(texts)
+    faiss.write_index(build_index(embeddings, index_type=index_type), paths["faiss"])
+    return paths
@@ -0,0 +1,165 @@
+'''
+ Local stand-in for the OpenAI API, for offline benchmarks.
+ Serves /v1/chat/completions (plain, JSON mode and streaming) and
+ /v1/embeddings with deterministic replies and configurable latency.
+ Embeddings come from the local hashing embedder, so a corpus indexed
+ with LocalEmbeddingProvider matches the "remote" query embeddings.
+
+ Point the chatbot at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1
+'''
+import base64
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.embeddings import LocalEmbeddingProvider
+
+REQUEST_PATTERN = re.compile(r'User\'s request: "(.*?)"', re.DOTALL)
+
+
+# Rough token count used for the usage fields
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def create_app(analyses=None, chat_latency_ms=300, token_delay_ms=10, embedding_latency_ms=50,
+               answer_words=60, dimension=512):
+    """
+    Builds the fake OpenAI app.
+
+    Args:
+        analyses (dict, optional): User request text to the JSON returned in JSON mode.
+            Unknown requests are medical questions if they end with "?", invalid otherwise.
+        chat_latency_ms (float): Delay before the first token of a completion.
+        token_delay_ms (float): Delay between streamed tokens (also added per word to plain completions).
+        embedding_latency_ms (float): Delay of an embeddings call.
+        answer_words (int): Number of words in a generated answer.
+        dimension (int): Embedding dimension.
+
+    Returns:
+        flask.Flask: The app, with a request counter in app.config["COUNTS"].
+    """
+    app = Flask(__name__)
+    analyses = analyses or {}
+    embedder = LocalEmbeddingProvider(dimension=dimension)
+    counts = app.config["COUNTS"] = {"chat": 0, "stream": 0, "json": 0, "embeddings": 0}
+    lock = threading.Lock()
+
+    def count(kind):
+        with lock:
+            counts[kind] += 1
+
+    def analyze(prompt):
+        match = REQUEST_PATTERN.search(prompt)
+        query = match.group(1).strip() if match else prompt.strip()
+        if query in analyses:
+            return analyses[query]
+        return {"action": "medical_question" if query.endswith("?") else "invalid"}
+
+    def answer_words_for(prompt):
+        words = re.findall(r"\w+", prompt)[-answer_words:] or ["ok"]
+        return [words[i % len(words)] for i in range(answer_words)]
+
+    def usage(prompt_tokens, completion_tokens):
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    @app.route("/v1/chat/completions", methods=["POST"])
+    def chat_completions():
+        body = request.get_json()
+        prompt = "\n".join(message.get("content") or "" for message in body["messages"])
+        prompt_tokens = count_tokens(prompt)
+        created = int(time.time())
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        time.sleep(chat_latency_ms / 1000)
+
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            count("json")
+            content = json.dumps(analyze(prompt))
+        else:
+            content = None
+
+        if body.get("stream"):
+            count("stream")
+            words = answer_words_for(prompt)
+
+            def events():
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(token_delay_ms / 1000)
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"role": "assistant", "content": word + " "},
+                                     "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                             "model": body["model"], "choices": [], "usage": usage(prompt_tokens, len(words))}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return Response(events(), mimetype="text/event-stream")
+
+        if content is None:
+            count("chat")
+            words = answer_words_for(prompt)
+            time.sleep(token_delay_ms * len(words) / 1000)
+            content = " ".join(words)
+        return jsonify({
+            "id": completion_id, "object": "chat.completion", "created": created, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage(prompt_tokens, count_tokens(content)),
+        })
+
+    @app.route("/v1/embeddings", methods=["POST"])
+    def embeddings():
+        count("embeddings")
+        body = request.get_json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        time.sleep(embedding_latency_ms / 1000)
+        vectors = embedder.embed(texts)
+        if body.get("encoding_format") == "base64":
+            data = [base64.b64encode(vector.tobytes()).decode("ascii") for vector in vectors]
+        else:
+            data = [vector.tolist() for vector in vectors]
+        tokens = sum(count_tokens(text) for text in texts)
+        return jsonify({
+            "object": "list", "model": body["model"],
+            "data": [{"object": "embedding", "index": i, "embedding": item} for i, item in enumerate(data)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    return app
+
+
+class LocalServer:
+    """
+    Runs a WSGI app on 127.0.0.1 in a background thread.
+
+    Args:
+        app: WSGI application.
+        port (int): Port, 0 picks a free one.
+    """
+
+    def __init__(self, app, port=0):
+        self.server = make_server("127.0.0.1", port, app, threaded=True)
+        self.port = self.server.server_port
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
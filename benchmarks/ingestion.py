@@ -0,0 +1,97 @@
+'''
+ Throughput of the cleaning and chunking stage of the ingestion pipeline.
+ Runs the same records through per-record cleaning in the main process,
+ vectorized (Arrow) cleaning in the main process and the worker pool, and
+ checks that all three produce the same chunks. Then feeds the pool through
+ the prefetch queue into a simulated embedding stage to show the overlap.
+
+ Usage:
+    python benchmarks/ingestion.py --source data.parquet --workers 4
+    python benchmarks/ingestion.py --records 20000
+'''
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.load_data import batched, iter_chunks, iter_records
+from backend.preprocess import Prefetcher, Preprocessor
+
+WORDS = ("fever", "cough", "asthma", "influenza", "treatment", "symptoms", "patients", "chronic", "infection",
+         "dose", "blood", "pressure", "the", "of", "and", "with", "may", "cause")
+
+
+# Synthetic records of a few paragraphs with irregular whitespace
+def synthetic_records(count, seed=0):
+    import random
+
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(50, 800))]
+        records.append("".join(word + rng.choice((" ", " ", "  ", "\n", "\t ")) for word in words))
+    return records
+
+
+def run(label, chunk_iter, baseline_seconds=None):
+    start = time.perf_counter()
+    chunks = list(chunk_iter)
+    seconds = time.perf_counter() - start
+    speedup = baseline_seconds / seconds if baseline_seconds else 1.0
+    print(f"{label:<28} {len(chunks):>9} {seconds:>9.2f} {len(chunks) / seconds:>11.0f} {speedup:>8.2f}x")
+    return chunks, seconds
+
+
+# The pool feeding a stand-in embedding stage through the bounded queue
+def pipeline(records, workers, queue_size, embed_batch_size, embed_ms_per_chunk):
+    preprocessor = Preprocessor(workers=workers)
+    batches = Prefetcher(batched(preprocessor.iter_chunks(records), embed_batch_size), maxsize=queue_size)
+    start = time.perf_counter()
+    embed_seconds = 0.0
+    for batch in batches:
+        delay = len(batch) * embed_ms_per_chunk / 1000
+        time.sleep(delay)
+        embed_seconds += delay
+    seconds = time.perf_counter() - start
+    stats = preprocessor.stats()
+    serial_seconds = stats["wall_seconds"] + embed_seconds
+    print(f"\nPipeline, {workers} workers, queue of {queue_size} batches, {embed_ms_per_chunk} ms/chunk embedding:")
+    print(f"  preprocessing {stats['wall_seconds']:.2f} s ({stats['cpu_seconds']:.2f} s CPU, "
+          f"{stats['parallel_speedup']:.2f}x), embedding {embed_seconds:.2f} s, "
+          f"waited {batches.wait_seconds:.2f} s for chunks")
+    print(f"  total {seconds:.2f} s vs {serial_seconds:.2f} s one stage after the other "
+          f"({serial_seconds / seconds:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial, vectorized and parallel preprocessing.")
+    parser.add_argument("--source", default=None, help="Parquet file (synthetic records if not set)")
+    parser.add_argument("--column", default="data")
+    parser.add_argument("--records", type=int, default=10000, help="Number of records (synthetic or read)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--embed-batch-size", type=int, default=4096)
+    parser.add_argument("--embed-ms-per-chunk", type=float, default=0.05, help="Simulated embedding time")
+    args = parser.parse_args()
+
+    if args.source:
+        records = [record for _, record in zip(range(args.records), iter_records(args.source, args.column))]
+    else:
+        records = synthetic_records(args.records)
+    print(f"{len(records)} records, {sum(len(r) for r in records if isinstance(r, str)) / 1e6:.1f} M characters, "
+          f"{os.cpu_count()} CPUs\n")
+
+    print(f"{'stage':<28} {'chunks':>9} {'seconds':>9} {'chunks/s':>11} {'speedup':>9}")
+    expected, baseline = run("per-record (re)", iter_chunks(records))
+    vectorized, _ = run("vectorized (Arrow)", Preprocessor(workers=0).iter_chunks(records), baseline)
+    parallel, _ = run(f"vectorized, {args.workers} workers", Preprocessor(workers=args.workers).iter_chunks(records),
+                      baseline)
+    if vectorized != expected or parallel != expected:
+        raise SystemExit("Preprocessing variants produced different chunks.")
+
+    pipeline(records, args.workers, args.queue_size, args.embed_batch_size, args.embed_ms_per_chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+'''
+ Offline end-to-end load test of ui/app.py::respond.
+ Starts a fake OpenAI server and the Flask booking API locally, builds a
+ synthetic corpus, then drives N concurrent simulated sessions through
+ respond and reports throughput and p50/p95/p99 latency per stage.
+ No OpenAI calls are made.
+
+ Usage:
+    python benchmarks/load_test.py --sessions 8 --rounds 5 --chat-latency-ms 300 --output results.json
+'''
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from benchmarks.corpus import build_corpus, make_question
+from benchmarks.fake_openai import LocalServer, create_app
+
+BOOKING_REQUEST = "Book an appointment for Ahmet Yilmaz, personal id 123456, on 15-10-2025 at 14:00 for a checkup"
+LIST_REQUEST = "List all appointments"
+INVALID_REQUEST = "Who won the football match yesterday"
+
+# JSON mode replies of the fake analyze_request
+ANALYSES = {
+    BOOKING_REQUEST: {"action": "add_appointment", "name": "Ahmet", "surname": "Yilmaz", "personal_id": "123456",
+                      "date": "15-10-2025", "time": "14:00", "description": "Checkup"},
+    LIST_REQUEST: {"action": "get_all_appointments"},
+    INVALID_REQUEST: {"action": "invalid"},
+}
+
+
+# Conversation of one simulated session: (turn kind, message)
+def session_script(session, rounds):
+    script = []
+    for i in range(rounds):
+        script.append(("medical_question", make_question(session * rounds + i)))
+        if i % 2 == 0:
+            script.append(("add_appointment", BOOKING_REQUEST))
+        else:
+            script.append(("get_all_appointments", LIST_REQUEST))
+        if i % 3 == 2:
+            script.append(("invalid", INVALID_REQUEST))
+    return script
+
+
+def percentiles(values):
+    values = np.array(values)
+    return {
+        "count": len(values),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+    }
+
+
+def run_sessions(respond, tracer, n_sessions, rounds):
+    """
+    Drives concurrent sessions through respond.
+
+    Returns:
+        tuple: (turn records, wall time in seconds, number of failed turns)
+    """
+    records = []
+    failures = []
+    lock = threading.Lock()
+
+    def collect(record):
+        with lock:
+            records.append(record)
+
+    def run_session(session):
+        state = {"missing_params": [], "reset_status": True, "data": {}}
+        for kind, message in session_script(session, rounds):
+            turn = respond(message, [], "You are a friendly Chatbot.", 512, 0.7, 0.95, state)
+            try:
+                for _ in tracer.trace_turn(turn, session_id=f"bench-{session}", kind=kind):
+                    pass
+            except Exception as e:
+                failures.append(f"{kind}: {e}")
+                state.update({"missing_params": [], "reset_status": True, "data": {}})
+
+    tracer.turn_listeners.append(collect)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=n_sessions) as executor:
+            list(executor.map(run_session, range(n_sessions)))
+    finally:
+        tracer.turn_listeners.remove(collect)
+    return records, time.perf_counter() - start, failures
+
+
+def summarize(records, seconds):
+    by_kind = defaultdict(list)
+    first_output = defaultdict(list)
+    stages = defaultdict(list)
+    for record in records:
+        by_kind[record["kind"]].append(record["total_ms"])
+        first_output[record["kind"]].append(record["first_output_ms"])
+        for stage, ms in record["stages_ms"].items():
+            stages[stage].append(ms)
+    return {
+        "turns": len(records),
+        "seconds": seconds,
+        "turns_per_second": len(records) / seconds if seconds else 0.0,
+        "turn_total": {kind: percentiles(values) for kind, values in sorted(by_kind.items())},
+        "turn_first_output": {kind: percentiles(values) for kind, values in sorted(first_output.items())},
+        "stages": {stage: percentiles(values) for stage, values in sorted(stages.items())},
+    }
+
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"{'':<24} {'count':>6} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    for name, row in rows.items():
+        print(f"{name:<24} {row['count']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the chatbot with a fake OpenAI server.")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated sessions")
+    parser.add_argument("--rounds", type=int, default=5, help="Question rounds per session")
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic corpus size")
+    parser.add_argument("--chat-latency-ms", type=float, default=300)
+    parser.add_argument("--token-delay-ms", type=float, default=10)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50)
+    parser.add_argument("--retrieval-mode", default="vector", choices=["vector", "hybrid"])
+    parser.add_argument("--api-transport", default="http", choices=["http", "inprocess"])
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache on")
+    parser.add_argument("--workdir", default=None, help="Directory for the corpus and databases (temporary by default)")
+    parser.add_argument("--output", default=None, help="Write the summary as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the chatbot's own prints")
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    if not args.verbose:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="chatbot-bench-")
+    print(f"Building a {args.chunks} chunk corpus in {workdir}")
+    paths = build_corpus(workdir, n_chunks=args.chunks)
+    # The booking database and the embedding cache are created in the working directory
+    os.chdir(workdir)
+
+    fake_openai = create_app(
+        analyses=ANALYSES,
+        chat_latency_ms=args.chat_latency_ms,
+        token_delay_ms=args.token_delay_ms,
+        embedding_latency_ms=args.embedding_latency_ms,
+    )
+    with LocalServer(fake_openai) as openai_server:
+        # Configuration is read when the backend modules are imported, so set it first
+        os.environ.update({
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": f"{openai_server.url}/v1",
+            "EMBEDDING_PROVIDER": "openai",
+            "EMBEDDING_CACHE_PATH": "",
+            "FAISS_PATH": paths["faiss"],
+            "CHUNKS_PATH": paths["chunks"],
+            "BM25_PATH": paths["bm25"],
+            "RETRIEVAL_MODE": args.retrieval_mode,
+            "API_TRANSPORT": args.api_transport,
+            "TRACING_ENABLED": "1",
+        })
+        if not args.answer_cache:
+            # Cosine similarity never exceeds 1, so nothing is served from the cache
+            os.environ["ANSWER_CACHE_THRESHOLD"] = "2"
+
+        from backend.flask_api.flask_app import app as booking_app
+        with LocalServer(booking_app) as booking_server:
+            os.environ["API_BASE_URL"] = booking_server.url
+            from backend.tracing import tracer
+            from ui.app import respond, warm_up
+
+            tracer.log_turns = args.verbose
+            output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+            with output:
+                warm_up()
+                records, seconds, failures = run_sessions(respond, tracer, args.sessions, args.rounds)
+
+    summary = summarize(records, seconds)
+    summary["failures"] = failures
+    summary["openai_requests"] = dict(fake_openai.config["COUNTS"])
+    summary["settings"] = vars(args)
+
+    print(f"\n{summary['turns']} turns from {args.sessions} sessions in {seconds:.2f} s "
+          f"({summary['turns_per_second']:.2f} turns/s), {len(failures)} failed")
+    print(f"Fake OpenAI requests: {summary['openai_requests']}")
+    print_table("Turn latency by kind", summary["turn_total"])
+    print_table("Time to first output by kind", summary["turn_first_output"])
+    print_table("Stages", summary["stages"])
+    for failure in failures[:5]:
+        print(f"Failed turn - {failure}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
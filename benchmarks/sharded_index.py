@@ -0,0 +1,85 @@
+'''
+ Search latency and throughput of a FAISS index split into 1..N shards.
+ Each shard count is searched with the shards fanned out on one thread per
+ shard and one after the other, one query at a time (like the chatbot)
+ and in batches (like the retrieval batcher). Recall@k is measured against
+ the unsharded flat index.
+
+ Usage:
+    python benchmarks/sharded_index.py --embeddings data_embeddings.npy --shards 1,2,4,8
+    python benchmarks/sharded_index.py --vectors 500000 --dimension 1536 --index-type sq8
+'''
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.index_factory import _timed_search, benchmark_index, build_index, index_size_mb, sample_queries
+from backend.sharded_index import ShardedIndexBuilder, index_shards, shard_index
+from backend.vector_storage import load_vectors
+
+
+def build_shards(embeddings, shards, index_type, batch_size=65536):
+    builder = ShardedIndexBuilder(shards, index_type=index_type, expected_vectors=len(embeddings) // shards)
+    for start in range(0, len(embeddings), batch_size):
+        batch = embeddings[start:start + batch_size]
+        builder.add(batch, np.arange(start, start + len(batch)))
+    return builder.finish()
+
+
+# Queries per second when searching batch_size queries per call
+def batch_qps(index, queries, k, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        index.search(queries[i:i + batch_size], k)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded FAISS indexes against one index.")
+    parser.add_argument("--embeddings", default=None, help="Embeddings file (random unit vectors if not set)")
+    parser.add_argument("--vectors", type=int, default=200000, help="Number of random vectors")
+    parser.add_argument("--dimension", type=int, default=1536, help="Dimension of random vectors")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--shards", default="1,2,4,8", help="Comma separated shard counts")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32, help="Queries per batched search")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        embeddings = load_vectors(args.embeddings).to_float32()
+    else:
+        rng = np.random.default_rng(0)
+        embeddings = rng.normal(size=(args.vectors, args.dimension)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = sample_queries(embeddings, args.queries)
+    ground_truth, _ = _timed_search(build_index(embeddings, "flat"), queries, args.k)
+
+    print(f"{len(embeddings)} vectors of dimension {embeddings.shape[1]}, {args.index_type} shards, "
+          f"{os.cpu_count()} CPUs, {faiss.omp_get_max_threads()} OpenMP threads")
+    print(f"{'shards':>6} {'fan-out':<10} {'build_s':>8} {'shard_mb':>9} {'recall@' + str(args.k):>9} "
+          f"{'p50_ms':>8} {'p99_ms':>8} {'qps@' + str(args.batch_size):>9} {'speedup':>8}")
+    baseline_p50 = None
+    for shards in (int(value) for value in args.shards.split(",")):
+        start = time.perf_counter()
+        indexes = build_shards(embeddings, shards, args.index_type)
+        build_seconds = time.perf_counter() - start
+        for threaded in (True, False) if shards > 1 else (True,):
+            index = shard_index(indexes, threaded=threaded)
+            result = benchmark_index(index, queries, ground_truth, k=args.k)
+            qps = batch_qps(index, queries, args.k, args.batch_size)
+            baseline_p50 = baseline_p50 or result["p50_ms"]
+            shard_mb = max(index_size_mb(shard) for shard in index_shards(index))
+            print(f"{shards:>6} {'threads' if threaded else 'serial':<10} {build_seconds:>8.2f} {shard_mb:>9.1f} "
+                  f"{result['recall_at_k']:>9.3f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} {qps:>9.0f} "
+                  f"{baseline_p50 / result['p50_ms']:>7.2f}x")
+            del index
+
+
+if __name__ == "__main__":
+    main()
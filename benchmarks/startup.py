@@ -0,0 +1,59 @@
+'''
+ Startup benchmark for the chatbot.
+ Measures cold import time of backend.chatbot and ui.app (each in a fresh
+ interpreter), the warm-up of the lazily loaded artifacts and the time to
+ the first medical answer.
+
+ Usage:
+    python benchmarks/startup.py --query "What are the symptoms of influenza?"
+'''
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+
+# Import a module in a fresh interpreter, returns wall time in seconds
+def cold_import_time(module):
+    code = f"import sys, time; sys.path.insert(0, {ROOT!r}); start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        print(f"Import of {module} failed:\n{result.stderr.strip()}")
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chatbot import, warm-up and first answer time.")
+    parser.add_argument("--query", default="What are the symptoms of influenza?")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of cold imports per module")
+    parser.add_argument("--skip-answer", action="store_true", help="Don't call the OpenAI API")
+    args = parser.parse_args()
+
+    for module in ("backend.chatbot", "ui.app"):
+        times = [cold_import_time(module) for _ in range(args.repeat)]
+        if None in times:
+            continue
+        print(f"import {module:<16} min {min(times) * 1000:8.0f} ms   max {max(times) * 1000:8.0f} ms")
+
+    from backend.chatbot import handle_med_question, warm_up
+
+    start = time.perf_counter()
+    timings = warm_up()
+    print(f"warm_up total          {(time.perf_counter() - start) * 1000:8.0f} ms")
+    for name, seconds in timings.items():
+        print(f"  {name:<20} {seconds * 1000:8.0f} ms")
+
+    if args.skip_answer:
+        return
+    start = time.perf_counter()
+    handle_med_question(args.query)
+    print(f"first answer           {(time.perf_counter() - start) * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+'''
+ Space and latency of the embedding storage formats.
+ Compares float32, float16 and int8 vector files (size, full load vs
+ memory-mapped open, row fetch latency, decode error, exact search recall)
+ and flat / SQfp16 / SQ8 FAISS indexes (size, read vs mmap load, search
+ latency, recall) on real embeddings or random unit vectors.
+
+ Usage:
+    python benchmarks/vector_storage.py --embeddings data_embeddings.npy
+    python benchmarks/vector_storage.py --vectors 200000 --dimension 1536
+'''
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.index_factory import _timed_search, benchmark_index, build_index, sample_queries
+from backend.vector_storage import STORAGE_DTYPES, load_vectors, quant_path, save_vectors
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+
+def file_mb(*paths):
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path)) / (1024 * 1024)
+
+
+# Recall@k of exact search over decoded vectors, against float32 results
+def decoded_recall(decoded, queries, ground_truth, k):
+    index = faiss.IndexFlatL2(decoded.shape[1])
+    index.add(decoded)
+    _, ids = index.search(queries, k)
+    return sum(len(set(ids[i]) & set(ground_truth[i])) for i in range(len(queries))) / ground_truth.size
+
+
+def benchmark_files(embeddings, queries, ground_truth, k, workdir):
+    print(f"\n{'storage':<10} {'size_mb':>8} {'load_ms':>9} {'mmap_ms':>8} {'fetch_us':>9} {'max_err':>9} "
+          f"{'recall@' + str(k):>9}")
+    rng = np.random.default_rng(0)
+    for dtype in STORAGE_DTYPES:
+        path = os.path.join(workdir, f"embeddings_{dtype}.npy")
+        save_vectors(path, embeddings, dtype)
+
+        _, load_seconds = timed(lambda: load_vectors(path, mmap=False).to_float32())
+        vectors, mmap_seconds = timed(lambda: load_vectors(path))
+        # Rows fetched like the MMR context builder does (5 random chunks)
+        rows = [np.sort(rng.choice(len(embeddings), size=5, replace=False)) for _ in range(200)]
+        start = time.perf_counter()
+        for ids in rows:
+            vectors[ids]
+        fetch_us = (time.perf_counter() - start) / len(rows) * 1e6
+
+        decoded = vectors.to_float32()
+        max_error = float(np.abs(decoded - embeddings).max())
+        recall = decoded_recall(decoded, queries, ground_truth, k)
+        print(f"{dtype:<10} {file_mb(path, quant_path(path)):>8.1f} {load_seconds * 1000:>9.1f} "
+              f"{mmap_seconds * 1000:>8.2f} {fetch_us:>9.1f} {max_error:>9.5f} {recall:>9.3f}")
+        del vectors
+
+
+def benchmark_indexes(embeddings, queries, ground_truth, k, workdir):
+    print(f"\n{'index':<10} {'size_mb':>8} {'read_ms':>9} {'mmap_ms':>8} {'p50_ms':>8} {'p99_ms':>8} "
+          f"{'recall@' + str(k):>9}")
+    for index_type in ("flat", "sq_fp16", "sq8"):
+        path = os.path.join(workdir, f"index_{index_type}.faiss")
+        faiss.write_index(build_index(embeddings, index_type), path)
+
+        _, read_seconds = timed(lambda: faiss.read_index(path))
+        index, mmap_seconds = timed(lambda: faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY))
+        result = benchmark_index(index, queries, ground_truth, k=k)
+        print(f"{index_type:<10} {file_mb(path):>8.1f} {read_seconds * 1000:>9.1f} {mmap_seconds * 1000:>8.2f} "
+              f"{result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} {result['recall_at_k']:>9.3f}")
+        del index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark float32 / float16 / int8 embedding storage.")
+    parser.add_argument("--embeddings", default=None, help="Embeddings file (random unit vectors if not set)")
+    parser.add_argument("--vectors", type=int, default=100000, help="Number of random vectors")
+    parser.add_argument("--dimension", type=int, default=1536, help="Dimension of random vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        embeddings = load_vectors(args.embeddings).to_float32()
+    else:
+        rng = np.random.default_rng(0)
+        embeddings = rng.normal(size=(args.vectors, args.dimension)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = sample_queries(embeddings, args.queries)
+    flat = build_index(embeddings, "flat")
+    ground_truth, _ = _timed_search(flat, queries, args.k)
+    del flat
+
+    print(f"{len(embeddings)} vectors of dimension {embeddings.shape[1]}")
+    with tempfile.TemporaryDirectory(prefix="vector-storage-") as workdir:
+        benchmark_files(embeddings, queries, ground_truth, args.k, workdir)
+        benchmark_indexes(embeddings, queries, ground_truth, args.k, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Unit tests for the semantic answer cache
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from unittest.mock import patch
+import numpy as np
+from backend.answer_cache import SemanticAnswerCache
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SemanticAnswerCache(threshold=0.95, ttl=60, max_entries=3)
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(5, 16)).astype(np.float32)
+
+    def test_similar_questions_hit_and_others_miss(self):
+        self.cache.put(self.vectors[0], [1, 2], "Flu answer", language="en")
+
+        self.assertEqual(self.cache.lookup(self.vectors[0] * 2 + 0.01, language="en"), "Flu answer")
+        self.assertIsNone(self.cache.lookup(self.vectors[1], language="en"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_answers_are_kept_per_language(self):
+        self.cache.put(self.vectors[0], [1], "Flu answer", language="en")
+        self.assertIsNone(self.cache.lookup(self.vectors[0], language="tr"))
+
+        self.cache.put(self.vectors[0], [1], "Grip cevabı", language="tr")
+        self.assertEqual(self.cache.lookup(self.vectors[0], language="tr"), "Grip cevabı")
+        self.assertEqual(self.cache.lookup(self.vectors[0], language="en"), "Flu answer")
+
+    def test_expired_answers_are_evicted(self):
+        with patch("backend.answer_cache.time.time", return_value=1000.0):
+            self.cache.put(self.vectors[0], [1], "Old answer")
+        with patch("backend.answer_cache.time.time", return_value=1061.0):
+            self.assertIsNone(self.cache.lookup(self.vectors[0]))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_oldest_answers_are_evicted_beyond_max_entries(self):
+        for i in range(5):
+            self.cache.put(self.vectors[i], [i], f"Answer {i}", language="en" if i % 2 else "tr")
+
+        self.assertEqual(self.cache.stats()["entries"], 3)
+        self.assertIsNone(self.cache.lookup(self.vectors[0], language="tr"))
+        self.assertIsNone(self.cache.lookup(self.vectors[1], language="en"))
+        self.assertEqual(self.cache.lookup(self.vectors[4], language="tr"), "Answer 4")
+
+    def test_invalidate_drops_everything(self):
+        self.cache.put(self.vectors[0], [1], "Flu answer", language="en")
+        self.cache.invalidate()
+
+        self.assertIsNone(self.cache.lookup(self.vectors[0], language="en"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.cache.put(self.vectors[0], [1], "New answer", language="en")
+        self.assertEqual(self.cache.lookup(self.vectors[0], language="en"), "New answer")
+
+    def test_answers_of_a_swapped_out_knowledge_base_are_ignored(self):
+        self.cache.invalidate(version="v1")
+        self.cache.put(self.vectors[0], [1], "v1 answer", version="v1")
+        self.cache.invalidate(version="v2")
+
+        # A turn that started on v1 finishes streaming after the swap
+        self.cache.put(self.vectors[1], [1], "Late v1 answer", version="v1")
+        self.assertIsNone(self.cache.lookup(self.vectors[1], version="v1"))
+        self.assertIsNone(self.cache.lookup(self.vectors[1], version="v2"))
+        self.assertEqual(self.cache.stats()["stale_puts"], 1)
+
+        self.cache.put(self.vectors[1], [1], "v2 answer", version="v2")
+        self.assertEqual(self.cache.lookup(self.vectors[1], version="v2"), "v2 answer")
+
+
+if __name__ == '__main__':
+    unittest.main()
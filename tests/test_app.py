@@ -0,0 +1,77 @@
+# Unit tests for the Gradio chat handler
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from backend.session_store import MemorySessionStore, SQLiteSessionStore
+import ui.app as app
+
+
+class TestMultiTurnAppointment(unittest.TestCase):
+
+    def chat(self, message):
+        return list(app.wrapper_fn(message, [], "", 512, 0.7, 0.95, request=self.request))[-1]
+
+    def run_booking(self, store, async_pipeline=False):
+        self.request = SimpleNamespace(session_hash="session-1")
+        analyzed = {"action": "add_appointment", "name": "John"}
+        # No index or bundle on disk
+        missing = RuntimeError("could not open data_index.faiss")
+        with mock.patch.object(app, "session_store", store), \
+                mock.patch.object(app, "ASYNC_PIPELINE", async_pipeline), \
+                mock.patch.object(app, "get_knowledge_base", side_effect=missing) as get_knowledge_base, \
+                mock.patch.object(app, "fast_analyze_request", return_value=analyzed), \
+                mock.patch.object(app, "run_appointment_action", return_value="Appointment created") as action:
+            self.assertTrue(self.chat("book appointment for John").endswith("surname"))
+            self.assertTrue(self.chat("Smith").endswith("personal_id"))
+            self.assertEqual(self.chat("12"), "Wrong input. Please try again personal_id:")
+            self.assertTrue(self.chat("123456").endswith("date"))
+            self.assertTrue(self.chat("01.02.2030").endswith("time"))
+            self.assertTrue(self.chat("10:00").endswith("description"))
+            self.assertEqual(self.chat("Checkup"), "Appointment created")
+        # The knowledge base is only needed to retrieve speculatively
+        self.assertEqual(get_knowledge_base.call_count, 1 if async_pipeline else 0)
+
+        data = action.call_args[0][0]
+        self.assertEqual((data["name"], data["surname"], data["personal_id"], data["description"]),
+                         ("John", "Smith", "123456", "Checkup"))
+        self.assertEqual(action.call_args[1]["session_id"], "session-1")
+        # Ready for the next request
+        state = store.get("session-1")
+        self.assertEqual((state["missing_params"], state["reset_status"], state["data"]), ([], True, {}))
+
+    def test_missing_params_are_asked_across_turns(self):
+        self.run_booking(MemorySessionStore())
+
+    def test_appointments_work_without_a_knowledge_base(self):
+        self.run_booking(MemorySessionStore(), async_pipeline=True)
+
+    def test_sqlite_sessions_keep_missing_params(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.run_booking(SQLiteSessionStore(os.path.join(tmp_dir, "sessions.db")))
+
+
+class TestMedicalTurn(unittest.TestCase):
+
+    def test_knowledge_base_is_loaded_once_for_medical_questions(self):
+        knowledge_base = object()
+        with mock.patch.object(app, "session_store", MemorySessionStore()), \
+                mock.patch.object(app, "ASYNC_PIPELINE", False), \
+                mock.patch.object(app, "get_knowledge_base", return_value=knowledge_base) as get_knowledge_base, \
+                mock.patch.object(app, "fast_analyze_request", return_value={"action": "medical_question"}), \
+                mock.patch.object(app, "handle_med_question", return_value=iter(["Rest ", "and fluids."])) as answer:
+            outputs = list(app.wrapper_fn("How is flu treated?", [], "", 512, 0.7, 0.95,
+                                          request=SimpleNamespace(session_hash="session-2")))
+
+        self.assertEqual(outputs, ["Rest ", "Rest and fluids."])
+        get_knowledge_base.assert_called_once_with()
+        self.assertIs(answer.call_args[1]["knowledge_base"], knowledge_base)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+# Unit tests for the asyncio pipeline and its speculative retrieval
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# The OpenAI clients are created at import, no request is sent in these tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+import faiss
+import numpy as np
+from backend import async_chatbot
+from backend.intent_classifier import IntentClassifier
+from backend.retrieval_batcher import RetrievalBatcher
+
+
+class TestSpeculativeRetrieval(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        async_chatbot.speculation_counts.clear()
+        self.retrieved = (np.ones(4, dtype=np.float32), np.array([3, 1, 2]))
+        self.retrieval_cancelled = False
+
+    async def retrieve(self, query, faiss_index, query_embedding=None):
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            self.retrieval_cancelled = True
+            raise
+        return self.retrieved
+
+    async def speculate(self, analysis, retrieve=None):
+        async def analyze(query, embedding=None):
+            # Retrieval starts while the request is analyzed
+            await asyncio.sleep(0.01)
+            return analysis
+
+        with patch.object(async_chatbot, "async_analyze_request", analyze), \
+                patch.object(async_chatbot, "retrieval_batcher", None), \
+                patch.object(async_chatbot, "async_generate_embedding", AsyncMock(return_value=self.retrieved[0])), \
+                patch.object(async_chatbot, "async_retrieve", retrieve or self.retrieve):
+            return await async_chatbot.async_analyze_with_speculative_retrieval("query", faiss_index=None)
+
+    async def test_speculation_used_for_medical_questions(self):
+        analysis, retrieved = await self.speculate({"action": "medical_question"})
+
+        self.assertEqual(analysis, {"action": "medical_question"})
+        self.assertIs(retrieved, self.retrieved)
+        self.assertEqual(dict(async_chatbot.speculation_counts), {"used": 1})
+
+    async def test_speculation_discarded_for_other_actions(self):
+        analysis, retrieved = await self.speculate({"action": "add_appointment", "name": "Ahmet"})
+        await asyncio.sleep(0)
+
+        self.assertEqual(analysis["action"], "add_appointment")
+        self.assertIsNone(retrieved)
+        self.assertTrue(self.retrieval_cancelled)
+        self.assertEqual(dict(async_chatbot.speculation_counts), {"discarded": 1})
+
+    async def test_failed_speculation_leaves_retrieval_to_the_caller(self):
+        analysis, retrieved = await self.speculate({"action": "medical_question"},
+                                                   retrieve=AsyncMock(side_effect=RuntimeError("embeddings down")))
+
+        self.assertEqual(analysis, {"action": "medical_question"})
+        self.assertIsNone(retrieved)
+        self.assertEqual(dict(async_chatbot.speculation_counts), {"failed": 1})
+
+    async def test_analysis_runs_the_centroid_stage_before_the_llm(self):
+        # "pain" pulls the query onto the medical_question centroid, no rule matches it
+        classifier = IntentClassifier(
+            embed=lambda texts: np.array([[1.0, 0.0] if "pain" in text else [0.0, 1.0] for text in texts]),
+            examples={"medical_question": ["pain"], "invalid": ["weather"]},
+        )
+        llm = AsyncMock(return_value={"action": "invalid"})
+        with patch.object(async_chatbot, "intent_classifier", classifier), \
+                patch.object(async_chatbot, "async_llm_analyze_request", llm):
+            self.assertEqual(await async_chatbot.async_analyze_request("my knee pains when I run"),
+                             {"action": "medical_question"})
+            self.assertEqual(await async_chatbot.async_analyze_request("will it rain"), {"action": "invalid"})
+
+        llm.assert_awaited_once_with("will it rain")
+        self.assertEqual(classifier.stats()["centroid"], 1)
+        self.assertEqual(classifier.stats()["fallback"], 1)
+
+
+class TestSharedQueryEmbedding(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        async_chatbot.speculation_counts.clear()
+        self.embedded = []
+        # "pain" pulls a query onto the medical_question centroid, no rule matches it
+        self.classifier = IntentClassifier(embed=self.embed, examples={"medical_question": ["pain"],
+                                                                       "invalid": ["weather"]})
+        self.index = faiss.IndexFlatL2(2)
+        self.index.add(np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32))
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return np.array([[1.0, 0.0] if "pain" in text else [0.0, 1.0] for text in texts], dtype=np.float32)
+
+    async def speculate(self, query, batcher=None):
+        async def generate_embedding(query):
+            return self.embed([query])[0]
+
+        llm = AsyncMock(return_value={"action": "invalid"})
+        with patch.object(async_chatbot, "intent_classifier", self.classifier), \
+                patch.object(async_chatbot, "async_llm_analyze_request", llm), \
+                patch.object(async_chatbot, "retrieval_batcher", batcher), \
+                patch.object(async_chatbot, "async_generate_embedding", generate_embedding):
+            return await async_chatbot.async_analyze_with_speculative_retrieval(query, self.index)
+
+    async def test_centroid_stage_and_retrieval_embed_the_query_once(self):
+        analysis, (query_embedding, indexes) = await self.speculate("my knee pains when I run")
+
+        self.assertEqual(analysis, {"action": "medical_question"})
+        self.assertEqual(indexes[0], 0)
+        self.assertEqual(self.embedded.count("my knee pains when I run"), 1)
+        self.assertEqual(self.classifier.stats()["centroid"], 1)
+
+    async def test_speculative_retrieval_goes_through_the_batcher(self):
+        batcher = RetrievalBatcher(self.embed, window_ms=1)
+        analysis, (query_embedding, indexes) = await self.speculate("my knee pains when I run", batcher=batcher)
+
+        self.assertEqual(analysis, {"action": "medical_question"})
+        self.assertEqual(indexes[0], 0)
+        self.assertEqual(self.embedded.count("my knee pains when I run"), 1)
+        self.assertEqual(batcher.stats()["queries"], 1)
+
+    async def test_failed_embedding_falls_back_to_the_llm(self):
+        async def generate_embedding(query):
+            raise RuntimeError("embeddings down")
+
+        with patch.object(async_chatbot, "intent_classifier", self.classifier), \
+                patch.object(async_chatbot, "async_llm_analyze_request", AsyncMock(return_value={"action": "invalid"})), \
+                patch.object(async_chatbot, "retrieval_batcher", None), \
+                patch.object(async_chatbot, "async_generate_embedding", generate_embedding):
+            analysis, retrieved = await async_chatbot.async_analyze_with_speculative_retrieval("will it rain",
+                                                                                              self.index)
+
+        self.assertEqual((analysis, retrieved), ({"action": "invalid"}, None))
+        self.assertEqual(self.classifier.stats()["fallback"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# Unit tests for batched, rate-limit-aware embedding
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import unittest
+import numpy as np
+from backend.batch_embedder import AdaptiveConcurrency, BatchEmbedder, token_batches
+from backend.context_builder import count_tokens
+from backend.embeddings import OpenAIEmbeddingProvider
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+class FakeProvider:
+    # Embeds a text as [its length], failing the first rate_limits requests with a 429
+    def __init__(self, rate_limits=0, error=RateLimitError):
+        self.rate_limits = rate_limits
+        self.error = error
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def embed(self, texts):
+        with self.lock:
+            if self.rate_limits:
+                self.rate_limits -= 1
+                raise self.error("slow down")
+            self.requests.append(list(texts))
+        return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+
+class TestBatchEmbedder(unittest.TestCase):
+
+    def setUp(self):
+        self.texts = [f"chunk {i} " + "fever " * (i % 7) for i in range(50)]
+
+    def test_batches_respect_token_and_input_limits(self):
+        batches = list(token_batches(self.texts, max_tokens=30, max_inputs=8))
+        self.assertEqual([p for positions, _, _ in batches for p in positions], list(range(50)))
+        for positions, texts, tokens in batches:
+            self.assertLessEqual(len(texts), 8)
+            self.assertLessEqual(tokens, 30)
+            self.assertEqual(tokens, sum(count_tokens(text) for text in texts))
+
+    def test_results_keep_input_order(self):
+        provider = FakeProvider()
+        embedder = BatchEmbedder(provider, max_tokens=40, max_inputs=6)
+        embeddings = embedder.embed(self.texts)
+
+        np.testing.assert_array_equal(embeddings[:, 0], [len(text) for text in self.texts])
+        self.assertLess(len(provider.requests), len(self.texts))
+        stats = embedder.stats()
+        self.assertEqual(stats["texts"], 50)
+        self.assertEqual(stats["requests"], len(provider.requests))
+        self.assertEqual(stats["tokens"], sum(count_tokens(text) for text in self.texts))
+
+    def test_rate_limits_are_retried_and_lower_concurrency(self):
+        concurrency = AdaptiveConcurrency(initial=8, maximum=8)
+        embedder = BatchEmbedder(FakeProvider(rate_limits=2), max_tokens=40, concurrency=concurrency, backoff=0.001)
+        embeddings = embedder.embed(self.texts)
+
+        self.assertEqual(len(embeddings), 50)
+        stats = embedder.stats()
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["rate_limited"], 2)
+        self.assertLess(stats["concurrency"], 8)
+
+    def test_retries_are_bounded_and_client_errors_fail_fast(self):
+        embedder = BatchEmbedder(FakeProvider(rate_limits=10), max_retries=2, backoff=0.001)
+        with self.assertRaises(RateLimitError):
+            embedder.embed(["fever"])
+        self.assertEqual(embedder.stats()["retries"], 2)
+
+        embedder = BatchEmbedder(FakeProvider(rate_limits=1, error=BadRequestError), backoff=0.001)
+        with self.assertRaises(BadRequestError):
+            embedder.embed(["fever"])
+        self.assertEqual(embedder.stats()["retries"], 0)
+
+    def test_provider_client_does_not_retry(self):
+        from openai import OpenAI
+
+        provider = OpenAIEmbeddingProvider(client=OpenAI(api_key="test", max_retries=2))
+        embedder = BatchEmbedder(provider)
+        self.assertEqual(embedder.provider.client.max_retries, 0)
+        self.assertEqual(embedder.provider.name, provider.name)
+        # The provider shared with the chatbot keeps its retries
+        self.assertEqual(provider.client.max_retries, 2)
+
+    def test_vector_count_mismatch_fails(self):
+        provider = FakeProvider()
+        provider.embed = lambda texts: np.zeros((len(texts) - 1, 1), dtype=np.float32)
+        embedder = BatchEmbedder(provider, max_tokens=40, max_inputs=6)
+        with self.assertRaisesRegex(ValueError, "5 vectors for 6 texts"):
+            embedder.embed(self.texts)
+        self.assertEqual(embedder.stats()["requests"], 0)
+
+    def test_concurrency_grows_after_successes_and_drops_when_slow(self):
+        concurrency = AdaptiveConcurrency(initial=2, maximum=4, target_latency=1.0)
+        for _ in range(2):
+            concurrency.acquire()
+            concurrency.release(latency=0.1)
+        self.assertEqual(concurrency.limit, 3)
+
+        concurrency.acquire()
+        concurrency.release(latency=5.0)
+        self.assertEqual(concurrency.limit, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
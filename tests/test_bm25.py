@@ -0,0 +1,72 @@
+# Unit tests for the BM25 index and rank fusion
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+import numpy as np
+from backend.bm25 import BM25Index, BM25Writer, reciprocal_rank_fusion
+
+TEXTS = [
+    "Metformin is used to treat type 2 diabetes.",
+    "Ibuprofen relieves headache and fever.",
+    "Influenza causes fever, cough and muscle pain.",
+    "Diabetes patients should monitor blood sugar.",
+]
+
+
+class TestBM25Index(unittest.TestCase):
+
+    def test_rare_term_ranks_its_document_first(self):
+        index = BM25Index.build(TEXTS)
+
+        scores, ids = index.search("metformin dose", k=2)
+        self.assertEqual(list(ids), [0])
+        self.assertGreater(scores[0], 0)
+
+    def test_results_are_sorted_and_limited(self):
+        index = BM25Index.build(TEXTS)
+
+        scores, ids = index.search("diabetes fever", k=3)
+        self.assertEqual(len(ids), 3)
+        self.assertTrue(all(scores[i] >= scores[i + 1] for i in range(len(scores) - 1)))
+        self.assertEqual(len(index.search("unknownword", k=3)[1]), 0)
+
+    def test_save_and_load(self):
+        index = BM25Index.build(TEXTS)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bm25.npz")
+            index.save(path)
+            loaded = BM25Index.load(path)
+
+        self.assertEqual(loaded.terms, index.terms)
+        self.assertEqual(list(loaded.search("influenza cough", k=2)[1]), list(index.search("influenza cough", k=2)[1]))
+
+    def test_writer_matches_build(self):
+        texts = TEXTS * 3 + ["Fever fever fever."]
+        index = BM25Index.build(texts)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bm25.npz")
+            # Several segments, the last one partial
+            with BM25Writer(path, batch_size=4) as writer:
+                for text in texts:
+                    writer.add(text)
+            written = BM25Index.load(path)
+            self.assertEqual(os.listdir(tmp_dir), ["bm25.npz"])
+
+            with BM25Writer(path) as writer:
+                pass
+            self.assertEqual(len(BM25Index.load(path)), 0)
+
+        self.assertEqual(written.terms, index.terms)
+        for name in ("indptr", "doc_ids", "term_freqs", "doc_lengths"):
+            np.testing.assert_array_equal(getattr(written, name), getattr(index, name))
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[3, 1, -1], [1, 2]], limit=2)
+        self.assertEqual(fused, [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# Unit tests for the lazy start-up of the chatbot
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import subprocess
+import tempfile
+import unittest
+from backend.embeddings import LocalEmbeddingProvider
+from backend.load_data import build_knowledge_index
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs in a fresh interpreter, so the import is really the first one
+STARTUP_SCRIPT = """
+import json, os, sys
+sys.path.insert(0, sys.argv[1])
+import faiss
+
+opened = []
+read_index = faiss.read_index
+faiss.read_index = lambda path, *args: opened.append(path) or read_index(path, *args)
+cache_path = os.environ["EMBEDDING_CACHE_PATH"]
+
+import backend.chatbot as chatbot
+report = {"import": {"opened": list(opened), "resources": sorted(chatbot._resources),
+                     "cache_db": os.path.exists(cache_path)}}
+
+knowledge_base = chatbot.get_knowledge_base()
+chatbot.get_knowledge_base()
+chatbot.embedding_cache.get("fever", chatbot.EMBEDDING_MODEL)
+report["first_use"] = {"opened": list(opened), "chunks": len(knowledge_base.chunks),
+                       "cache_db": os.path.exists(cache_path)}
+
+chatbot.warm_up()
+report["warm_up"] = {"resources": sorted(chatbot._resources), "session_agents": len(chatbot.session_agents)}
+print(json.dumps(report))
+"""
+
+
+class TestChatbotStartup(unittest.TestCase):
+
+    def test_import_loads_nothing_until_first_use(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            records = [f"Record {i}. Influenza symptoms include fever and cough." for i in range(10)]
+            build_knowledge_index(records, LocalEmbeddingProvider(dimension=16), output_dir=tmp_dir, workers=0)
+            env = dict(
+                os.environ,
+                OPENAI_API_KEY="test",
+                EMBEDDING_PROVIDER="local",
+                EMBEDDING_DIMENSION="16",
+                EMBEDDING_CACHE_PATH=os.path.join(tmp_dir, "embedding_cache.db"),
+                FAISS_PATH=os.path.join(tmp_dir, "data_index.faiss"),
+                CHUNKS_PATH=os.path.join(tmp_dir, "chunks.store"),
+                BM25_PATH=os.path.join(tmp_dir, "bm25.npz"),
+                KNOWLEDGE_BASE_DIR="",
+                KNOWLEDGE_BASE_WATCH_SECONDS="0",
+                RETRIEVAL_MODE="vector",
+            )
+            output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, ROOT_DIR], env=env, cwd=tmp_dir,
+                                    capture_output=True, text=True, timeout=300, check=True).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+
+        self.assertEqual(report["import"], {"opened": [], "resources": [], "cache_db": False})
+        # Opened on first access, once
+        self.assertEqual(report["first_use"], {"opened": [env["FAISS_PATH"]], "chunks": 10, "cache_db": True})
+        # warm_up prepares what per-session agents share, not an agent nobody uses
+        self.assertEqual(report["warm_up"], {"resources": ["agent_llm", "agent_tools"], "session_agents": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+# Unit tests for the memory-mapped chunk store
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+from backend.chunk_store import ChunkStore, ChunkStoreWriter, write_chunk_store
+
+
+class TestChunkStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "chunks.store")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lookup_by_id(self):
+        texts = ["first chunk", "ikinci parça çğüşö", "", "last chunk"]
+        write_chunk_store(self.path, texts)
+
+        store = ChunkStore(self.path)
+        self.assertEqual(len(store), 4)
+        for i, text in enumerate(texts):
+            self.assertEqual(store[i], text)
+        store.close()
+
+    def test_get_many_skips_missing_faiss_ids(self):
+        write_chunk_store(self.path, ["a", "b", "c"])
+
+        store = ChunkStore(self.path)
+        self.assertEqual(store.get_many([2, 0, -1]), ["c", "a"])
+        with self.assertRaises(IndexError):
+            store[3]
+        store.close()
+
+    def test_failed_write_leaves_no_file(self):
+        with self.assertRaises(RuntimeError):
+            with ChunkStoreWriter(self.path) as writer:
+                writer.add("partial")
+                raise RuntimeError("build failed")
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# Unit tests for context assembly
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import numpy as np
+from backend.context_builder import build_context, mmr, trim_overlap
+
+
+class FakeChunks(list):
+    def get_many(self, ids):
+        return [self[i] for i in ids if i >= 0]
+
+
+class TestContextBuilder(unittest.TestCase):
+
+    def test_trim_overlap_between_neighbouring_chunks(self):
+        overlap = "shared sentence from the text splitter overlap. "
+        first = "Influenza is a viral infection. " + overlap
+        second = overlap + "It spreads through droplets."
+
+        self.assertEqual(trim_overlap(second, [first]), "It spreads through droplets.")
+        self.assertEqual(trim_overlap("viral infection", [first]), "")
+
+    def test_mmr_prefers_diverse_candidates(self):
+        query = np.array([1.0, 0.0])
+        vectors = np.array([[1.0, 0.1], [1.0, 0.11], [0.7, 0.7]])
+
+        self.assertEqual(mmr(query, vectors, k=2, lambda_=0.3), [0, 2])
+
+    def test_token_budget_and_saved_tokens(self):
+        overlap = "x" * 200
+        chunks = FakeChunks(["a" * 400 + overlap, overlap + "b" * 400, " ".join(["word"] * 2000)])
+        vectors = np.eye(3)
+
+        ids, context, report = build_context(
+            np.array([1.0, 1.0, 1.0]), [0, 1, 2, -1], chunks,
+            get_vectors=lambda ids: vectors[ids], token_budget=500,
+        )
+
+        self.assertEqual(sorted(ids), [0, 1])
+        self.assertEqual(context.count(overlap), 1)
+        self.assertLessEqual(report["context_tokens"], 500)
+        self.assertGreater(report["tokens_saved"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# Unit tests for the deterministic tool dispatcher
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from backend.dispatcher import ToolDispatcher
+from backend.http_transport import response_result
+
+
+class FakeResponse:
+    # The parts of requests.Response the API functions use
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class TestToolDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def get_appointment_by_id(data):
+            self.calls.append(data)
+            return {"id": data["appointment_id"], "name": "Ahmet", "surname": "Yilmaz", "personal_id": "123456",
+                    "date": "15-10-2025", "time": "14:00", "description": "Checkup"}
+
+        self.dispatcher = ToolDispatcher({
+            "get_appointment_by_id": get_appointment_by_id,
+            "get_all_appointments": lambda: response_result(FakeResponse(404, {"message": "No appointments found"})),
+            "delete_appointment": lambda data: {"error": "Appointment ID must required"},
+        })
+
+    def test_dispatches_known_action_with_template(self):
+        reply = self.dispatcher.dispatch({"action": "get_appointment_by_id", "appointment_id": "7",
+                                          "query": "Show me the details of my appointment number 7"})
+
+        self.assertEqual(self.calls[0]["appointment_id"], 7)
+        self.assertIn("Appointment 7: Ahmet Yilmaz", reply)
+        self.assertEqual(self.dispatcher.stats()["llm_calls_saved"], 2)
+
+    def test_errors_and_empty_lists_are_formatted(self):
+        reply = self.dispatcher.dispatch({"action": "get_all_appointments", "query": "Show all my appointments please"})
+        self.assertEqual(reply, "No appointments found.")
+        self.assertIn("must required", self.dispatcher.dispatch({"action": "delete_appointment", "appointment_id": 1}))
+
+    def test_failed_api_calls_are_not_reported_as_done(self):
+        failed = FakeResponse(400, {"message": "UNIQUE constraint failed"})
+        dispatcher = ToolDispatcher({
+            # add and update return the parsed body, delete the raw response
+            "add_appointment": lambda data: response_result(FakeResponse(500, {"message": "database is locked"})),
+            "update_appointment": lambda data: response_result(failed),
+            "delete_appointment": lambda data: failed,
+        })
+        query = "I would like to change my appointment for tomorrow afternoon"
+        replies = [
+            dispatcher.dispatch({"action": "add_appointment", "date": "15-10-2025", "time": "14:00", "query": query}),
+            dispatcher.dispatch({"action": "update_appointment", "appointment_id": 3, "query": query}),
+            dispatcher.dispatch({"action": "delete_appointment", "appointment_id": 3, "query": query}),
+        ]
+        self.assertEqual(replies[0], "The request could not be completed: database is locked")
+        for reply in replies[1:]:
+            self.assertEqual(reply, "The request could not be completed: UNIQUE constraint failed")
+
+    def test_replies_in_the_users_language(self):
+        dispatcher = ToolDispatcher({"delete_appointment": lambda data: FakeResponse(200, {"message": "ok"})})
+        reply = dispatcher.dispatch({"action": "delete_appointment", "appointment_id": 3,
+                                     "query": "3 numaralı randevumu silmek istiyorum lütfen"})
+        self.assertEqual(reply, "3 numaralı randevu silindi.")
+
+        reply = self.dispatcher.dispatch({"action": "get_all_appointments", "query": "Tüm randevularımı göster"})
+        self.assertEqual(reply, "Randevu bulunamadı.")
+
+    def test_unknown_action_falls_back_to_agent(self):
+        self.assertIsNone(self.dispatcher.dispatch({"action": "reschedule_everything"}))
+        self.assertEqual(self.dispatcher.stats()["agent"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# Unit tests for the query embedding cache
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+import numpy as np
+from backend.embedding_cache import EmbeddingCache
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_normalized_text_hits_memory(self):
+        cache = EmbeddingCache(db_path=self.db_path)
+        cache.put("What are the symptoms of flu", "model-a", [0.1, 0.2])
+
+        embedding = cache.get("  what are the   symptoms of FLU ", "model-a")
+        np.testing.assert_allclose(embedding, np.array([0.1, 0.2], dtype=np.float32))
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+
+    def test_model_is_part_of_key(self):
+        cache = EmbeddingCache(db_path=self.db_path)
+        cache.put("flu", "model-a", [0.1, 0.2])
+
+        self.assertIsNone(cache.get("flu", "model-b"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_disk_tier_survives_restart(self):
+        EmbeddingCache(db_path=self.db_path).put("flu", "model-a", [0.5, 0.5])
+
+        cache = EmbeddingCache(db_path=self.db_path)
+        embedding = cache.get("flu", "model-a")
+        np.testing.assert_allclose(embedding, [0.5, 0.5])
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_memory_tier_is_bounded(self):
+        cache = EmbeddingCache(max_items=2)
+        for i in range(3):
+            cache.put(f"query {i}", "model-a", [float(i)])
+
+        self.assertEqual(cache.stats()["memory_items"], 2)
+        self.assertIsNone(cache.get("query 0", "model-a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
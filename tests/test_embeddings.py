@@ -0,0 +1,44 @@
+# Unit tests for the local embedding provider
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import numpy as np
+from backend.embeddings import LocalEmbeddingProvider, make_probe_queries, hit_rate
+
+
+class TestLocalEmbeddingProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = LocalEmbeddingProvider(dimension=256)
+
+    def test_shape_dtype_and_unit_length(self):
+        vectors = self.provider.embed(["flu symptoms", "", "baş ağrısı"])
+
+        self.assertEqual(vectors.shape, (3, 256))
+        self.assertEqual(vectors.dtype, np.float32)
+        np.testing.assert_allclose(np.linalg.norm(vectors[[0, 2]], axis=1), [1.0, 1.0], rtol=1e-5)
+        self.assertEqual(np.linalg.norm(vectors[1]), 0.0)
+
+    def test_deterministic_and_similarity(self):
+        query = self.provider.embed_query("symptoms of influenza")
+        again = self.provider.embed_query("symptoms of influenza")
+        related = self.provider.embed_query("influenza symptoms include fever")
+        unrelated = self.provider.embed_query("appointment on monday")
+
+        np.testing.assert_array_equal(query, again)
+        self.assertGreater(query @ related, query @ unrelated)
+
+    def test_probe_queries_point_to_source_chunk(self):
+        texts = ["one two three four five", "a b", "six seven eight nine ten eleven"]
+        queries, expected = make_probe_queries(texts, n_queries=5, words=4)
+
+        self.assertEqual(len(queries), 2)
+        for query, i in zip(queries, expected):
+            self.assertIn(query, texts[i])
+        self.assertEqual(hit_rate([[expected[0]], [99]], expected), 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+# Unit tests for the booking API transports
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from flask import Flask, jsonify, request
+from backend.http_transport import HTTPTransport, InProcessTransport
+
+
+class TestHTTPTransport(unittest.TestCase):
+
+    def test_session_is_pooled_with_retries(self):
+        transport = HTTPTransport("http://localhost:8000/", retries=2, pool_size=4)
+        adapter = transport.session.get_adapter("http://localhost:8000/appointments")
+
+        self.assertEqual(transport.base_url, "http://localhost:8000")
+        self.assertEqual(adapter.max_retries.total, 2)
+        self.assertEqual(adapter._pool_maxsize, 4)
+        transport.close()
+
+    def test_in_process_transport_calls_the_app(self):
+        app = Flask(__name__)
+
+        @app.route("/appointments/", methods=["POST"])
+        def add():
+            return jsonify({"message": "Appointment booked", "name": request.json["name"]}), 201
+
+        response = InProcessTransport(app).post("/appointments", json={"name": "Ahmet"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["name"], "Ahmet")
+
+
+if __name__ == '__main__':
+    unittest.main()
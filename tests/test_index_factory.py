@@ -0,0 +1,62 @@
+# Unit tests for the FAISS index factory
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import faiss
+import numpy as np
+from backend.index_factory import (
+    IncrementalIndexBuilder, benchmark_index, build_index, configure_search, fit_nlist, prepare_reconstruct,
+    reconstruct_vectors, sample_queries,
+)
+
+
+class TestIndexFactory(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(2000, 32)).astype(np.float32)
+        self.queries = sample_queries(self.vectors, 50)
+        _, self.ground_truth = build_index(self.vectors, "flat").search(self.queries, 5)
+
+    def test_exact_indexes_have_full_recall(self):
+        for index_type in ("flat", "sq_fp16"):
+            index = build_index(self.vectors, index_type)
+            self.assertEqual(index.ntotal, len(self.vectors))
+            result = benchmark_index(index, self.queries, self.ground_truth, k=5)
+            self.assertEqual(result["recall_at_k"], 1.0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+    def test_search_settings_and_reconstruct(self):
+        index = configure_search(build_index(self.vectors, "ivf_flat", nlist=16), nprobe=16)
+        self.assertEqual(faiss.extract_index_ivf(index).nprobe, 16)
+        # All lists probed: exact
+        self.assertEqual(benchmark_index(index, self.queries, self.ground_truth, k=5)["recall_at_k"], 1.0)
+        # reconstruct_vectors never changes the index, the direct map is built at load time
+        with self.assertRaises(RuntimeError):
+            reconstruct_vectors(index, [4])
+        prepare_reconstruct(index)
+        np.testing.assert_array_equal(reconstruct_vectors(index, [4, 9]), self.vectors[[4, 9]])
+
+        index = configure_search(build_index(self.vectors, "hnsw", hnsw_m=8), ef_search=77)
+        self.assertEqual(index.hnsw.efSearch, 77)
+        # Settings that don't apply are ignored
+        configure_search(build_index(self.vectors, "flat"), nprobe=8, ef_search=8)
+
+    def test_small_corpus_gets_fewer_lists(self):
+        self.assertEqual(fit_nlist(400, 67), 1)
+        self.assertEqual(fit_nlist(16, 2000), 16)
+
+        index = build_index(self.vectors[:100], "ivf_flat", nlist=400)
+        self.assertEqual(faiss.extract_index_ivf(index).nlist, 2)
+        for index_type in ("ivf_flat", "ivf_pq"):
+            builder = IncrementalIndexBuilder(index_type=index_type, id_map=True)
+            builder.add(self.vectors[:60], np.arange(60))
+            index = builder.finish()
+            self.assertEqual(index.ntotal, 60)
+            self.assertEqual(faiss.extract_index_ivf(index).nlist, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# Unit tests for the local intent classifier
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+from backend.intent_classifier import IntentClassifier
+
+
+class TestIntentClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.fallback = MagicMock(return_value={"action": "add_appointment", "name": "Ahmet"})
+        self.classifier = IntentClassifier(threshold=0.85)
+
+    def test_list_all_appointments_skips_llm(self):
+        for query in ["list all appointments", "Can you show me all the appointments?", "Tüm randevuları listele"]:
+            self.assertEqual(self.classifier.analyze(query, self.fallback), {"action": "get_all_appointments"})
+        self.fallback.assert_not_called()
+
+    def test_single_and_changing_requests_are_not_listings(self):
+        queries = [
+            "Show my appointment 3",
+            "Show my appointments",
+            "Get my appointment with id 4",
+            "Show all appointments with number five",
+            "Delete all appointments",
+            "Cancel every appointment I have",
+            "Update all my appointments",
+            "Book all appointments for next week",
+            "tüm randevuları sil",
+            "Bütün randevularımı iptal et",
+            "Tüm randevuları güncelle",
+            "Tüm randevuları yarına al",
+            "3 numaralı randevuları listele",
+        ]
+        for query in queries:
+            self.assertIsNone(self.classifier.match_rules(query), query)
+            self.classifier.analyze(query, self.fallback)
+        self.assertEqual(self.fallback.call_count, len(queries))
+
+    def test_obvious_medical_question_skips_llm(self):
+        result = self.classifier.analyze("What are the symptoms of flu?", self.fallback)
+
+        self.assertEqual(result, {"action": "medical_question"})
+        self.fallback.assert_not_called()
+
+    def test_appointment_requests_fall_back(self):
+        result = self.classifier.analyze("Book an appointment for my fever tomorrow", self.fallback)
+
+        self.assertEqual(result["action"], "add_appointment")
+        self.fallback.assert_called_once()
+        self.assertEqual(self.classifier.stats()["fallback"], 1)
+
+    def test_fast_path_rate(self):
+        self.classifier.analyze("list all appointments", self.fallback)
+        self.classifier.analyze("hello there", self.fallback)
+
+        self.assertEqual(self.classifier.stats()["fast_path_rate"], 0.5)
+
+    def test_centroids_are_embedded_in_one_request(self):
+        requests = []
+
+        def embed(texts):
+            requests.append(list(texts))
+            return np.array([[1.0, 0.0] if "ouch" in text or "sore" in text else [0.0, 1.0] for text in texts])
+
+        classifier = IntentClassifier(embed=embed, examples={"medical_question": ["ouch", "sore"],
+                                                             "invalid": ["weather"]})
+        self.assertEqual(classifier.classify("ouch, my knee")[::2], ("medical_question", "centroid"))
+        self.assertEqual(classifier.classify("nice weather")[::2], ("invalid", "centroid"))
+        # The examples in one request, then one request per query
+        self.assertEqual(requests, [["ouch", "sore", "weather"], ["ouch, my knee"], ["nice weather"]])
+        np.testing.assert_allclose(classifier.centroids, [[1.0, 0.0], [0.0, 1.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
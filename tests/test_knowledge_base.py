@@ -0,0 +1,82 @@
+# Unit tests for versioned knowledge base bundles and hot swap
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+import faiss
+from backend.embeddings import LocalEmbeddingProvider
+from backend.knowledge_base import (
+    CHUNKS_FILE, KnowledgeBaseManager, current_version, load_bundle, prepare_bundle_dir, publish_bundle,
+    read_bundle_manifest, write_bundle_manifest,
+)
+from backend.load_data import build_knowledge_index
+
+
+class TestKnowledgeBase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.provider = LocalEmbeddingProvider(dimension=32)
+        self.manager = KnowledgeBaseManager(self.load, root=self.root)
+        self.swapped = []
+        self.manager.swap_listeners.append(lambda knowledge_base: self.swapped.append(knowledge_base.version))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, bundle_dir):
+        return load_bundle(bundle_dir, faiss.read_index, embedding_model=self.provider.name)
+
+    def publish(self, version, records, model=None):
+        bundle_dir = prepare_bundle_dir(self.root, version)
+        summary = build_knowledge_index(records, self.provider, output_dir=bundle_dir)
+        write_bundle_manifest(bundle_dir, model or self.provider.name, 32, "flat", stats=summary)
+        publish_bundle(self.root, version)
+        return bundle_dir
+
+    def test_bundle_manifest_describes_the_build(self):
+        bundle_dir = self.publish("v1", ["Influenza causes fever.", "Asthma narrows the airways."])
+        manifest = read_bundle_manifest(bundle_dir)
+        self.assertEqual(current_version(self.root), "v1")
+        self.assertEqual((manifest["version"], manifest["dimension"]), ("v1", 32))
+        self.assertEqual(manifest["embedding_model"], self.provider.name)
+        self.assertEqual(manifest["stats"]["chunks"], 2)
+        self.assertIn(CHUNKS_FILE, manifest["files"])
+
+    def test_new_bundle_is_swapped_in_while_old_one_stays_usable(self):
+        self.publish("v1", ["Influenza causes fever."])
+        old = self.manager.current()
+        self.assertEqual(old.version, "v1")
+
+        self.publish("v2", ["Influenza causes fever.", "Asthma narrows the airways."])
+        self.assertTrue(self.manager.reload())
+        self.assertFalse(self.manager.reload())
+        self.assertEqual(self.manager.current().version, "v2")
+        self.assertEqual(len(self.manager.current().chunks), 2)
+        self.assertEqual(self.swapped, ["v1", "v2"])
+        # A request that started on v1 still reads v1
+        self.assertEqual(old.chunks[0], "Influenza causes fever.")
+        self.assertEqual(len(old.chunks), 1)
+
+    def test_broken_bundles_are_refused(self):
+        self.publish("v1", ["Influenza causes fever."])
+        self.manager.current()
+
+        bundle_dir = self.publish("v2", ["Asthma narrows the airways."])
+        with open(os.path.join(bundle_dir, CHUNKS_FILE), "r+b") as f:
+            f.write(b"X")
+        with self.assertRaises(ValueError):
+            self.manager.reload()
+
+        self.publish("v3", ["Asthma narrows the airways."], model="another-model")
+        with self.assertRaises(ValueError):
+            self.manager.reload()
+        self.assertEqual(self.manager.current().version, "v1")
+        self.assertEqual(self.manager.stats()["failures"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+# Unit tests for the streaming ingestion pipeline
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+import faiss
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from backend.chunk_store import ChunkStore
+from backend.embeddings import LocalEmbeddingProvider
+from backend.build_manifest import BuildManifest, chunk_hash
+from backend.load_data import build_incremental_index, build_knowledge_index, iter_chunks, iter_records
+
+
+class CountingProvider(LocalEmbeddingProvider):
+    # Local embeddings that remember every embedded text
+    def __init__(self):
+        super().__init__(dimension=64)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+class TestLoadData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.records = [f"Record {i}.   Influenza   symptoms include fever.\n" + "word " * (i * 120) for i in range(12)]
+        self.records.append(None)
+        self.parquet_path = os.path.join(self.tmp_dir.name, "data.parquet")
+        pq.write_table(pa.table({"data": self.records}), self.parquet_path, row_group_size=4)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_records_are_streamed_and_chunked_separately(self):
+        records = list(iter_records(self.parquet_path, batch_rows=3))
+        self.assertEqual(records, self.records)
+
+        chunks = list(iter_chunks(records[:2]))
+        self.assertEqual(chunks, ["Record 0. Influenza symptoms include fever.",
+                                  "Record 1. Influenza symptoms include fever. " + "word " * 119 + "word"])
+
+    def test_build_writes_aligned_artifacts(self):
+        summary = build_knowledge_index(iter_records(self.parquet_path), LocalEmbeddingProvider(dimension=64),
+                                        output_dir=self.tmp_dir.name, embed_batch_size=5)
+
+        chunks = ChunkStore(os.path.join(self.tmp_dir.name, "chunks.store"))
+        index = faiss.read_index(os.path.join(self.tmp_dir.name, "data_index.faiss"))
+        embeddings = np.load(os.path.join(self.tmp_dir.name, "data_embeddings.npy"))
+        self.assertEqual(summary["chunks"], len(chunks))
+        self.assertEqual(index.ntotal, len(chunks))
+        self.assertEqual(embeddings.shape, (len(chunks), 64))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, "bm25.npz")))
+        chunks.close()
+
+
+    def assert_aligned(self):
+        chunks = ChunkStore(os.path.join(self.tmp_dir.name, "chunks.store"))
+        index = faiss.read_index(os.path.join(self.tmp_dir.name, "data_index.faiss"))
+        self.assertIsInstance(index, faiss.IndexIDMap2)
+        self.assertEqual(index.ntotal, len(chunks))
+        _, ids = index.search(LocalEmbeddingProvider(dimension=64).embed([chunks[i] for i in range(len(chunks))]), 1)
+        self.assertEqual(list(ids[:, 0]), list(range(len(chunks))))
+        n_chunks = len(chunks)
+        chunks.close()
+        return n_chunks
+
+    def test_incremental_build_skips_duplicate_and_known_chunks(self):
+        records = self.records[:6] + self.records[:3]
+        provider = CountingProvider()
+        summary = build_incremental_index(records, provider, output_dir=self.tmp_dir.name, embed_batch_size=4)
+        n_chunks = self.assert_aligned()
+        self.assertEqual(summary["new_chunks"], n_chunks)
+        self.assertEqual(len(provider.embedded), n_chunks)
+        self.assertGreater(summary["skipped_chunks"], 0)
+
+        # Unchanged dataset: nothing is embedded again
+        provider.embedded.clear()
+        summary = build_incremental_index(records, provider, output_dir=self.tmp_dir.name)
+        self.assertEqual((summary["new_chunks"], provider.embedded), (0, []))
+
+        # New records: only their chunks are embedded and appended
+        summary = build_incremental_index(self.records, provider, output_dir=self.tmp_dir.name, embed_batch_size=4)
+        self.assertEqual(len(provider.embedded), summary["new_chunks"])
+        self.assertEqual(self.assert_aligned(), n_chunks + summary["new_chunks"])
+        embeddings = np.load(os.path.join(self.tmp_dir.name, "data_embeddings.npy"))
+        self.assertEqual(len(embeddings), summary["indexed_chunks"])
+
+    def test_incremental_build_resumes_from_checkpoint(self):
+        # A crashed run left embedded chunks in the manifest that never reached the index
+        provider = CountingProvider()
+        texts = list(iter_chunks(self.records[:4]))
+        manifest = BuildManifest(os.path.join(self.tmp_dir.name, "manifest.db"))
+        manifest.check("embedding_model", provider.name)
+        manifest.add([chunk_hash(text) for text in texts], texts, provider.embed(texts))
+        manifest.close()
+
+        provider.embedded.clear()
+        summary = build_incremental_index(self.records[:4], provider, output_dir=self.tmp_dir.name)
+        self.assertEqual((summary["new_chunks"], provider.embedded), (0, []))
+        self.assertEqual(self.assert_aligned(), len(texts))
+
+
+if __name__ == '__main__':
+    unittest.main()
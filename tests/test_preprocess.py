@@ -0,0 +1,58 @@
+# Unit tests for the parallel cleaning and chunking stage
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import unittest
+from backend.load_data import iter_chunks
+from backend.preprocess import Prefetcher, Preprocessor, clean_text, clean_texts
+
+
+class TestPreprocess(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            "  Influenza\tcauses\n\nfever.  ",
+            None,
+            "   ",
+            "Asthma narrows the airways\x1c and\x0bcauses wheezing.",
+            ("Diabetes  affects blood sugar.\r\n" * 80),
+        ] * 7
+
+    def test_vectorized_cleaning_matches_clean_text(self):
+        expected = [clean_text(record) for record in self.records]
+        self.assertEqual(clean_texts(self.records), [text for text in expected if text])
+
+    def test_chunks_match_serial_path_in_order(self):
+        expected = list(iter_chunks(self.records))
+        for workers in (0, 2):
+            preprocessor = Preprocessor(workers=workers, partition_size=3)
+            self.assertEqual(list(preprocessor.iter_chunks(self.records)), expected)
+            stats = preprocessor.stats()
+            self.assertEqual((stats["partitions"], stats["chunks"]), (12, len(expected)))
+
+    def test_prefetcher_is_bounded_and_raises_producer_errors(self):
+        produced = []
+        release = threading.Event()
+
+        def items():
+            for i in range(10):
+                produced.append(i)
+                yield i
+            release.wait(5)
+            raise RuntimeError("parquet read failed")
+
+        prefetcher = Prefetcher(items(), maxsize=2)
+        iterator = iter(prefetcher)
+        self.assertEqual(next(iterator), 0)
+        release.wait(0.3)
+        # One item taken, two queued and one waiting for room
+        self.assertLessEqual(len(produced), 4)
+        release.set()
+        with self.assertRaises(RuntimeError):
+            list(iterator)
+
+
+if __name__ == '__main__':
+    unittest.main()
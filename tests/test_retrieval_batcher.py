@@ -0,0 +1,68 @@
+# Unit tests for the micro-batching retrieval layer
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from backend.retrieval_batcher import RetrievalBatcher
+
+
+class FakeIndex:
+    def __init__(self):
+        self.calls = []
+
+    def search(self, queries, k):
+        self.calls.append(len(queries))
+        ids = np.tile(np.arange(k), (len(queries), 1)) + queries[:, :1].astype(np.int64)
+        return np.zeros((len(queries), k), dtype=np.float32), ids
+
+
+class TestRetrievalBatcher(unittest.TestCase):
+
+    def test_concurrent_queries_share_one_batch(self):
+        embed_calls = []
+
+        def embed_batch(queries):
+            embed_calls.append(list(queries))
+            return np.array([[float(q)] for q in queries], dtype=np.float32)
+
+        index = FakeIndex()
+        batcher = RetrievalBatcher(embed_batch, window_ms=200, max_batch_size=4)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda q: batcher.retrieve(q, index, k=2), ["10", "20", "30", "40"]))
+
+        self.assertEqual(len(embed_calls), 1)
+        self.assertEqual(index.calls, [4])
+        for query, (embedding, indexes) in zip(["10", "20", "30", "40"], results):
+            self.assertEqual(embedding[0], float(query))
+            self.assertEqual(list(indexes), [int(query), int(query) + 1])
+        self.assertEqual(batcher.stats()["max_batch_size"], 4)
+
+    def test_cancelled_queries_are_dropped(self):
+        embed_calls = []
+
+        def embed_batch(queries):
+            embed_calls.append(list(queries))
+            return np.array([[float(q)] for q in queries], dtype=np.float32)
+
+        batcher = RetrievalBatcher(embed_batch, window_ms=100)
+        cancelled = batcher.submit("10", FakeIndex(), k=2)
+        self.assertTrue(cancelled.cancel())
+        embedding, _ = batcher.retrieve("20", FakeIndex(), k=2)
+
+        self.assertEqual(embedding[0], 20.0)
+        self.assertEqual(embed_calls, [["20"]])
+
+    def test_errors_reach_every_caller(self):
+        def embed_batch(queries):
+            raise RuntimeError("embeddings API down")
+
+        batcher = RetrievalBatcher(embed_batch, window_ms=1)
+        with self.assertRaises(RuntimeError):
+            batcher.retrieve("flu", FakeIndex())
+
+
+if __name__ == '__main__':
+    unittest.main()
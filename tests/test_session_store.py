@@ -0,0 +1,120 @@
+# Unit tests for the chat session stores
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# The OpenAI clients are created at import, no request is sent in these tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import tempfile
+import unittest
+from unittest.mock import patch
+from backend import chatbot
+from backend.session_store import MemorySessionStore, SQLiteSessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemorySessionStore(unittest.TestCase):
+
+    def test_state_is_kept_per_session(self):
+        store = MemorySessionStore()
+        state = store.get("a")
+        state["missing_params"].append("date")
+        store.save("a", state)
+
+        self.assertEqual(store.get("a")["missing_params"], ["date"])
+        self.assertEqual(store.get("b")["missing_params"], [])
+
+    def test_lru_ttl_and_memory_evictions(self):
+        clock = FakeClock()
+        store = MemorySessionStore(ttl=60, max_sessions=2, max_bytes=400, clock=clock)
+        evicted = []
+        store.eviction_listeners.append(evicted.append)
+        for session_id in ("a", "b", "c"):
+            store.save(session_id, store.get(session_id))
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.stats()["evicted_lru"], 1)
+
+        clock.now += 61
+        store.save("d", store.get("d"))
+        self.assertEqual(store.stats()["evicted_ttl"], 2)
+
+        state = store.get("e")
+        state["data"]["description"] = "x" * 500
+        store.save("e", state)
+        self.assertEqual(store.stats()["evicted_memory"], 1)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(evicted, ["a", "b", "c", "d"])
+
+
+class TestSQLiteSessionStore(unittest.TestCase):
+
+    def test_sessions_are_shared_and_expire(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            clock = FakeClock()
+            db_path = os.path.join(tmp_dir, "sessions.db")
+            state = SQLiteSessionStore(db_path, ttl=60, clock=clock).get("a")
+            state["data"]["name"] = "Ahmet"
+            SQLiteSessionStore(db_path, ttl=60, clock=clock).save("a", state)
+
+            other_worker = SQLiteSessionStore(db_path, ttl=60, clock=clock)
+            self.assertEqual(other_worker.get("a")["data"]["name"], "Ahmet")
+
+            clock.now += 61
+            self.assertEqual(other_worker.get("a")["data"], {})
+            other_worker.save("b", other_worker.get("b"))
+            self.assertEqual(len(other_worker), 1)
+            self.assertEqual(other_worker.stats()["evicted_ttl"], 1)
+            other_worker.connection.close()
+
+
+class TestSessionAgents(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.dict(chatbot.session_agents, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sessions_have_separate_memories(self):
+        agent_a, agent_b = chatbot.get_agent("a"), chatbot.get_agent("b")
+        self.assertIs(chatbot.get_agent("a"), agent_a)
+        self.assertIsNot(agent_a.memory, agent_b.memory)
+        # The LLM is shared
+        self.assertIs(agent_a.agent.llm_chain.llm, agent_b.agent.llm_chain.llm)
+
+        agent_a.memory.save_context({"input": "Book me for Monday"}, {"output": "Your name, please?"})
+        self.assertEqual(len(agent_a.memory.chat_memory.messages), 2)
+        self.assertEqual(agent_b.memory.chat_memory.messages, [])
+
+    def test_evicted_and_deleted_sessions_drop_their_agent(self):
+        store = MemorySessionStore(max_sessions=1)
+        store.eviction_listeners.append(chatbot.drop_session_agent)
+        with patch.object(chatbot, "create_agent", side_effect=lambda: object()):
+            for session_id in ("a", "b"):
+                chatbot.get_agent(session_id)
+                store.save(session_id, store.get(session_id))
+            self.assertEqual(list(chatbot.session_agents), ["b"])
+
+            store.delete("b")
+            self.assertEqual(list(chatbot.session_agents), [])
+
+    def test_agents_are_capped_least_recently_used_first(self):
+        with patch.object(chatbot, "create_agent", side_effect=lambda: object()), \
+                patch.object(chatbot, "AGENT_MAX_SESSIONS", 2):
+            agent_a = chatbot.get_agent("a")
+            chatbot.get_agent("b")
+            self.assertIs(chatbot.get_agent("a"), agent_a)
+            chatbot.get_agent("c")
+
+        self.assertEqual(list(chatbot.session_agents), ["a", "c"])
+        self.assertIs(chatbot.session_agents["a"], agent_a)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# Unit tests for sharded FAISS indexes
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+import faiss
+import numpy as np
+from backend.embeddings import LocalEmbeddingProvider
+from backend.index_factory import build_index, configure_search, prepare_reconstruct, reconstruct_vectors
+from backend.knowledge_base import write_bundle_manifest
+from backend.load_data import build_incremental_index, build_knowledge_index
+from backend.sharded_index import ShardedIndexBuilder, find_shards, read_index, shard_index, write_shards
+
+
+class TestShardedIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "data_index.faiss")
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(500, 16)).astype(np.float32)
+        self.queries = rng.normal(size=(20, 16)).astype(np.float32)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_fan_out_search_matches_single_index(self):
+        builder = ShardedIndexBuilder(3)
+        for start in range(0, len(self.vectors), 128):
+            batch = self.vectors[start:start + 128]
+            builder.add(batch, np.arange(start, start + len(batch)))
+        write_shards(builder.finish(), self.path)
+        self.assertEqual(len(find_shards(self.path)), 3)
+
+        for threaded in (True, False):
+            index = read_index(self.path, threaded=threaded)
+            self.assertEqual(index.ntotal, len(self.vectors))
+            distances, ids = index.search(self.queries, 5)
+            expected_distances, expected_ids = build_index(self.vectors, "flat").search(self.queries, 5)
+            np.testing.assert_array_equal(ids, expected_ids)
+            np.testing.assert_allclose(distances, expected_distances, rtol=1e-5)
+        np.testing.assert_array_equal(reconstruct_vectors(index, [0, 7, 499]), self.vectors[[0, 7, 499]])
+
+        # Rewriting with another shard count leaves no stale shards behind
+        write_shards([build_index(self.vectors, "flat")], self.path)
+        self.assertEqual(len(find_shards(self.path)), 1)
+
+    def test_search_settings_apply_to_every_shard(self):
+        indexes = ShardedIndexBuilder(2, index_type="ivf_flat", nlist=4)
+        indexes.add(self.vectors, np.arange(len(self.vectors)))
+        index = configure_search(shard_index(indexes.finish()), nprobe=3)
+        for i in range(index.count()):
+            self.assertEqual(faiss.extract_index_ivf(index.at(i)).nprobe, 3)
+        prepare_reconstruct(index)
+        np.testing.assert_array_equal(reconstruct_vectors(index, [0, 7, 499]), self.vectors[[0, 7, 499]])
+
+    def test_full_and_incremental_builds_write_shards(self):
+        provider = LocalEmbeddingProvider(dimension=16)
+        records = [f"Record {i}. Influenza symptoms include fever and cough." for i in range(10)]
+        build_knowledge_index(records, provider, output_dir=self.tmp_dir.name, embed_batch_size=4, workers=0,
+                              shards=3)
+        manifest = write_bundle_manifest(self.tmp_dir.name, provider.name, 16, "flat")
+        self.assertIn("data_index.2-of-3.faiss", manifest["files"])
+        self.assertFalse(os.path.exists(self.path))
+
+        incremental_dir = os.path.join(self.tmp_dir.name, "incremental")
+        build_incremental_index(records[:6], provider, output_dir=incremental_dir, embed_batch_size=4, workers=0,
+                                shards=3)
+        summary = build_incremental_index(records, provider, output_dir=incremental_dir, embed_batch_size=4,
+                                          workers=0, shards=3)
+        self.assertEqual(summary["new_chunks"], 4)
+        index = read_index(os.path.join(incremental_dir, "data_index.faiss"))
+        _, ids = index.search(provider.embed(records), 1)
+        self.assertEqual(ids[:, 0].tolist(), list(range(10)))
+        with self.assertRaises(ValueError):
+            build_incremental_index(records, provider, output_dir=incremental_dir, workers=0, shards=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
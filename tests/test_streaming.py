@@ -0,0 +1,91 @@
+# Unit tests for streamed answers
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# The OpenAI clients are created at import, no request is sent in these tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import numpy as np
+from backend import chatbot
+from backend.answer_cache import SemanticAnswerCache
+from backend.tracing import tracer
+from ui.app import stream_text
+
+
+def text_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None)
+
+
+class FakeCompletions:
+    # Streams the deltas, then the usage-only chunk that include_usage adds
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        chunks = [text_chunk(None)] + [text_chunk(delta) for delta in self.deltas]
+        chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3)))
+        return iter(chunks)
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.completions = FakeCompletions(["Rest ", "and ", "fluids."])
+        client = SimpleNamespace(chat=SimpleNamespace(completions=self.completions))
+        self.cache = SemanticAnswerCache()
+        self.cache.invalidate(version="v1")
+        self.embedding = np.ones(8, dtype=np.float32)
+        self.patches = [patch.object(chatbot, "client", client), patch.object(chatbot, "answer_cache", self.cache)]
+        for patcher in self.patches:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+
+    def answer(self):
+        tokens = chatbot.stream_chat_completion([{"role": "user", "content": "flu?"}], stage="test_stream")
+        return chatbot.stream_and_cache_answer(tokens, self.embedding, [1, 2], language="en", version="v1")
+
+    def test_deltas_are_yielded_in_order_and_usage_is_recorded(self):
+        prompt_tokens = tracer.token_counts[("test_stream", "prompt")]
+        tokens = list(chatbot.stream_chat_completion([{"role": "user", "content": "flu?"}], stage="test_stream"))
+
+        self.assertEqual(tokens, ["Rest ", "and ", "fluids."])
+        self.assertTrue(self.completions.requests[0]["stream"])
+        self.assertEqual(self.completions.requests[0]["stream_options"], {"include_usage": True})
+        if tracer.enabled:
+            self.assertEqual(tracer.token_counts[("test_stream", "prompt")], prompt_tokens + 12)
+        self.assertEqual(chatbot.stream_timings[-1][0], "test_stream")
+
+    def test_answer_is_cached_once_the_stream_is_consumed(self):
+        answer = self.answer()
+        tokens = [next(answer) for _ in range(3)]
+        # Every token is out, the stream has not ended yet
+        self.assertIsNone(self.cache.lookup(self.embedding, language="en", version="v1"))
+        self.assertEqual(list(answer), [])
+
+        self.assertEqual(tokens, ["Rest ", "and ", "fluids."])
+        self.assertEqual(self.cache.lookup(self.embedding, language="en", version="v1"), "Rest and fluids.")
+
+    def test_abandoned_stream_is_not_cached(self):
+        answer = self.answer()
+        self.assertEqual(next(answer), "Rest ")
+        # The client went away mid-answer
+        answer.close()
+
+        self.assertIsNone(self.cache.lookup(self.embedding, language="en", version="v1"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_ui_shows_the_growing_answer(self):
+        self.assertEqual(list(stream_text(self.answer())), ["Rest ", "Rest and ", "Rest and fluids."])
+        self.assertEqual(self.cache.lookup(self.embedding, language="en", version="v1"), "Rest and fluids.")
+
+
+if __name__ == '__main__':
+    unittest.main()
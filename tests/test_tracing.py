@@ -0,0 +1,71 @@
+# Unit tests for pipeline tracing
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from backend.tracing import Tracer, serve_metrics
+
+
+class TestTracer(unittest.TestCase):
+
+    def test_turn_collects_spans_and_tokens(self):
+        tracer = Tracer()
+        records = []
+
+        def turn():
+            with tracer.span("faiss_search"):
+                pass
+            tracer.record_usage("med_response", SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+            tracer.annotate(action="medical_question")
+            records.append(tracer.current_turn().record())
+            yield "answer"
+
+        self.assertEqual(list(tracer.trace_turn(turn())), ["answer"])
+        self.assertIn("faiss_search", records[0]["stages_ms"])
+        self.assertEqual(records[0]["tokens"]["med_response_prompt"], 120)
+        self.assertEqual(records[0]["action"], "medical_question")
+        self.assertIsNone(tracer.current_turn())
+
+    def test_prometheus_text(self):
+        tracer = Tracer()
+        tracer.observe("analyze_request", 0.2)
+        tracer.observe("analyze_request", 3.0)
+        tracer.register_stats("answer_cache", lambda: {"hit_rate": 0.5, "histogram": {1: 2}})
+        text = tracer.prometheus_text()
+
+        self.assertIn('chatbot_stage_seconds_bucket{stage="analyze_request",le="0.25"} 1', text)
+        self.assertIn('chatbot_stage_seconds_count{stage="analyze_request"} 2', text)
+        self.assertIn('chatbot_component_stat{component="answer_cache",stat="hit_rate"} 0.5', text)
+        self.assertNotIn('stat="histogram"', text)
+
+    def test_metrics_are_served_over_http(self):
+        tracer = Tracer()
+        tracer.observe("faiss_search", 0.01)
+        tracer.register_stats("answer_cache", lambda: {"hit_rate": 0.25})
+        server = serve_metrics(0, host="127.0.0.1", source=tracer)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            with urllib.request.urlopen(f"{url}/metrics") as response:
+                text = response.read().decode()
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn('chatbot_stage_seconds_count{stage="faiss_search"} 1', text)
+        self.assertIn('chatbot_component_stat{component="answer_cache",stat="hit_rate"} 0.25', text)
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer = Tracer(enabled=False)
+        with tracer.span("embedding"):
+            pass
+        self.assertEqual(list(tracer.trace_turn(iter(["a"]))), ["a"])
+        self.assertEqual(tracer.stage_counts, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# Unit tests for compact embedding storage
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+import numpy as np
+from backend.load_data import EmbeddingFileWriter
+from backend.vector_storage import STORAGE_DTYPES, encode, load_vectors, quant_path, save_vectors
+
+
+class TestVectorStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(300, 32)).astype(np.float32)
+        self.path = os.path.join(self.tmp_dir.name, "embeddings.npy")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip_is_memory_mapped_float32(self):
+        tolerances = {"float32": 0.0, "float16": 1e-2, "int8": 0.05}
+        for dtype in STORAGE_DTYPES:
+            save_vectors(self.path, self.vectors, dtype)
+            vectors = load_vectors(self.path)
+            self.assertEqual(vectors.dtype, dtype)
+            self.assertIsInstance(vectors.codes, np.memmap)
+            self.assertEqual(vectors.nbytes, self.vectors.nbytes * np.dtype(dtype).itemsize // 4)
+
+            rows = vectors[[3, 7, 11]]
+            self.assertEqual(rows.dtype, np.float32)
+            self.assertTrue(rows.flags["C_CONTIGUOUS"])
+            self.assertLessEqual(np.abs(rows - self.vectors[[3, 7, 11]]).max(), tolerances[dtype])
+            del vectors
+
+    def test_writer_stores_dtype_and_appends(self):
+        writer = EmbeddingFileWriter(self.path, dtype="int8")
+        writer.add(self.vectors[:100])
+        writer.add(self.vectors[100:200])
+        writer.close()
+        self.assertTrue(os.path.exists(quant_path(self.path)))
+
+        writer = EmbeddingFileWriter(self.path, append=True, dtype="float16")
+        writer.add(self.vectors[200:])
+        writer.close()
+        vectors = load_vectors(self.path)
+        self.assertEqual((vectors.dtype, len(vectors)), ("float16", 300))
+        self.assertFalse(os.path.exists(quant_path(self.path)))
+        self.assertLessEqual(np.abs(vectors.to_float32() - self.vectors).max(), 0.05)
+        del vectors
+
+    def test_int8_append_keeps_existing_codes(self):
+        writer = EmbeddingFileWriter(self.path, dtype="int8")
+        writer.add(self.vectors[:200])
+        writer.close()
+        vectors = load_vectors(self.path)
+        codes, quant = np.array(vectors.codes), vectors.quant
+        del vectors
+
+        # Appended twice, the second time with nothing new
+        for rows, count in ((self.vectors[200:] * 2, 200), (self.vectors[:0], 300)):
+            writer = EmbeddingFileWriter(self.path, append=True, dtype="int8")
+            self.assertEqual(writer.count, count)
+            writer.add(rows)
+            writer.close()
+
+        vectors = load_vectors(self.path)
+        self.assertEqual(len(vectors), 300)
+        np.testing.assert_array_equal(vectors.quant, quant)
+        np.testing.assert_array_equal(vectors.codes[:200], codes)
+        # New rows use the stored parameters, values outside their range are clipped
+        np.testing.assert_array_equal(vectors.codes[200:], encode(self.vectors[200:] * 2, "int8", quant))
+        self.assertFalse(os.path.exists(f"{self.path}.tmp") or os.path.exists(f"{self.path}.raw"))
+        del vectors
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,40 +3,25 @@ import os
 import sys
 # Import root path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from backend.chatbot import load_faiss_index, analyze_request, handle_med_question, invalid_question, agent, check_missing_params
-import json
-from langdetect import detect 
+from backend.async_chatbot import analyze_with_speculative_retrieval
+from backend.tracing import serve_metrics, tracer
+from backend.session_store import get_session_store
+from backend.chatbot import get_knowledge_base, drop_session_agent, run_appointment_action, warm_up, fast_analyze_request, handle_med_question, invalid_question, check_missing_params
+from backend.language import detect_language
 import re
 from datetime import datetime
 import uuid
+import time
 
-class SessionState:
-    def __init__(self):
-        self.sessions = {}
+# Conversation state per Gradio session (SESSION_STORE=memory or sqlite, bounded by SESSION_TTL / SESSION_MAX_SESSIONS)
+session_store = get_session_store()
+tracer.register_stats("session_store", session_store.stats)
+# Each session has its own agent memory, forgotten with the session
+session_store.eviction_listeners.append(drop_session_agent)
 
-    def get_state(self, session_id):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {
-                "missing_params": [],
-                "reset_status": True,
-                "data": {}
-            }
-        return self.sessions[session_id]
-
-session_state = SessionState()
-
-# Faiss index ve chunk file paths for medical questions
-faiss_path =  "C:/Users/sevva/Documents/GitHub/healthcare_chatbot/data_index.faiss" # Use your own path to file
-chunks_path = "C:/Users/sevva/Documents/GitHub/healthcare_chatbot/chunks.csv" # Use your own path to file
-index = load_faiss_index(faiss_path=faiss_path)
-
-# Detect language 
-def detect_language(text):
-    try:
-        lang = detect(text)
-        return lang
-    except:
-        return "tr"  # Default Turkish
+# Knowledge base (KNOWLEDGE_BASE_DIR bundles, or FAISS_PATH / CHUNKS_PATH) and agent are loaded by backend.chatbot
+# Retrieve speculatively while the request is analyzed (asyncio pipeline)
+ASYNC_PIPELINE = os.getenv("ASYNC_PIPELINE", "1") == "1"
 
 # Translate default message according to language
 def get_translated_message(lang):
@@ -155,6 +140,7 @@ def respond(
     top_p,
     state,
 ):
+    # Streaming handler: yields the answer so far, Gradio shows it as it grows
     if state is None or isinstance(state, float):
         state = {
             "missing_params": [],
@@ -169,9 +155,22 @@ def respond(
     data["query"] = message
 
     # Check missing params
+    retrieved = None
+    # One knowledge base for the whole turn, even if a new bundle is swapped in meanwhile.
+    # Only loaded for speculative retrieval or medical questions, appointments work without it
+    knowledge_base = None
     if state["reset_status"]:
-        response = analyze_request(message)
+        if ASYNC_PIPELINE:
+            try:
+                knowledge_base = get_knowledge_base()
+            except Exception as e:
+                print(f"Knowledge base not available, no speculative retrieval: {e}")
+        if knowledge_base is not None:
+            response, retrieved = analyze_with_speculative_retrieval(message, knowledge_base.index)
+        else:
+            response = fast_analyze_request(message)
         action = response.get("action")
+        tracer.annotate(action=action)
         print(action)
         data.update(response)
         data["query"] = message
@@ -181,22 +180,24 @@ def respond(
             data[missing_params[0]] = message
             missing_params.pop(0)
             if len(missing_params) == 0:
-                input_data = json.dumps(data)
-                result = agent.invoke({"input": input_data})
+                result = run_appointment_action(data, session_id=state.get("session_id"))
                 # State'i resetle
                 state.update({
                     "missing_params": [],
                     "reset_status": True,
                     "data": {}
                 })
-                return result["output"]
+                yield result
+                return
             else:
                 lng = get_translated_message(detect_language(message))
                 response = f"{lng} {missing_params[0]}"
-                return response, state
+                yield response
+                return
         else:
             response = f"Wrong input. Please try again {missing_params[0]}:"
-            return response
+            yield response
+            return
 
     # Medical Question
     if action == "medical_question":
@@ -206,7 +207,8 @@ def respond(
             "reset_status": True,
             "data": {}
         })
-        return handle_med_question(query=query, faiss_index=index, chunk_path=chunks_path)
+        knowledge_base = knowledge_base or get_knowledge_base()
+        yield from stream_text(handle_med_question(query=query, knowledge_base=knowledge_base, stream=True, retrieved=retrieved))
     
     # Invalid Question
     elif action == "invalid":
@@ -215,37 +217,55 @@ def respond(
             "reset_status": True,
             "data": {}
         })
-        return invalid_question(message)
+        yield from stream_text(invalid_question(message, stream=True))
     
     # Appointment processes
     else:
         missing_params = check_missing_params(data)
         if len(missing_params) == 0:
-            input_data = json.dumps(data)
-            result = agent.invoke({"input": input_data})
+            result = run_appointment_action(data, session_id=state.get("session_id"))
             state.update({
                 "missing_params": [],
                 "reset_status": True,
                 "data": {}
             })
-            return result["output"]
+            yield result
         else:
+            # Asked one by one in the next turns
+            state["missing_params"] = missing_params
             lng = get_translated_message(detect_language(message))
             response = f"{lng} {missing_params[0]}"
-            return response
+            yield response
 
+# Accumulate streamed tokens, Gradio expects the full message so far
+def stream_text(tokens):
+    text = ""
+    for token in tokens:
+        text += token
+        yield text
 
-def wrapper_fn(message, history, system_message, max_tokens, temperature, top_p):
-    # Session ID oluştur (basit bir yöntem)
-    session_id = str(hash(json.dumps(history))) if history else str(uuid.uuid4())
-    state = session_state.get_state(session_id)
-    
-    # Call main function
-    response = respond(message, history, system_message, max_tokens, temperature, top_p, state)
+
+def wrapper_fn(message, history, system_message, max_tokens, temperature, top_p, request: gr.Request = None):
+    # Gradio's session hash stays the same for the whole conversation
+    session_id = getattr(request, "session_hash", None) or str(uuid.uuid4())
+    state = session_store.get(session_id)
+    state["session_id"] = session_id
     
-    # Update state
-    session_state.sessions[session_id] = state
-    return response
+    # Call main function and stream its partial answers (traced as one turn, logged as a JSON line)
+    start = time.perf_counter()
+    first_output = None
+    turn = respond(message, history, system_message, max_tokens, temperature, top_p, state)
+    try:
+        for response in tracer.trace_turn(turn, session_id=session_id):
+            if first_output is None:
+                first_output = time.perf_counter() - start
+            yield response
+    finally:
+        # Update state, also when the client went away mid-answer
+        session_store.save(session_id, state)
+    if not tracer.enabled:
+        total = time.perf_counter() - start
+        print(f"Turn latency - first output: {(first_output or total) * 1000:.0f} ms, total: {total * 1000:.0f} ms")
 
 
 # Gradio ChatInterface
@@ -266,4 +286,9 @@ demo = gr.ChatInterface(
 )
 
 if __name__ == "__main__":
+    # Load the index, chunks and agent before the first user arrives
+    warm_up()
+    # Chat stages, token usage and cache stats live in this process (METRICS_PORT=0 to disable)
+    if int(os.getenv("METRICS_PORT", "9100")):
+        serve_metrics(int(os.getenv("METRICS_PORT", "9100")))
     demo.launch(share=True)